@@ -0,0 +1,57 @@
+"""Time the flat multi-result search /search runs against the full single-result extraction /play runs.
+
+For each query:
+  flat     'ytsearchN:<query>' with the 'flat' profile (search_songs), which
+           lists N results without resolving any of them
+  default  '<query>' with the 'default' profile (get_song_info), which
+           searches and fully resolves the first result
+
+Both go through _run_extraction in this process with warm YoutubeDL
+instances, like a pool worker. Needs network access to YouTube. The bot
+records the same per-profile averages at runtime, see the 'profiles' section
+of /music_stats.
+
+Run from the repository root: python -m benchmarks.bench_extraction [query ...] [--results N] [--runs N]
+"""
+import argparse
+import time
+
+from src.music.utils.extractor_pool import _run_extraction
+
+DEFAULT_QUERIES = ('lofi hip hop', 'bohemian rhapsody queen', 'daft punk around the world',
+                   'beethoven moonlight sonata', 'never gonna give you up')
+
+
+def timed(profile, url):
+    """Extract in this process, returns seconds"""
+    started = time.perf_counter()
+    _run_extraction(profile, url)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queries', nargs='*', default=DEFAULT_QUERIES, help="search queries")
+    parser.add_argument('--results', type=int, default=5, help="results listed by the flat search (/search)")
+    parser.add_argument('--runs', type=int, default=3, help="runs per query and profile, the fastest is kept")
+    args = parser.parse_args()
+
+    # Warm both instances first so their construction is not counted
+    timed('flat', f"ytsearch1:{args.queries[0]}")
+    timed('default', args.queries[0])
+
+    print(f"{'query':<32} {'flat ms':>8} {'default ms':>11} {'ratio':>6}")
+    totals = {'flat': 0.0, 'default': 0.0}
+    for query in args.queries:
+        flat = min(timed('flat', f"ytsearch{args.results}:{query}") for _ in range(args.runs))
+        default = min(timed('default', query) for _ in range(args.runs))
+        totals['flat'] += flat
+        totals['default'] += default
+        print(f"{query[:32]:<32} {flat * 1000:8.0f} {default * 1000:11.0f} {default / flat:5.1f}x")
+    count = len(args.queries)
+    print(f"{'average':<32} {totals['flat'] / count * 1000:8.0f} {totals['default'] / count * 1000:11.0f} "
+          f"{totals['default'] / totals['flat']:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
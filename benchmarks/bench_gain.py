@@ -0,0 +1,59 @@
+"""Time the NumPy volume stage per 20 ms frame against py-cord's PCMVolumeTransformer (audioop).
+
+Run from the repository root: python -m benchmarks.bench_gain
+"""
+import time
+
+import discord
+import numpy as np
+
+from src.music.utils.gain import GainAudio
+
+FRAMES = 20_000
+
+
+class LoopedPCM(discord.AudioSource):
+    """Serves the same few seconds of noise over and over, like a PCM ffmpeg source"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def read(self):
+        self.index += 1
+        return self.frames[self.index % len(self.frames)]
+
+    def is_opus(self):
+        return False
+
+
+def per_frame(source, change_volume=False):
+    """Read FRAMES frames, returns microseconds per frame"""
+    started = time.perf_counter()
+    for i in range(FRAMES):
+        if change_volume and i % 20 == 0:
+            source.volume = 0.4 if source.volume > 0.5 else 0.6  # ramping most of the time
+        source.read()
+    return (time.perf_counter() - started) / FRAMES * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(-12000, 12000, 1920, dtype=np.int16).tobytes() for _ in range(250)]
+    baseline = per_frame(LoopedPCM(frames))
+
+    cases = {
+        'GainAudio, unity gain': GainAudio(LoopedPCM(frames)),
+        'GainAudio, volume 0.5': GainAudio(LoopedPCM(frames), volume=0.5),
+        'GainAudio, 0.5 + measuring': GainAudio(LoopedPCM(frames), volume=0.5, measure=True),
+        'PCMVolumeTransformer 0.5': discord.PCMVolumeTransformer(LoopedPCM(frames), volume=0.5),
+    }
+    print(f"per 20 ms frame ({FRAMES} frames, source overhead of {baseline:.1f} us subtracted):")
+    for name, source in cases.items():
+        print(f"  {name:<30} {per_frame(source) - baseline:6.1f} us")
+    ramping = GainAudio(LoopedPCM(frames), volume=0.5)
+    print(f"  {'GainAudio, ramping volume':<30} {per_frame(ramping, change_volume=True) - baseline:6.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Measure the silence between tracks with and without gapless mode, and check it against the target.
+
+Both runs play the same short tracks (ffmpeg cut to --seconds) through a loop
+that reads one frame every 20 ms like the voice client does:
+  sequential  the next track's ffmpeg is only started once the current one
+              ran dry, as PlayerService.play_next does without gapless mode
+  gapless     the next track is prebuffered (prebuffer_track) in a thread
+              while the current one plays and attached to the GaplessAudio,
+              which switches to it inside the read that hit the end
+
+Gaps are recorded by GapStats, as in /music_stats. The script exits with an
+error if the gapless max_gap_ms is above --target-ms (GapStats' own target
+by default).
+
+Run from the repository root on a local Opus file, e.g.:
+  python -m benchmarks.bench_gapless song.webm
+  python -m benchmarks.bench_gapless song.webm --ffmpeg /path/to/ffmpeg --tracks 10
+"""
+import argparse
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+import discord
+
+from src.music.utils.audio import TrackedAudio
+from src.music.utils.gapless import GaplessAudio, GapStats, prebuffer_track
+
+PREBUFFER_FRAMES = 25  # GaplessManager.prebuffer_frames
+
+
+def create_source(args):
+    """Start ffmpeg for one track, as the passthrough source PlayerService builds"""
+    audio = discord.FFmpegOpusAudio(args.path, codec='opus', options=f'-t {args.seconds}',
+                                    executable=args.ffmpeg, stderr=subprocess.DEVNULL)
+    return TrackedAudio(audio, passthrough=True)
+
+
+def play(source):
+    """Read a frame every 20 ms until the source runs dry"""
+    next_frame = time.perf_counter()
+    while source.read():
+        next_frame += TrackedAudio.FRAME_LENGTH
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+
+def run_sequential(args):
+    stats = GapStats()
+    previous_end = None
+    for i in range(args.tracks):
+        chain = GaplessAudio(create_source(args), {'title': f"track {i}"}, previous_end=previous_end,
+                             start_stats=stats)
+        play(chain)
+        chain.cleanup()
+        previous_end = chain.ended_at
+    return stats
+
+
+def run_gapless(args):
+    stats = GapStats()
+    chain = GaplessAudio(create_source(args), {'title': 'track 0'}, stats=stats)
+    cleanups = []
+    chain.on_switch = lambda old, new, song: cleanups.append(old)
+
+    def prepare():
+        # Prepare each successor as soon as its predecessor starts, well ahead of the end
+        for i in range(1, args.tracks):
+            while chain.switches < i - 1:
+                time.sleep(0.05)
+            source = create_source(args)
+            prebuffer_track(source, PREBUFFER_FRAMES)
+            chain.set_next(source, {'title': f"track {i}"})
+            while chain.has_next:
+                time.sleep(0.05)
+
+    preparer = threading.Thread(target=prepare, daemon=True)
+    preparer.start()
+    play(chain)
+    preparer.join()
+    chain.cleanup()
+    for old in cleanups:
+        old.cleanup()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="local Opus file (webm or ogg)")
+    parser.add_argument('--ffmpeg', default='ffmpeg', help="ffmpeg executable")
+    parser.add_argument('--tracks', type=int, default=6, help="tracks per run")
+    parser.add_argument('--seconds', type=float, default=2, help="length each track is cut to")
+    parser.add_argument('--target-ms', type=float, default=GapStats().target * 1000, help="max gapless gap")
+    args = parser.parse_args()
+    logging.getLogger('discord.player').setLevel(logging.WARNING)
+
+    results = {'sequential': run_sequential(args).get_stats(), 'gapless': run_gapless(args).get_stats()}
+    print(f"{'mode':<12} {'transitions':>11} {'avg gap ms':>11} {'max gap ms':>11}")
+    for mode, stats in results.items():
+        print(f"{mode:<12} {stats['transitions']:>11} {stats['avg_gap_ms']:>11} {stats['max_gap_ms']:>11}")
+
+    gapless = results['gapless']
+    if gapless['transitions'] != args.tracks - 1 or gapless['gapless'] != args.tracks - 1:
+        sys.exit(f"FAIL: only {gapless['gapless']} of {args.tracks - 1} transitions were gapless")
+    if gapless['max_gap_ms'] > args.target_ms:
+        sys.exit(f"FAIL: gapless max gap {gapless['max_gap_ms']} ms is above the {args.target_ms:g} ms target")
+    print(f"OK: gapless max gap {gapless['max_gap_ms']} ms is within the {args.target_ms:g} ms target")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Compare the CPU cost of Opus passthrough against re-encoding, per minute of audio.
+
+Modes, as SourceManager.create_source builds them:
+  passthrough  FFmpegOpusAudio(codec='opus'): ffmpeg copies the Opus packets
+               (py-cord turns 'opus'/'libopus' into -c:a copy, any other codec
+               value, including 'copy', into a libopus re-encode)
+  opus         FFmpegOpusAudio(): ffmpeg decodes and encodes with libopus
+  pcm          FFmpegPCMAudio + the voice client's Opus encoder, in this process
+  pcm+volume   the same with GainAudio at 50% volume
+
+Frames are read as fast as possible. CPU time is this process's
+time.process_time() plus the ffmpeg child's user+system time.
+
+Run from the repository root on a local Opus file (YouTube's format 251 is
+Opus in WebM), e.g.:
+  python -m benchmarks.bench_opus_passthrough song.webm
+  python -m benchmarks.bench_opus_passthrough song.webm --ffmpeg /path/to/ffmpeg --libopus /path/to/libopus.so
+"""
+import argparse
+import logging
+import resource
+import subprocess
+import time
+
+import discord
+
+from src.music.utils.gain import GainAudio
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def create_source(mode, path, ffmpeg):
+    if mode == 'passthrough':
+        return discord.FFmpegOpusAudio(path, codec='opus', executable=ffmpeg, stderr=subprocess.DEVNULL)
+    if mode == 'opus':
+        return discord.FFmpegOpusAudio(path, bitrate=128, executable=ffmpeg, stderr=subprocess.DEVNULL)
+    source = discord.FFmpegPCMAudio(path, executable=ffmpeg, stderr=subprocess.DEVNULL)
+    if mode == 'pcm+volume':
+        source = GainAudio(source, volume=0.5)
+    return source
+
+
+def run(mode, path, ffmpeg):
+    """Read every frame like the voice client does, returns (audio seconds, bot CPU, ffmpeg CPU, wall)"""
+    encoder = discord.opus.Encoder()
+    encoder.set_bitrate(128)
+    started, bot_started, ffmpeg_started = time.perf_counter(), time.process_time(), children_cpu()
+    source = create_source(mode, path, ffmpeg)
+    frames = 0
+    try:
+        while data := source.read():
+            if not source.is_opus():
+                encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+            frames += 1
+    finally:
+        source.cleanup()  # waits for ffmpeg, so its CPU time is counted
+    return (frames * 0.02, time.process_time() - bot_started, children_cpu() - ffmpeg_started,
+            time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="local Opus file (webm or ogg)")
+    parser.add_argument('--ffmpeg', default='ffmpeg', help="ffmpeg executable")
+    parser.add_argument('--libopus', help="libopus to load if discord.py cannot find it")
+    parser.add_argument('--runs', type=int, default=3, help="runs per mode, the fastest is reported")
+    args = parser.parse_args()
+    logging.getLogger('discord.player').setLevel(logging.WARNING)
+
+    if args.libopus:
+        discord.opus.load_opus(args.libopus)
+    elif not discord.opus.is_loaded():
+        discord.opus._load_default()
+
+    print(f"{'mode':<12} {'bot ms':>8} {'ffmpeg ms':>10} {'total ms':>9}  (CPU per minute of audio)")
+    for mode in ('passthrough', 'opus', 'pcm', 'pcm+volume'):
+        best = None
+        for _ in range(args.runs):
+            seconds, bot, ffmpeg, wall = run(mode, args.path, args.ffmpeg)
+            if best is None or bot + ffmpeg < best[1] + best[2]:
+                best = (seconds, bot, ffmpeg, wall)
+        seconds, bot, ffmpeg, wall = best
+        per_minute = 60 / seconds * 1000
+        print(f"{mode:<12} {bot * per_minute:8.0f} {ffmpeg * per_minute:10.0f} {(bot + ffmpeg) * per_minute:9.0f}"
+              f"  ({seconds:.0f}s of audio read in {wall:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Restore many saved guild queues and check that the event loop is never blocked for long.
+
+Writes --guilds queues of --songs songs each (half folded into a snapshot, half
+left in the log), then runs PersistenceService.restore() on a fresh
+QueueManager while a ticker task measures how late the loop wakes it up.
+Exits with an error if restore_stats['max_block_ms'] or the ticker's worst
+delay is above --max-block-ms, or if the whole restore takes over
+--max-total-ms.
+
+Run from the repository root: python -m benchmarks.bench_queue_restore
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from src.music.services.persistence_service import PersistenceService
+from src.music.utils.queue_journal import QueueJournal
+from src.music.utils.queue_manager import QueueManager
+
+
+def write_saved_state(directory, guilds, songs):
+    """Journal the queues the way a running bot would, with one compaction halfway"""
+    queue_manager = QueueManager()
+    journal = QueueJournal(directory)
+    journal.enabled = True
+    queue_manager.journal = journal
+    for guild_id in range(guilds):
+        queue_manager.add_multiple_to_queue(guild_id, [
+            {'video_id': f"{guild_id:05d}{i:06d}", 'title': f"Song {i} of guild {guild_id}", 'duration': 200}
+            for i in range(songs)], requester=guild_id)
+        queue_manager.set_current_song(guild_id, queue_manager.remove_at(guild_id, 0))
+        journal.write(journal.take_pending())
+        if guild_id == guilds // 2:
+            journal.rotate()
+            start_seq = journal.seq
+            journal.write_snapshot(start_seq, [(gid, journal.last_seq(), queue_manager.export_guild(gid))
+                                               for gid in queue_manager.get_guild_ids()])
+
+
+async def restore(directory):
+    """Restore while a ticker measures the loop's responsiveness, returns (stats, worst tick delay ms, total ms)"""
+    cog = SimpleNamespace(queue_manager=QueueManager())
+    persistence = PersistenceService(cog, directory)
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await persistence.restore()
+    total = time.perf_counter() - started
+    done = True
+    await task
+    return persistence.restore_stats, round(worst * 1000, 1), round(total * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=1000)
+    parser.add_argument('--songs', type=int, default=50, help="songs saved per guild")
+    parser.add_argument('--max-block-ms', type=float, default=50)
+    parser.add_argument('--max-total-ms', type=float, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_saved_state(directory, args.guilds, args.songs)
+        stats, worst_tick, total = asyncio.run(restore(directory))
+
+    print(f"restored {stats['songs']} songs in {stats['guilds']} guilds in {total} ms "
+          f"({stats['load_ms']} ms loading in a thread, {stats['rebuild_ms']} ms rebuilding)")
+    print(f"max_block_ms {stats['max_block_ms']}, worst event loop delay {worst_tick} ms")
+    if stats['guilds'] != args.guilds or stats['songs'] != args.guilds * args.songs:
+        sys.exit("FAIL: not every guild queue was restored")
+    if max(stats['max_block_ms'], worst_tick) > args.max_block_ms:
+        sys.exit(f"FAIL: the event loop was blocked for more than {args.max_block_ms:g} ms")
+    if total > args.max_total_ms:
+        sys.exit(f"FAIL: restoring took more than {args.max_total_ms:g} ms")
+    print(f"OK: within {args.max_block_ms:g} ms per block and {args.max_total_ms:g} ms in total")
+
+
+if __name__ == '__main__':
+    main()
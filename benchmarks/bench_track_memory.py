@@ -0,0 +1,54 @@
+"""Measure queue memory per entry: interned Tracks in QueueEntry objects against a dict per song.
+
+Builds the same guild queues both ways (the same popular songs queued in
+many guilds) and measures them with tracemalloc, TrackQueue nodes included.
+
+Run from the repository root: python -m benchmarks.bench_track_memory
+"""
+import gc
+import random
+import tracemalloc
+
+from src.music.utils.track import QueueEntry
+from src.music.utils.track_queue import TrackQueue
+
+
+def make_song(i):
+    """A song dict as the extractor returns it (each extraction makes its own strings)"""
+    return {'title': f'Artist {i % 97} - A song title of a usual length ({i})', 'duration': 120 + i % 300,
+            'webpage_url': f'https://www.youtube.com/watch?v=v{i:010d}', 'video_id': f'v{i:010d}',
+            'url': None, 'pending': False}
+
+
+def measure(build):
+    """Bytes allocated by build() that are still alive afterwards, and what it built"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, built
+
+
+def main(guilds=20, distinct=300, entries=10_000):
+    rng = random.Random(0)
+    per_guild = entries // guilds
+    picks = [[rng.randrange(distinct) for _ in range(per_guild)] for _ in range(guilds)]
+
+    def dict_queues():
+        return [TrackQueue(dict(make_song(i), requester=guild) for i in picks[guild]) for guild in range(guilds)]
+
+    def entry_queues():
+        return [TrackQueue(QueueEntry.from_song(make_song(i), guild) for i in picks[guild]) for guild in range(guilds)]
+
+    print(f"{entries} entries over {distinct} distinct videos in {guilds} guild queues:")
+    for name, build in (('dict per song', dict_queues), ('QueueEntry + Track', entry_queues)):
+        size, built = measure(build)
+        print(f"  {name:<20} {size / entries:6.0f} B/entry  ({size / 1024:.0f} KiB)")
+        del built
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Time TrackQueue operations against the deque guild queues used to be kept in.
+
+Run from the repository root: python -m benchmarks.bench_track_queue
+"""
+import random
+import time
+from collections import deque
+
+from src.music.utils.track_queue import TrackQueue
+
+
+def per_op(function, repeat):
+    """Run function(i) `repeat` times, returns microseconds per call"""
+    started = time.perf_counter()
+    for i in range(repeat):
+        function(i)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def bench(size, repeat=2000):
+    rng = random.Random(size)
+    songs = [{'title': f'song {i}', 'duration': rng.randint(60, 600)} for i in range(size)]
+    queue = TrackQueue(songs)
+    positions = [rng.randrange(size) for _ in range(repeat)]
+
+    results = {
+        'insert': per_op(lambda i: queue.insert(positions[i], {'duration': 200}), repeat),
+        'pop': per_op(lambda i: queue.pop(positions[i]), repeat),
+        'move': per_op(lambda i: queue.move(positions[i], positions[-i - 1]), repeat),
+        # Each song is put back after being removed, half of the time is the removal
+        'remove(song)': per_op(lambda i: queue.remove(songs[positions[i]]) and queue.insert(positions[i], songs[positions[i]]),
+                               repeat) / 2,
+        'shuffle': per_op(lambda i: queue.shuffle(rng), 5),
+        'totals': per_op(lambda i: (len(queue), queue.total_duration), repeat),
+    }
+
+    # The old queue: finding a song and summing the durations are scans
+    old = deque(songs)
+    deque_repeat = max(repeat // 10, 20)
+    results['deque remove(song)'] = per_op(lambda i: old.remove(songs[positions[i]]) or old.append(songs[positions[i]]),
+                                           deque_repeat)
+    results['deque sum of durations'] = per_op(lambda i: sum(song['duration'] for song in old), deque_repeat)
+    return results
+
+
+def main():
+    for size in (10_000, 100_000):
+        print(f"{size} songs:")
+        for name, micros in bench(size).items():
+            print(f"  {name:<24} {micros / 1000:8.2f} ms" if micros >= 1000 else f"  {name:<24} {micros:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,18 @@ from .utils import (handle_play,
                     handle_leave,
                     handle_controller,
                     handle_music_channel,
-                    handle_repeat)
+                    handle_repeat,
+                    handle_search,
+                    handle_music_stats,
+                    handle_bulk,
+                    handle_gapless,
+                    handle_normalize,
+                    handle_seek,
+                    handle_filter,
+                    handle_remove,
+                    handle_move,
+                    handle_shuffle,
+                    handle_dedupe)
 
 
 
@@ -33,6 +44,22 @@ class CommandHandlers:
         """Handle queue command"""
         await handle_queue(self, ctx)
     
+    async def handle_remove(self, ctx, position):
+        """Handle remove command - remove a song from the queue"""
+        await handle_remove(self, ctx, position)
+    
+    async def handle_move(self, ctx, from_position, to_position):
+        """Handle move command - move a song within the queue"""
+        await handle_move(self, ctx, from_position, to_position)
+    
+    async def handle_shuffle(self, ctx):
+        """Handle shuffle command - shuffle the queue"""
+        await handle_shuffle(self, ctx)
+    
+    async def handle_dedupe(self, ctx):
+        """Handle dedupe command - remove duplicate songs from the queue"""
+        await handle_dedupe(self, ctx)
+    
     async def handle_leave(self, ctx):
         """Handle leave command"""
         await handle_leave(self, ctx)
@@ -48,4 +75,31 @@ class CommandHandlers:
     async def handle_repeat(self, ctx):
         """Handle repeat command - toggle through repeat modes"""
         await handle_repeat(self, ctx)
-
+    
+    async def handle_search(self, ctx, query):
+        """Handle search command - pick one of several results"""
+        await handle_search(self, ctx, query)
+    
+    async def handle_seek(self, ctx, position):
+        """Handle seek command - jump within the current song"""
+        await handle_seek(self, ctx, position)
+    
+    async def handle_filter(self, ctx, preset):
+        """Handle filter command - toggle an audio filter preset"""
+        await handle_filter(self, ctx, preset)
+    
+    async def handle_gapless(self, ctx):
+        """Handle gapless command - toggle gapless transitions"""
+        await handle_gapless(self, ctx)
+    
+    async def handle_normalize(self, ctx):
+        """Handle normalize command - toggle loudness normalization"""
+        await handle_normalize(self, ctx)
+    
+    async def handle_bulk(self, ctx, attachment):
+        """Handle bulk command - queue a text file of URLs or search terms"""
+        await handle_bulk(self, ctx, attachment)
+    
+    async def handle_music_stats(self, ctx):
+        """Handle music_stats command - debug statistics"""
+        await handle_music_stats(self, ctx)
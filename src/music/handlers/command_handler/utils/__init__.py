@@ -6,6 +6,17 @@ from .handle_skip import handle_skip
 from .handle_queue import handle_queue
 from .handle_music_channel import handle_music_channel
 from .handle_repeat import handle_repeat
+from .handle_search import handle_search
+from .handle_music_stats import handle_music_stats
+from .handle_bulk import handle_bulk
+from .handle_gapless import handle_gapless
+from .handle_normalize import handle_normalize
+from .handle_seek import handle_seek
+from .handle_filter import handle_filter
+from .handle_remove import handle_remove
+from .handle_move import handle_move
+from .handle_shuffle import handle_shuffle
+from .handle_dedupe import handle_dedupe
 
 
 __all__ = [
@@ -17,4 +28,15 @@ __all__ = [
     "handle_queue",
     "handle_music_channel",
     "handle_repeat",
+    "handle_search",
+    "handle_music_stats",
+    "handle_bulk",
+    "handle_gapless",
+    "handle_normalize",
+    "handle_seek",
+    "handle_filter",
+    "handle_remove",
+    "handle_move",
+    "handle_shuffle",
+    "handle_dedupe",
 ]
\ No newline at end of file
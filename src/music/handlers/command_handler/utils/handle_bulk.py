@@ -0,0 +1,49 @@
+import logging
+import discord
+from ....utils import iter_attachment_lines
+
+logger = logging.getLogger('discord')
+
+async def handle_bulk(self, ctx, attachment):
+        """Handle bulk command - queue every line of a text attachment"""
+        guild_id = ctx.guild.id
+        
+        if attachment.content_type and not attachment.content_type.startswith('text/'):
+            await ctx.respond("❌ Please attach a text file with one URL or search term per line", ephemeral=True)
+            return
+        
+        # Join voice channel first
+        voice_client = await self.music_cog.voice_manager.join_voice_channel(ctx)
+        if voice_client is None:
+            return
+        
+        playlist_service = self.music_cog.playlist_service
+        try:
+            await ctx.respond(f"📥 Loading songs from `{attachment.filename}`...", ephemeral=True)
+            lines = iter_attachment_lines(attachment.url, max_lines=playlist_service.max_entries)
+            result = await playlist_service.import_lines(guild_id, lines, attachment.filename, ctx.author.id)
+        except ValueError as e:
+            await ctx.respond(f"❌ Error: {str(e)}", ephemeral=True)
+            return
+        except Exception as e:
+            logger.error(f"Error processing bulk request: {e}", exc_info=True)
+            await ctx.respond(f"❌ Error processing your request: {str(e)[:200]}", ephemeral=True)
+            return
+        
+        # Report what made it into the queue and what did not
+        cancelled = result.task.cancelled() or result.total is None
+        embed = discord.Embed(
+            title="⏹️ Bulk Import Cancelled" if cancelled else "✅ Bulk Import Finished",
+            description=f"{result.queued} songs from `{attachment.filename}` added to the queue",
+            color=discord.Color.orange() if cancelled or result.failures else discord.Color.green()
+        )
+        if result.reason:
+            embed.add_field(name="Stopped Early", value=result.reason, inline=False)
+        if result.failures:
+            failures = sorted(result.failures)
+            failure_text = "\n".join(f"Line {line_number}: `{line[:50]}` - {error[:80]}"
+                                     for line_number, line, error in failures[:10])
+            if len(failures) > 10:
+                failure_text += f"\n... and {len(failures) - 10} more"
+            embed.add_field(name=f"Failed ({len(failures)})", value=failure_text[:1024], inline=False)
+        await ctx.respond(embed=embed, ephemeral=True)
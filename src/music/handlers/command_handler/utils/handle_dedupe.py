@@ -0,0 +1,18 @@
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_dedupe(self, ctx):
+        """Handle dedupe command - remove songs that are already queued earlier"""
+        guild_id = ctx.guild.id
+        removed = self.music_cog.queue_manager.dedupe_queue(guild_id)
+        
+        if not removed:
+            await ctx.respond("No duplicate songs in the queue", ephemeral=True)
+            return
+        
+        self.music_cog.player_service.queue_reordered(guild_id)
+        await ctx.respond(f"🧹 Removed {removed} duplicate song{'s' if removed != 1 else ''} from the queue")
+        await self.music_cog.controller_service.update_controller(guild_id)
+        
+        logger.info(f"Removed {removed} duplicates from the queue in guild {guild_id}")
\ No newline at end of file
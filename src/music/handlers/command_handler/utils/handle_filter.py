@@ -0,0 +1,39 @@
+import discord
+import logging
+from ....utils import AUDIO_FILTERS
+
+logger = logging.getLogger('discord')
+
+async def handle_filter(self, ctx, preset):
+        """Handle filter command - toggle an audio filter preset, or turn them all off"""
+        guild_id = ctx.guild.id
+        
+        # Check if user is in a voice channel
+        if not ctx.author.voice:
+            await ctx.respond("You need to be in a voice channel to use this command!", ephemeral=True)
+            return
+        
+        preset = preset.strip().lower()
+        filter_manager = self.music_cog.player_service.filter_manager
+        if preset == 'off':
+            filters = await filter_manager.set_filters(guild_id, [])
+        elif preset in AUDIO_FILTERS:
+            filters = await filter_manager.toggle_filter(guild_id, preset)
+        else:
+            available = ", ".join(f"`{name}`" for name in AUDIO_FILTERS)
+            await ctx.respond(f"❌ Unknown filter. Available: {available}, or `off`", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="🎛️ Audio Filters",
+            description=("Active: **" + ", ".join(AUDIO_FILTERS[name]['label'] for name in filters) + "**"
+                         if filters else "All filters are **OFF**"),
+            color=discord.Color.blue()
+        )
+        
+        await ctx.respond(embed=embed)
+        
+        # Update controller to show the active filters
+        await self.music_cog.controller_service.update_controller(guild_id)
+        
+        logger.info(f"Audio filters set to {filters} in guild {guild_id}")
\ No newline at end of file
@@ -0,0 +1,26 @@
+import discord
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_gapless(self, ctx):
+        """Handle gapless command - toggle gapless transitions between songs"""
+        guild_id = ctx.guild.id
+        
+        # Check if user is in a voice channel
+        if not ctx.author.voice:
+            await ctx.respond("You need to be in a voice channel to use this command!", ephemeral=True)
+            return
+        
+        enabled = self.music_cog.player_service.gapless_manager.toggle(guild_id)
+        
+        embed = discord.Embed(
+            title="🎼 Gapless Playback",
+            description=("Gapless playback is now **ON**, the next song is prepared before the current one ends"
+                         if enabled else "Gapless playback is now **OFF**"),
+            color=discord.Color.blue()
+        )
+        
+        await ctx.respond(embed=embed)
+        
+        logger.info(f"Gapless playback {'enabled' if enabled else 'disabled'} in guild {guild_id}")
\ No newline at end of file
@@ -0,0 +1,23 @@
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_move(self, ctx, from_position, to_position):
+        """Handle move command - move a queued song to another position (positions as shown by /queue)"""
+        guild_id = ctx.guild.id
+        queue_manager = self.music_cog.queue_manager
+        length = len(queue_manager.get_queue(guild_id))
+        
+        if not 1 <= from_position <= length:
+            await ctx.respond(f"❌ There is no song at position {from_position} (the queue has {length} songs)",
+                              ephemeral=True)
+            return
+        
+        to_position = min(max(to_position, 1), length)
+        song = queue_manager.move_song(guild_id, from_position - 1, to_position - 1)
+        
+        self.music_cog.player_service.queue_reordered(guild_id)
+        await ctx.respond(f"↕️ Moved **{song['title']}** to position {to_position}")
+        await self.music_cog.controller_service.update_controller(guild_id)
+        
+        logger.info(f"Moved '{song['title']}' from {from_position} to {to_position} in guild {guild_id}")
\ No newline at end of file
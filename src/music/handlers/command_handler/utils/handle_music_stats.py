@@ -0,0 +1,77 @@
+import logging
+import discord
+from ....utils import get_singleflight_stats, TRACK_CATALOG
+
+logger = logging.getLogger('discord')
+
+def format_stats(stats):
+    """Format a flat stats dict as one 'key: value' line per entry"""
+    return "\n".join(f"{key}: {value}" for key, value in stats.items()) or "No data"
+
+async def handle_music_stats(self, ctx):
+        """Handle music_stats command - show extraction and cache statistics"""
+        try:
+            music_cog = self.music_cog
+            source_manager = music_cog.player_service.source_manager
+            extractor_stats = music_cog.extractor.get_stats()
+            player_clients = extractor_stats.pop('player_clients')
+            profiles = extractor_stats.pop('profiles')
+            
+            embed = discord.Embed(
+                title="📊 Music Statistics",
+                color=discord.Color.blue()
+            )
+            embed.add_field(name="Extractor Pool", value=format_stats(extractor_stats), inline=True)
+            embed.add_field(
+                name="Extraction Time",
+                value="\n".join(f"{profile}: {stats['jobs']} jobs, {stats['avg_seconds']}s avg"
+                                for profile, stats in profiles.items()) or "No data",
+                inline=True
+            )
+            embed.add_field(
+                name="Player Clients",
+                value="\n".join(
+                    f"{client}: {stats['latency']}s, {stats['error_rate']:.0%} errors"
+                    f"{' (breaker open)' if stats['breaker_open'] else ''}"
+                    for client, stats in player_clients.items()) or "No data",
+                inline=False
+            )
+            embed.add_field(name="Shared Extractions", value=format_stats(get_singleflight_stats()), inline=True)
+            embed.add_field(name="Stream Cache", value=format_stats(music_cog.stream_cache.get_stats()), inline=True)
+            embed.add_field(name="Metadata Cache", value=format_stats(music_cog.metadata_cache.get_stats()), inline=True)
+            embed.add_field(name="Audio Cache", value=format_stats(music_cog.audio_cache.get_stats()), inline=True)
+            embed.add_field(name="Queue", value=format_stats(music_cog.queue_manager.get_queue_stats(ctx.guild.id)),
+                            inline=True)
+            embed.add_field(name="Tracks (all guilds)", value=format_stats(TRACK_CATALOG.get_stats()), inline=True)
+            embed.add_field(name="Queue Journal",
+                            value=format_stats(music_cog.persistence_service.get_stats()), inline=True)
+            embed.add_field(name="Prefetch", value=format_stats(music_cog.player_service.prefetch_stats), inline=True)
+            embed.add_field(name="Player Commands",
+                            value=format_stats(music_cog.player_service.get_actor_stats(ctx.guild.id)), inline=True)
+            embed.add_field(name="Controller Edits",
+                            value=format_stats(music_cog.controller_service.get_render_stats()), inline=True)
+            embed.add_field(name="Playback Sources", value=format_stats(music_cog.player_service.playback_stats), inline=True)
+            embed.add_field(name="Volume Stage",
+                            value=format_stats(source_manager.get_gain_stats()), inline=True)
+            embed.add_field(name="Jitter Buffer",
+                            value=format_stats(source_manager.get_buffer_stats(ctx.guild.id)), inline=True)
+            embed.add_field(name="Track Transitions",
+                            value=format_stats(music_cog.player_service.gapless_manager.gap_stats.get_stats()), inline=True)
+            sender_stats = music_cog.player_service.get_sender_stats(ctx.guild.id)
+            if sender_stats is not None:
+                embed.add_field(name="Shared Sender", value=format_stats(sender_stats), inline=True)
+            if music_cog.voice_manager.audio_nodes is not None:
+                embed.add_field(name="Audio Nodes (guilds)",
+                                value=format_stats(music_cog.voice_manager.audio_nodes.get_stats()), inline=True)
+            restarts = music_cog.player_service.restart_stats.get_stats()
+            embed.add_field(name="Restarts (seek/filter/volume)",
+                            value=f"{restarts['transitions']} timed, {restarts['avg_gap_ms']} ms avg to first frame, "
+                                  f"{restarts['max_gap_ms']} ms max, {restarts['over_target']} over 1 s",
+                            inline=True)
+            embed.add_field(name="Bandwidth (this session)",
+                            value=format_stats(source_manager.get_bandwidth_stats(ctx.guild.id)), inline=True)
+            
+            await ctx.respond(embed=embed, ephemeral=True)
+        except Exception as e:
+            logger.error(f"Error displaying music stats: {e}", exc_info=True)
+            await ctx.respond("⚠️ There was an error displaying the statistics.", ephemeral=True)
@@ -0,0 +1,27 @@
+import discord
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_normalize(self, ctx):
+        """Handle normalize command - toggle loudness normalization"""
+        guild_id = ctx.guild.id
+        
+        # Check if user is in a voice channel
+        if not ctx.author.voice:
+            await ctx.respond("You need to be in a voice channel to use this command!", ephemeral=True)
+            return
+        
+        enabled = self.music_cog.player_service.source_manager.toggle_normalize(guild_id)
+        
+        embed = discord.Embed(
+            title="🔊 Loudness Normalization",
+            description=("Normalization is now **ON** from the next song. Songs are measured the first time "
+                         "they play and evened out after that"
+                         if enabled else "Normalization is now **OFF** from the next song"),
+            color=discord.Color.blue()
+        )
+        
+        await ctx.respond(embed=embed)
+        
+        logger.info(f"Loudness normalization {'enabled' if enabled else 'disabled'} in guild {guild_id}")
\ No newline at end of file
@@ -32,7 +32,8 @@ async def handle_queue(self, ctx):
             if queue:
                 queue_text = ""
                 for i, song in enumerate(queue[:10]):
-                    queue_text += f"{i+1}. [{song['title']}]({song['webpage_url']})\n"
+                    requester = f" - <@{song['requester']}>" if song.get('requester') else ""
+                    queue_text += f"{i+1}. [{song['title']}]({song['webpage_url']}){requester}\n"
                 
                 if len(queue) > 10:
                     queue_text += f"\n... and {len(queue) - 10} more songs"
@@ -0,0 +1,23 @@
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_remove(self, ctx, position):
+        """Handle remove command - take the song at a queue position (as shown by /queue) off the queue"""
+        guild_id = ctx.guild.id
+        queue_manager = self.music_cog.queue_manager
+        
+        try:
+            if position < 1:
+                raise IndexError(position)
+            song = queue_manager.remove_at(guild_id, position - 1)
+        except IndexError:
+            await ctx.respond(f"❌ There is no song at position {position} (the queue has "
+                              f"{len(queue_manager.get_queue(guild_id))} songs)", ephemeral=True)
+            return
+        
+        self.music_cog.player_service.queue_reordered(guild_id)
+        await ctx.respond(f"🗑️ Removed **{song['title']}** from the queue")
+        await self.music_cog.controller_service.update_controller(guild_id)
+        
+        logger.info(f"Removed '{song['title']}' (position {position}) from the queue in guild {guild_id}")
\ No newline at end of file
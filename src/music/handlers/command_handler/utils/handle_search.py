@@ -0,0 +1,26 @@
+import logging
+from ....utils.controller.utils import SearchResultsView, build_search_embed
+
+logger = logging.getLogger('discord')
+
+async def handle_search(self, ctx, query):
+        """Handle search command"""
+        guild_id = ctx.guild.id
+        
+        # Join voice channel first
+        voice_client = await self.music_cog.voice_manager.join_voice_channel(ctx)
+        if voice_client is None:
+            return
+        
+        try:
+            await ctx.respond("🔍 Searching...", ephemeral=True)
+            songs = await self.music_cog.player_service.search(guild_id, query)
+            if not songs:
+                await ctx.respond("❌ No results found", ephemeral=True)
+                return
+            
+            view = SearchResultsView(self.music_cog, guild_id, ctx.author.id, songs)
+            await ctx.respond(embed=build_search_embed(query, songs), view=view, ephemeral=True)
+        except Exception as e:
+            logger.error(f"Error searching for '{query}': {e}", exc_info=True)
+            await ctx.respond(f"❌ Error processing your request: {str(e)[:200]}", ephemeral=True)
@@ -0,0 +1,27 @@
+import logging
+from ....utils import format_duration, parse_time
+
+logger = logging.getLogger('discord')
+
+async def handle_seek(self, ctx, position):
+        """Handle seek command - jump to a time, or move by +/- seconds"""
+        guild_id = ctx.guild.id
+        seek_manager = self.music_cog.player_service.seek_manager
+        
+        text = position.strip()
+        try:
+            if text[:1] in '+-' and text[1:]:
+                offset = parse_time(text[1:])
+                new_position = await seek_manager.seek_by(guild_id, offset if text[0] == '+' else -offset)
+            else:
+                new_position = await seek_manager.seek(guild_id, parse_time(text))
+        except ValueError:
+            await ctx.respond("❌ Use a time like `1:23` or `83`, or `+10`/`-10` to move from here", ephemeral=True)
+            return
+        
+        if new_position is None:
+            await ctx.respond("Nothing to seek in (not playing, or a live stream)", ephemeral=True)
+            return
+        
+        await ctx.respond(f"⏩ Jumped to {format_duration(new_position) if new_position >= 1 else '0:00'}")
+        logger.info(f"Seeked to {new_position:.0f}s in guild {guild_id}")
\ No newline at end of file
@@ -0,0 +1,21 @@
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_shuffle(self, ctx):
+        """Handle shuffle command - shuffle the songs waiting in the queue"""
+        guild_id = ctx.guild.id
+        queue_manager = self.music_cog.queue_manager
+        length = len(queue_manager.get_queue(guild_id))
+        
+        if length < 2:
+            await ctx.respond("There is nothing to shuffle, add more songs first", ephemeral=True)
+            return
+        
+        queue_manager.shuffle_queue(guild_id)
+        
+        self.music_cog.player_service.queue_reordered(guild_id)
+        await ctx.respond(f"🔀 Shuffled {length} songs")
+        await self.music_cog.controller_service.update_controller(guild_id)
+        
+        logger.info(f"Shuffled {length} songs in guild {guild_id}")
\ No newline at end of file
@@ -6,7 +6,8 @@ from .utils import (check_empty_voice_channel,
                    handle_user_leave,
                    handle_user_move,
                    handle_bot_voice_update,
-                   force_disconnect)
+                   force_disconnect,
+                   handle_channel_update)
 
 logger = logging.getLogger('discord')
 
@@ -19,6 +20,10 @@ class EventHandlers:
         """Handle voice state changes"""
         await handle_voice_state_update(self, member, before, after)
     
+    async def handle_channel_update(self, before, after):
+        """Handle channel setting changes (voice bitrate)"""
+        await handle_channel_update(self, before, after)
+    
     async def _handle_bot_voice_update(self, member, before, after):
         """Handle the bot's own voice state updates"""
         await handle_bot_voice_update(self, member, before, after)
@@ -5,6 +5,7 @@ from .handle_user_leave import handle_user_leave
 from .handle_user_move import handle_user_move
 from .handle_bot_voice_update import handle_bot_voice_update
 from .force_disconnect import force_disconnect
+from .handle_channel_update import handle_channel_update
 
 __all__ = [
     'check_empty_voice_channel',
@@ -14,6 +15,7 @@ __all__ = [
     'handle_user_move',
     'handle_bot_voice_update',
     'force_disconnect',
+    'handle_channel_update',
     'check_empty_voice_channel'
 
 ]
\ No newline at end of file
@@ -8,7 +8,7 @@ async def force_disconnect(self, guild_id):
             if voice_client:
                 await voice_client.disconnect()
                 self.music_cog.voice_manager.clear_voice_client(guild_id)
-                self.music_cog.queue_manager.clear_guild_data(guild_id)
+                self.music_cog.player_service.cleanup(guild_id)
                 
                 # Update controller if needed
                 await self.music_cog.controller_service.update_controller(guild_id)
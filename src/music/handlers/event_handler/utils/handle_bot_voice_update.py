@@ -15,7 +15,7 @@ async def handle_bot_voice_update(self, member, before, after):
                 
                 # Clear data
                 self.music_cog.voice_manager.clear_voice_client(guild_id)
-                self.music_cog.queue_manager.clear_guild_data(guild_id)
+                self.music_cog.player_service.cleanup(guild_id)
                 
                 # Clear any auto-disconnect timers
                 self.music_cog.auto_disconnect_service.clear_timer(guild_id)
@@ -28,6 +28,9 @@ async def handle_bot_voice_update(self, member, before, after):
                 guild_id = after.channel.guild.id
                 logger.info(f"Bot was moved to a different voice channel in guild {guild_id}")
                 
+                # Match the new channel's bitrate
+                await self.music_cog.player_service.source_manager.update_bitrate(guild_id, after.channel)
+                
                 # Check if the channel is empty except for bots
                 human_members = [m for m in after.channel.members if not m.bot]
                 if len(human_members) == 0:
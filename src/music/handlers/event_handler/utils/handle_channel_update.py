@@ -0,0 +1,19 @@
+import logging
+
+logger = logging.getLogger('discord')
+
+async def handle_channel_update(self, before, after):
+        """Handle channel setting changes - follow bitrate changes of the bot's voice channel"""
+        try:
+            if getattr(before, 'bitrate', None) == getattr(after, 'bitrate', None):
+                return
+            
+            guild_id = after.guild.id
+            voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+            if not voice_client or not voice_client.channel or voice_client.channel.id != after.id:
+                return
+            
+            logger.info(f"Voice channel bitrate changed to {after.bitrate // 1000} kbps in guild {guild_id}")
+            await self.music_cog.player_service.source_manager.update_bitrate(guild_id, after)
+        except Exception as e:
+            logger.error(f"Error handling channel update: {e}", exc_info=True)
\ No newline at end of file
@@ -1,20 +1,23 @@
 import discord
-from discord.ext import commands, bridge
+from discord.ext import commands, bridge, tasks
 import logging
-import yt_dlp
 
 import json
 import os
 
 from .services.player_service import PlayerService
+from .services.playlist_service import PlaylistService
 from .services.controller_service import ControllerService
 from .services.auto_disconnect_service import AutoDisconnectService
+from .services.persistence_service import PersistenceService
 from .handlers import CommandHandlers, EventHandlers 
 
 from .utils import (
-    get_ytdlp_options, get_ffmpeg_options,
-    QueueManager, VoiceManager
+    get_ffmpeg_options, get_ytdlp_options,
+    QueueManager, VoiceManager, ExtractorPool, PlayerClientSelector, StreamCache, MetadataCache, AudioCache,
+    SendScheduler, NodePool
 )
+from .utils.node_protocol import get_node_token
 
 # Define data directory path
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
@@ -24,6 +27,12 @@ os.makedirs(DATA_DIR, exist_ok=True)
 # Path for music controller storage
 CONTROLLER_CONFIG_PATH = os.path.join(DATA_DIR, "music_controllers.json")
 
+# Directory for cached song audio
+AUDIO_CACHE_DIR = os.path.join(DATA_DIR, "audio_cache")
+
+# Directory for the queue journal and snapshots
+QUEUE_JOURNAL_DIR = os.path.join(DATA_DIR, "queue_journal")
+
 logger = logging.getLogger('discord')
 
 class Music(commands.Cog):
@@ -32,11 +41,27 @@ class Music(commands.Cog):
         
         # Initialize managers
         self.queue_manager = QueueManager()
-        self.voice_manager = VoiceManager()
         
-        # yt-dlp setup
-        self.ytdl_options = get_ytdlp_options()
-        self.ytdl = yt_dlp.YoutubeDL(self.ytdl_options)
+        # Opt-in (MUSIC_AUDIO_NODES in .env, comma-separated socket paths or host:port): ffmpeg, Opus
+        # and voice sending run in audio node processes (python -m src.music.node) instead of here.
+        # MUSIC_AUDIO_NODE_TOKEN is the secret the nodes expect, it is required for host:port nodes.
+        node_addresses = [address.strip() for address in os.getenv('MUSIC_AUDIO_NODES', '').split(',') if address.strip()]
+        self.voice_manager = VoiceManager(NodePool(node_addresses, get_node_token()) if node_addresses else None)
+        
+        # yt-dlp setup (dedicated pool of warm extractors)
+        player_clients = get_ytdlp_options()['extractor_args']['youtube']['player_client']
+        self.client_selector = PlayerClientSelector(player_clients)
+        self.extractor = ExtractorPool(client_selector=self.client_selector)
+        self.stream_cache = StreamCache()
+        self.metadata_cache = MetadataCache()
+        
+        # Opus audio of played songs, kept on disk for repeat plays
+        self.audio_cache = AudioCache(AUDIO_CACHE_DIR)
+        
+        # Opt-in (MUSIC_SENDER_THREADS in .env): a few shared threads send audio for every
+        # guild instead of one py-cord player thread per voice client
+        sender_threads = int(os.getenv('MUSIC_SENDER_THREADS', '0'))
+        self.send_scheduler = SendScheduler(sender_threads) if sender_threads > 0 else None
         
         # FFmpeg setup
         self.ffmpeg_options = get_ffmpeg_options()
@@ -44,25 +69,65 @@ class Music(commands.Cog):
         # Initialize services
         self.controller_service = ControllerService(self)
         self.player_service = PlayerService(self)
+        self.playlist_service = PlaylistService(self)
         self.auto_disconnect_service = AutoDisconnectService(self)
         
+        # Queues survive restarts: changes are journaled to disk and restored on startup
+        self.persistence_service = PersistenceService(self, QUEUE_JOURNAL_DIR)
+        
         # Initialize handlers
         self.command_handlers = CommandHandlers(self)
         self.event_handlers = EventHandlers(self)
         
+        # Start background tasks
+        self.save_caches.start()
+        self.save_queues.start()
+        bot.loop.create_task(self.persistence_service.restore())
+        
         logger.info("Music cog loaded with commands")
     
+    def cog_unload(self):
+        """Stop background workers when the cog is unloaded"""
+        self.save_caches.cancel()
+        self.save_queues.cancel()
+        self.metadata_cache.save()
+        self.persistence_service.close()
+        self.extractor.shutdown()
+    
+    @tasks.loop(minutes=5)
+    async def save_caches(self):
+        """Periodically persist the metadata cache"""
+        await self.metadata_cache.flush()
+    
+    @tasks.loop(seconds=5)
+    async def save_queues(self):
+        """Write queue changes and voice positions to the journal (write-behind)"""
+        await self.persistence_service.flush()
+    
     # Event listener (delegate to event handler)
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """Handle voice state changes"""
         await self.event_handlers.handle_voice_state_update(member, before, after)
     
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        """Handle channel setting changes"""
+        await self.event_handlers.handle_channel_update(before, after)
+    
     # Command definitions (delegate to command handlers)
     @bridge.bridge_command(name="play", description="Play a song or playlist from YouTube")
     async def play(self, ctx, *, url: str):
         await self.command_handlers.handle_play(ctx, url)
     
+    @bridge.bridge_command(name="search", description="Search YouTube and pick a song from the results")
+    async def search(self, ctx, *, query: str):
+        await self.command_handlers.handle_search(ctx, query)
+    
+    @bridge.bridge_command(name="bulk", description="Queue a text file of YouTube URLs or search terms, one per line")
+    async def bulk(self, ctx, attachment: discord.Attachment):
+        await self.command_handlers.handle_bulk(ctx, attachment)
+    
     @bridge.bridge_command(name="stop", description="Stop playback and clear the queue")
     async def stop(self, ctx):
         await self.command_handlers.handle_stop(ctx)
@@ -71,10 +136,30 @@ class Music(commands.Cog):
     async def skip(self, ctx):
         await self.command_handlers.handle_skip(ctx)
     
+    @bridge.bridge_command(name="seek", description="Jump to a time in the current song (1:23), or move by +10/-10 seconds")
+    async def seek(self, ctx, *, position: str):
+        await self.command_handlers.handle_seek(ctx, position)
+    
     @bridge.bridge_command(name="queue", description="Show the current music queue")
     async def queue(self, ctx):
         await self.command_handlers.handle_queue(ctx)
     
+    @bridge.bridge_command(name="remove", description="Remove the song at a position in the queue (as shown by /queue)")
+    async def remove(self, ctx, position: int):
+        await self.command_handlers.handle_remove(ctx, position)
+    
+    @bridge.bridge_command(name="move", description="Move a song in the queue to another position")
+    async def move(self, ctx, from_position: int, to_position: int):
+        await self.command_handlers.handle_move(ctx, from_position, to_position)
+    
+    @bridge.bridge_command(name="shuffle", description="Shuffle the songs in the queue")
+    async def shuffle(self, ctx):
+        await self.command_handlers.handle_shuffle(ctx)
+    
+    @bridge.bridge_command(name="dedupe", description="Remove songs that are already in the queue")
+    async def dedupe(self, ctx):
+        await self.command_handlers.handle_dedupe(ctx)
+    
     @bridge.bridge_command(name="leave", description="Leave the voice channel")
     async def leave(self, ctx):
         await self.command_handlers.handle_leave(ctx)
@@ -92,9 +177,26 @@ class Music(commands.Cog):
         else:
             await ctx.respond("⚠️ There was an error setting up the music controller.", ephemeral=True)
     
+    @commands.has_permissions(manage_guild=True)
+    @bridge.bridge_command(name="music_stats", description="Show extraction and cache statistics (debug)")
+    async def music_stats(self, ctx):
+        await self.command_handlers.handle_music_stats(ctx)
+    
     @bridge.bridge_command(name="repeat", description="Toggle repeat mode: off -> one song -> all songs -> off")
     async def repeat(self, ctx):
         await self.command_handlers.handle_repeat(ctx)
+    
+    @bridge.bridge_command(name="filter", description="Toggle an audio filter: bassboost, nightcore, vaporwave, speed, slow, 8d, or off")
+    async def filter(self, ctx, preset: str):
+        await self.command_handlers.handle_filter(ctx, preset)
+    
+    @bridge.bridge_command(name="gapless", description="Toggle gapless playback: prepare the next song before this one ends")
+    async def gapless(self, ctx):
+        await self.command_handlers.handle_gapless(ctx)
+    
+    @bridge.bridge_command(name="normalize", description="Toggle loudness normalization so songs play at a similar volume")
+    async def normalize(self, ctx):
+        await self.command_handlers.handle_normalize(ctx)
 
 
 def setup(bot):
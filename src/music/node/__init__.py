@@ -0,0 +1,4 @@
+from .server import AudioNodeServer, NodeSession
+from .stand_in import StandInNodeServer, StandInSession
+
+__all__ = ['AudioNodeServer', 'NodeSession', 'StandInNodeServer', 'StandInSession']
\ No newline at end of file
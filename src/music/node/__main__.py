@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import logging
+
+from ..utils.node_protocol import DEFAULT_NODE_ADDRESS, get_node_token
+from .server import AudioNodeServer
+from .stand_in import StandInNodeServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio node for the music cog: plays audio for the bot in its own process")
+    parser.add_argument('--address', default=DEFAULT_NODE_ADDRESS,
+                        help="unix socket path or host:port to listen on (set MUSIC_AUDIO_NODES to the same value)")
+    parser.add_argument('--token', default=get_node_token(),
+                        help="shared secret the bot must present (default: MUSIC_AUDIO_NODE_TOKEN), required for TCP")
+    parser.add_argument('--stand-in', action='store_true',
+                        help="simulate playback without Discord or ffmpeg (for testing the bot side)")
+    parser.add_argument('--speed', type=float, default=1.0, help="how much faster than real time stand-in tracks run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if args.stand_in:
+        server = StandInNodeServer(args.address, speed=args.speed, token=args.token)
+    else:
+        server = AudioNodeServer(args.address, token=args.token)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
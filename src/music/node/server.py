@@ -0,0 +1,360 @@
+import asyncio
+import logging
+
+import aiohttp
+import discord
+
+from ..utils import get_ffmpeg_options, TrackedAudio, BufferedAudio, GainAudio
+from ..utils.node_protocol import (encode_message, read_message, start_node_server, DEFAULT_NODE_ADDRESS,
+                                   FFMPEG_PROTOCOL_WHITELIST, check_token, check_track_url, is_tcp_address)
+
+logger = logging.getLogger('discord')
+
+
+class _NodeState:
+    """The parts of py-cord's ConnectionState a VoiceClient uses, without a gateway"""
+
+    def __init__(self, loop, user_id):
+        self.loop = loop
+        self.user = discord.Object(user_id)
+        self.http = self
+        self._session = None
+
+    async def ws_connect(self, url, *, compress=0):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return await self._session.ws_connect(url, max_msg_size=0, timeout=30.0, autoclose=False,
+                                              compress=compress)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class _NodeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+    def get_channel(self, channel_id):
+        return _NodeChannel(channel_id, self)
+
+
+class _NodeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+
+    def _get_voice_client_key(self):
+        return self.guild.id, 'guild_id'
+
+
+class _NodeClient:
+    def __init__(self, state):
+        self._connection = state
+
+
+class NodeVoice(discord.VoiceClient):
+    """py-cord's VoiceClient (websocket, UDP, encryption) running in the audio node.
+
+    The gateway is in the bot, so joining, leaving and re-joining a channel
+    are turned into events the bot acts on, and voice updates arrive from
+    the bot over the control connection.
+    """
+
+    def __init__(self, session, channel):
+        state = _NodeState(asyncio.get_running_loop(), session.user_id)
+        super().__init__(_NodeClient(state), channel)
+        self.session = session
+
+    async def connect(self, *, reconnect, timeout):
+        await super().connect(reconnect=reconnect, timeout=timeout)
+        self.session.emit('ready')
+
+    async def voice_connect(self):
+        self.session.emit('voice_connect', channel_id=self.channel.id)
+
+    async def voice_disconnect(self):
+        self.session.emit('voice_disconnect')
+
+    def cleanup(self):
+        self.session._voice_closed()
+
+
+class NodeSession:
+    """One guild's voice connection and current track on the audio node"""
+
+    def __init__(self, server, connection, guild_id, user_id):
+        self.server = server
+        self.connection = connection  # writer of the bot connection that owns the session
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.voice = None
+        self.track_id = None
+        self.track = None
+        self.source = None
+        self.volume = 1.0
+        self.closed = False
+        self._connect_task = None
+
+    def emit(self, kind, **fields):
+        """Send an event for this guild to the bot"""
+        if self.connection.is_closing():
+            return
+        self.connection.write(encode_message({'op': 'event', 'type': kind, 'guild_id': self.guild_id, **fields}))
+
+    async def connect(self, channel_id, timeout=30):
+        channel = _NodeChannel(channel_id, _NodeGuild(self.guild_id))
+        self.voice = NodeVoice(self, channel)
+        self._connect_task = asyncio.create_task(self._connect(timeout))
+
+    async def _connect(self, timeout):
+        """Run py-cord's handshake, it waits for the voice updates the bot forwards"""
+        try:
+            await self.voice.connect(reconnect=True, timeout=timeout)
+        except Exception as e:
+            logger.error(f"Audio node could not connect to voice in guild {self.guild_id}: {e}")
+            self._voice_closed(str(e))
+
+    async def voice_state(self, data):
+        await self.voice.on_voice_state_update(data)
+
+    async def voice_server(self, data):
+        await self.voice.on_voice_server_update(data)
+
+    def _create_source(self, track, start):
+        """Build the same source chain the bot builds for in-process playback"""
+        check_track_url(track['url'])
+        ffmpeg_options = get_ffmpeg_options(start=start, filters=track['filters'])
+        ffmpeg_options['before_options'] = (f"{ffmpeg_options.get('before_options', '')} "
+                                            f"-protocol_whitelist {FFMPEG_PROTOCOL_WHITELIST}").strip()
+        if track['mode'] == 'pcm':
+            source = BufferedAudio(discord.FFmpegPCMAudio(track['url'], **ffmpeg_options),
+                                   stats=self.server.buffer_stats)
+            source = GainAudio(source, volume=track['volume'], normalization=track['normalization'],
+                               stats=self.server.gain_stats)
+        else:
+            source = BufferedAudio(discord.FFmpegOpusAudio(track['url'], bitrate=track['bitrate'],
+                                                           codec='opus' if track['mode'] == 'passthrough' else None,
+                                                           **ffmpeg_options),
+                                   stats=self.server.buffer_stats)
+        return TrackedAudio(source, offset=start, bitrate=track['bitrate'], passthrough=track['mode'] == 'passthrough',
+                            speed=track['speed'])
+
+    async def play(self, track_id, track):
+        check_track_url(track['url'])
+        if self.voice is None or not self.voice.is_connected():
+            raise RuntimeError('Not connected to voice.')
+        if self.voice.is_playing() or self.voice.is_paused():
+            self.voice.stop()  # the old track's end event is sent by its after callback
+        loop = asyncio.get_running_loop()
+        source = await loop.run_in_executor(None, self._create_source, track, track['start'])
+        self.track_id, self.track, self.source = track_id, track, source
+        self.volume = track['volume']
+        self.voice.play(source, after=lambda error: loop.call_soon_threadsafe(self._ended, track_id, source, error))
+
+    def _ended(self, track_id, source, error):
+        self.emit('track_end', track_id=track_id, frames=source.frames, offset=source.offset,
+                  error=str(error) if error else None)
+        if self.track_id == track_id:
+            self.track_id = self.track = self.source = None
+
+    async def stop(self, track_id=None):
+        if self.voice and (track_id is None or track_id == self.track_id):
+            self.voice.stop()
+
+    async def pause(self):
+        if self.voice:
+            self.voice.pause()
+
+    async def resume(self):
+        if self.voice:
+            self.voice.resume()
+
+    async def seek(self, position):
+        """Swap in a source starting at `position`, the track keeps its id"""
+        if self.source is None:
+            raise RuntimeError('Nothing is playing.')
+        old_source, track_id = self.source, self.track_id
+        loop = asyncio.get_running_loop()
+        source = await loop.run_in_executor(None, self._create_source, dict(self.track, volume=self.volume), position)
+        if self.track_id != track_id or self.voice._player is None:
+            # The track ended while ffmpeg was starting
+            loop.run_in_executor(None, source.cleanup)
+            return
+        self.source = source
+        self.voice.source = source  # picked up by the player thread on its next frame
+        loop.run_in_executor(None, old_source.cleanup)
+        # The after callback reports the frames of the new source
+        self.voice._player.after = lambda error: loop.call_soon_threadsafe(self._ended, track_id, source, error)
+
+    async def set_volume(self, volume):
+        self.volume = volume
+        if self.source is not None and isinstance(self.source.original, GainAudio):
+            self.source.original.volume = volume
+
+    async def set_bitrate(self, bitrate):
+        if self.voice is None or not discord.opus.is_loaded():
+            return
+        if not self.voice.encoder:
+            self.voice.encoder = discord.opus.Encoder()
+        self.voice.encoder.set_bitrate(bitrate)
+        if self.source is not None:
+            self.source.bitrate = bitrate
+
+    def get_progress(self):
+        """Get the current track's progress, or None if nothing is playing"""
+        if self.source is None or not self.voice.is_playing():
+            return None
+        return {'track_id': self.track_id, 'frames': self.source.frames, 'offset': self.source.offset}
+
+    async def destroy(self):
+        if self._connect_task and not self._connect_task.done():
+            self._connect_task.cancel()
+        if self.voice is not None:
+            await self.voice.disconnect(force=True)
+            await self.voice._state.close()
+        self._voice_closed()
+
+    def _voice_closed(self, reason=None):
+        """The voice connection is gone for good, drop the session"""
+        if self.closed:
+            return
+        self.closed = True
+        self.server.sessions.pop(self.guild_id, None)
+        self.emit('voice_closed', reason=reason or 'disconnected')
+
+    def get_stats(self):
+        return {'connected': bool(self.voice and self.voice.is_connected()),
+                'playing': self.source is not None,
+                'frames': self.source.frames if self.source is not None else 0}
+
+
+class AudioNodeServer:
+    """Process that owns ffmpeg, Opus and the voice UDP for the bot's guilds.
+
+    The bot connects over a local socket (node_protocol) and drives one
+    session per guild with requests; the node answers each one and reports
+    progress, track ends and lost connections as events. A connection must
+    open with a hello carrying the node's token, a TCP node refuses to start
+    without one.
+    """
+
+    session_class = NodeSession
+    mode = 'voice'
+
+    def __init__(self, address=DEFAULT_NODE_ADDRESS, progress_interval=5, token=None):
+        self.address = address
+        self.token = token  # shared secret the bot must send in its hello
+        self.progress_interval = progress_interval
+        self.sessions = {}  # guild_id: session
+        self.buffer_stats = {'underruns': 0, 'stalls': 0, 'grown': 0, 'shrunk': 0}
+        self.gain_stats = {'frames': 0, 'seconds': 0.0}
+        self.server = None
+        self._progress_task = None
+
+    async def start(self):
+        if self.token is None and is_tcp_address(self.address):
+            raise RuntimeError("An audio node listening on TCP needs a token (MUSIC_AUDIO_NODE_TOKEN or --token)")
+        self.server = await start_node_server(self._handle_connection, self.address)
+        self._progress_task = asyncio.create_task(self._report_progress())
+        logger.info(f"Audio node ({self.mode} mode) listening on {self.address}")
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self._progress_task:
+            self._progress_task.cancel()
+        for session in list(self.sessions.values()):
+            await session.destroy()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        """Answer the requests of one bot connection, its sessions end with it"""
+        authenticated = False
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                reply = {'op': 'reply', 'id': message.get('id')}
+                if not authenticated:
+                    if message.get('op') != 'hello' or not check_token(self.token, message.get('token')):
+                        logger.warning("Audio node refused a connection without a valid hello")
+                        writer.write(encode_message(dict(reply, ok=False, error='Not authenticated')))
+                        await writer.drain()
+                        break
+                    authenticated = True
+                try:
+                    reply.update(await self._dispatch(writer, message) or {}, ok=True)
+                except Exception as e:
+                    logger.error(f"Audio node request '{message.get('op')}' failed: {e}")
+                    reply.update(ok=False, error=str(e))
+                writer.write(encode_message(reply))
+                await writer.drain()
+        except (OSError, ConnectionError, ValueError) as e:
+            logger.error(f"Audio node lost a bot connection: {e}")
+        finally:
+            writer.close()
+            for session in [s for s in self.sessions.values() if s.connection is writer]:
+                await session.destroy()
+
+    async def _dispatch(self, writer, message):
+        op = message.get('op')
+        guild_id = message.get('guild_id')
+        if op == 'hello':
+            return {'mode': self.mode, 'sessions': len(self.sessions)}
+        if op == 'stats':
+            return {'sessions': {guild: session.get_stats() for guild, session in self.sessions.items()},
+                    'buffer': self.buffer_stats}
+        if op == 'connect':
+            old_session = self.sessions.pop(guild_id, None)
+            if old_session is not None:
+                await old_session.destroy()
+            session = self.session_class(self, writer, guild_id, message['user_id'])
+            self.sessions[guild_id] = session
+            await session.connect(message['channel_id'], message.get('timeout', 30))
+            return None
+
+        session = self.sessions.get(guild_id)
+        if session is None:
+            if op in ('destroy', 'stop'):
+                return None
+            raise RuntimeError(f"No session for guild {guild_id}")
+        if op == 'voice_state':
+            await session.voice_state(message['data'])
+        elif op == 'voice_server':
+            await session.voice_server(message['data'])
+        elif op == 'play':
+            await session.play(message['track_id'], message['track'])
+        elif op == 'stop':
+            await session.stop(message.get('track_id'))
+        elif op == 'pause':
+            await session.pause()
+        elif op == 'resume':
+            await session.resume()
+        elif op == 'seek':
+            await session.seek(message['position'])
+        elif op == 'volume':
+            await session.set_volume(message['volume'])
+        elif op == 'bitrate':
+            await session.set_bitrate(message['bitrate'])
+        elif op == 'destroy':
+            await session.destroy()
+        else:
+            raise ValueError(f"Unknown request '{op}'")
+        return None
+
+    async def _report_progress(self):
+        """Tell the bot how far each track got, so positions stay accurate"""
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            for session in list(self.sessions.values()):
+                progress = session.get_progress()
+                if progress is not None:
+                    session.emit('progress', **progress)
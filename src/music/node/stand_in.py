@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+from .server import AudioNodeServer, NodeSession
+
+FRAME_LENGTH = 0.02  # seconds per frame, like discord.opus.Encoder.FRAME_LENGTH
+
+
+class StandInSession:
+    """Simulated guild session: no voice connection and no ffmpeg, tracks just run for their duration.
+
+    Answers the same requests and sends the same events as NodeSession, so
+    the bot side can be exercised without Discord. A track whose URL starts
+    with "error:" ends right away with the rest of the URL as its error.
+    """
+
+    def __init__(self, server, connection, guild_id, user_id):
+        self.server = server
+        self.connection = connection
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.channel_id = None
+        self.track_id = None
+        self.track = None
+        self.offset = 0
+        self.volume = 1.0
+        self.bitrate = None
+        self.closed = False
+        self._frames = 0  # frames played before the last pause or seek
+        self._started = None  # monotonic time playback (re)started, None while paused
+        self._task = None
+
+    emit = NodeSession.emit
+
+    @property
+    def frames(self):
+        if self._started is None:
+            return self._frames
+        return self._frames + int((time.monotonic() - self._started) * self.server.speed / FRAME_LENGTH)
+
+    async def connect(self, channel_id, timeout=30):
+        self.channel_id = channel_id
+        self.emit('ready')
+
+    async def voice_state(self, data):
+        if data.get('channel_id') is not None:
+            self.channel_id = int(data['channel_id'])
+
+    async def voice_server(self, data):
+        pass
+
+    async def play(self, track_id, track):
+        if self.track_id is not None:
+            await self.stop()
+        self.track_id, self.track = track_id, track
+        self.offset = track['start']
+        self.volume = track['volume']
+        self._frames = 0
+        self._started = time.monotonic()
+        self._task = asyncio.create_task(self._run(track_id))
+
+    async def _run(self, track_id):
+        """Play the simulated track until it reaches its duration"""
+        error = None
+        try:
+            if self.track['url'].startswith('error:'):
+                error = self.track['url'][len('error:'):]
+                return
+            while True:
+                await asyncio.sleep(0.05)
+                duration = self.track.get('duration')
+                if duration and self.offset + self.frames * FRAME_LENGTH * self.track['speed'] >= duration:
+                    return
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._end(track_id, error)
+
+    def _end(self, track_id, error=None):
+        if self.track_id != track_id:
+            return
+        self.emit('track_end', track_id=track_id, frames=self.frames, offset=self.offset, error=error)
+        self.track_id = self.track = None
+        self._started = None
+
+    async def stop(self, track_id=None):
+        if self.track_id is not None and (track_id is None or track_id == self.track_id):
+            track_id = self.track_id
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._end(track_id)  # in case the task was cancelled before it started
+
+    async def pause(self):
+        if self._started is not None:
+            self._frames = self.frames
+            self._started = None
+
+    async def resume(self):
+        if self.track_id is not None and self._started is None:
+            self._started = time.monotonic()
+
+    async def seek(self, position):
+        if self.track_id is None:
+            raise RuntimeError('Nothing is playing.')
+        self.offset = position
+        self._frames = 0
+        if self._started is not None:
+            self._started = time.monotonic()
+
+    async def set_volume(self, volume):
+        self.volume = volume
+
+    async def set_bitrate(self, bitrate):
+        self.bitrate = bitrate
+
+    def get_progress(self):
+        if self.track_id is None or self._started is None:
+            return None
+        return {'track_id': self.track_id, 'frames': self.frames, 'offset': self.offset}
+
+    async def destroy(self):
+        await self.stop()
+        if not self.closed:
+            self.closed = True
+            self.server.sessions.pop(self.guild_id, None)
+            self.emit('voice_closed', reason='disconnected')
+
+    def get_stats(self):
+        return {'connected': not self.closed, 'playing': self.track_id is not None, 'frames': self.frames,
+                'volume': self.volume}
+
+
+class StandInNodeServer(AudioNodeServer):
+    """Audio node with simulated sessions, for testing the bot side without Discord or ffmpeg.
+
+    `speed` runs the simulated tracks faster than real time.
+    """
+
+    session_class = StandInSession
+    mode = 'stand-in'
+
+    def __init__(self, address, progress_interval=1, speed=1.0, token=None):
+        super().__init__(address, progress_interval, token)
+        self.speed = speed
@@ -55,7 +55,7 @@ class AutoDisconnectService:
                 
                 # Clean up resources
                 self.music_cog.voice_manager.clear_voice_client(guild_id)
-                self.music_cog.queue_manager.clear_guild_data(guild_id)
+                self.music_cog.player_service.cleanup(guild_id)
                 
                 # Update controller if needed
                 if guild_id in self.music_cog.controller_service.controller_messages:
@@ -1,6 +1,8 @@
 import discord
+import hashlib
+import json
 import logging
-from ..utils import MusicControllerView, format_duration
+from ..utils import MusicControllerView, RenderScheduler, format_duration, AUDIO_FILTERS
 from ...utils.json_manager import JsonManager
 
 logger = logging.getLogger('discord')
@@ -10,6 +12,8 @@ class ControllerService:
         self.music_cog = music_cog
         self.controller_messages = {}  # guild_id: message
         self.json_manager = JsonManager("music_controllers.json")
+        # Coalesces controller refreshes and paces edits per channel
+        self.renders = RenderScheduler(self._render_controller)
         
         # Load saved data
         self.load_controller_data()
@@ -92,8 +96,8 @@ class ControllerService:
                         # Create a fresh view and update the message with it
                         view = MusicControllerView(self.music_cog, int(guild_id))
                         await message.edit(view=view)
-                        # Update the controller content
-                        await self.update_controller(guild_id)
+                        # Update the controller content, whatever was rendered for it before
+                        await self.update_controller(guild_id, force=True)
                         logger.info(f"Restored music controller in guild {guild_id}")
                 except discord.NotFound:
                     logger.warning(f"Message {message_id} not found in channel {channel_id}")
@@ -111,6 +115,7 @@ class ControllerService:
         """Store the controller message for a guild"""
         guild_id_str = str(guild_id)
         self.controller_messages[guild_id_str] = message
+        self.renders.invalidate(int(guild_id))
         if channel_id:
             self.music_channels[guild_id_str] = str(channel_id)
         self.save_controller_data()
@@ -269,78 +274,113 @@ class ControllerService:
         except Exception as e:
             logger.error(f"Error sending error message: {e}")
 
-    async def update_controller(self, guild_id):
-        """Update the music controller for a specific guild with current information"""
-        try:
-            # Convert guild_id to string for consistent lookup
-            guild_id_str = str(guild_id)
-            
-            if guild_id_str not in self.controller_messages:
-                logger.debug(f"No controller message found for guild {guild_id}")
-                return
-                
-            message = self.controller_messages[guild_id_str]
-            
-            # Create updated embed
-            current_song = self.music_cog.queue_manager.get_current_song(guild_id)
+    async def update_controller(self, guild_id, force=False):
+        """Schedule a refresh of the music controller for a specific guild
+
+        Requests are coalesced and rendered once after a short delay, the
+        message is only edited if what it shows changed (or `force` is set).
+        """
+        guild_id = int(guild_id)
+        if str(guild_id) not in self.controller_messages:
+            logger.debug(f"No controller message found for guild {guild_id}")
+            return
+        self.renders.request(guild_id, force)
+
+    async def _render_controller(self, guild_id):
+        """Build the controller for a guild, returns (channel id, digest, publish) or None"""
+        message = self.controller_messages.get(str(guild_id))
+        if message is None:
+            return None
+
+        current_song = self.music_cog.queue_manager.get_current_song(guild_id)
+        
+        embed = discord.Embed(
+            title="🎵 Music Controller",
+            description="Control the music playback using the buttons below.",
+            color=discord.Color.blue()
+        )
+        
+        # Get voice client status
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        status = "Disconnected"
+        if voice_client:
+            status = "Playing" if voice_client.is_playing() else "Paused" if voice_client.is_paused() else "Connected (Idle)"
+        
+        # Get repeat mode
+        repeat_mode = self.music_cog.queue_manager.get_repeat_mode(guild_id)
+        repeat_emojis = {'off': '⏹️ Off', 'one': '🔂 One Song', 'all': '🔁 All Songs'}
+        repeat_status = repeat_emojis.get(repeat_mode, '⏹️ Off')
             
-            embed = discord.Embed(
-                title="🎵 Music Controller",
-                description="Control the music playback using the buttons below.",
-                color=discord.Color.blue()
+        # Add info about current song if playing
+        if current_song:
+            duration = format_duration(current_song['duration'])
+            embed.add_field(
+                name="Now Playing",
+                value=f"[{current_song['title']}]({current_song['webpage_url']}) ({duration})",
+                inline=False
             )
-            
-            # Get voice client status
-            voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
-            status = "Disconnected"
-            if voice_client:
-                status = "Playing" if voice_client.is_playing() else "Paused" if voice_client.is_paused() else "Connected (Idle)"
-            
-            # Get repeat mode
-            repeat_mode = self.music_cog.queue_manager.get_repeat_mode(guild_id)
-            repeat_emojis = {'off': '⏹️ Off', 'one': '🔂 One Song', 'all': '🔁 All Songs'}
-            repeat_status = repeat_emojis.get(repeat_mode, '⏹️ Off')
-                
-            # Add info about current song if playing
-            if current_song:
-                from ..utils import format_duration
-                duration = format_duration(current_song['duration'])
-                embed.add_field(
-                    name="Now Playing",
-                    value=f"[{current_song['title']}]({current_song['webpage_url']}) ({duration})",
-                    inline=False
-                )
-                embed.add_field(
-                    name="Status",
-                    value=f"{status}",
-                    inline=True
-                )
-                embed.add_field(
-                    name="Repeat",
-                    value=repeat_status,
-                    inline=True
-                )
-            else:
-                embed.add_field(
-                    name="Status",
-                    value=f"{status}\nNothing is currently playing. Use `/play <song name or URL>` to add songs to the queue.",
-                    inline=False
-                )
-            
-            # Create fresh controller view
-            from ..utils.controller import MusicControllerView
-            view = MusicControllerView(self.music_cog, guild_id)
-            
-            # Update the message
+            embed.add_field(
+                name="Status",
+                value=f"{status}",
+                inline=True
+            )
+            embed.add_field(
+                name="Repeat",
+                value=repeat_status,
+                inline=True
+            )
+        else:
+            embed.add_field(
+                name="Status",
+                value=f"{status}\nNothing is currently playing. Use `/play <song name or URL>` to add songs to the queue.",
+                inline=False
+            )
+        
+        # Show the active audio filters
+        filters = self.music_cog.player_service.filter_manager.get_filters(guild_id)
+        if filters:
+            embed.add_field(
+                name="Filters",
+                value=", ".join(AUDIO_FILTERS[name]['label'] for name in filters),
+                inline=True
+            )
+        
+        # Show how far a playlist import has got
+        playlist = self.music_cog.playlist_service.get_progress(guild_id)
+        if playlist:
+            total = f"/{playlist.total}" if playlist.total else ""
+            embed.add_field(
+                name="Loading Playlist",
+                value=f"{playlist.title}: {playlist.queued}{total} songs queued",
+                inline=False
+            )
+        
+        view = MusicControllerView(self.music_cog, guild_id)
+
+        # Fingerprint what users see, the buttons' callbacks do not change between renders
+        rendered = json.dumps([embed.to_dict(), view.to_components()], sort_keys=True, default=str)
+        digest = hashlib.blake2b(rendered.encode(), digest_size=16).digest()
+        return message.channel.id, digest, lambda: self._publish_controller(guild_id, message, embed, view)
+
+    async def _publish_controller(self, guild_id, message, embed, view):
+        """Edit the controller message, returns whether it was edited"""
+        try:
             await message.edit(embed=embed, view=view)
             logger.debug(f"Updated controller message for guild {guild_id}")
+            return True
             
         except discord.NotFound:
             # Message was deleted, remove from our registry
-            if str(guild_id) in self.controller_messages:
+            if self.controller_messages.get(str(guild_id)) is message:
                 del self.controller_messages[str(guild_id)]
+                self.renders.forget(guild_id)
             logger.info(f"Controller message for guild {guild_id} was deleted, removed from registry")
             self.save_controller_data()
             
         except Exception as e:
-            logger.error(f"Error updating controller for guild {guild_id}: {e}")
\ No newline at end of file
+            logger.error(f"Error updating controller for guild {guild_id}: {e}")
+        return False
+
+    def get_render_stats(self):
+        """Get how many controller refreshes were requested, skipped and actually sent"""
+        return self.renders.get_stats()
\ No newline at end of file
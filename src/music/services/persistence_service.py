@@ -0,0 +1,188 @@
+import asyncio
+import gc
+import logging
+import time
+
+from ..utils import QueueJournal, QueueEntry
+
+logger = logging.getLogger('discord')
+
+
+class PersistenceService:
+    """Keep queues, current songs and voice sessions across restarts and crashes.
+
+    Queue changes go through a QueueJournal which the cog flushes every few
+    seconds, together with the voice channel and position of every guild that
+    is playing. On startup the journal is replayed in a worker thread, queues
+    are rebuilt a batch of songs at a time so the event loop keeps running,
+    then the voice channels that were active are rejoined a few at a time and
+    the current songs resume where they were.
+    """
+
+    def __init__(self, music_cog, directory):
+        self.music_cog = music_cog
+        self.journal = QueueJournal(directory)
+        music_cog.queue_manager.journal = self.journal
+        self.restore_batch = 1000  # songs rebuilt (or exported for a snapshot) between yields to the event loop
+        self.rejoin_concurrency = 4  # voice connections opened at the same time after a restart
+        self.restore_stats = {'guilds': 0, 'songs': 0, 'rejoined': 0, 'load_ms': 0, 'rebuild_ms': 0,
+                              'max_block_ms': 0}
+        self._lock = asyncio.Lock()  # one writer at a time
+        self._sessions = None  # voice sessions as last written
+        self._compacting = False
+        self.closed = False
+
+    async def restore(self):
+        """Rebuild the saved queues, then rejoin the voice channels that were active"""
+        # Every object the restore creates lives on, but allocating that many
+        # triggers full garbage collections that hold the GIL for 100+ ms. The
+        # collector is paused meanwhile and the restored queues are frozen
+        # afterwards, so no later collection has to walk them either.
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            state, sessions = await self._restore_queues()
+        finally:
+            gc.freeze()
+            if collecting:
+                gc.enable()
+
+        sessions = {guild_id: session for guild_id, session in sessions.items() if guild_id in state}
+        if not sessions:
+            return
+        await self.music_cog.bot.wait_until_ready()
+        semaphore = asyncio.Semaphore(self.rejoin_concurrency)
+        await asyncio.gather(*(self._rejoin(guild_id, session, semaphore) for guild_id, session in sessions.items()))
+
+    async def _restore_queues(self):
+        """Load the saved state in a worker thread and rebuild the queues in batches
+
+        Returns:
+            tuple: (saved state, saved voice sessions), as QueueJournal.load returns them
+        """
+        started = time.perf_counter()
+        try:
+            state, sessions = await asyncio.to_thread(self.journal.load)
+        except Exception as e:
+            logger.error(f"Could not load the saved queues: {e}", exc_info=True)
+            state, sessions = {}, {}
+        loaded = time.perf_counter()
+
+        queue_manager = self.music_cog.queue_manager
+        stats = self.restore_stats
+        batch_started = loaded
+        batch = 0
+        for guild_id, guild in state.items():
+            entries = [QueueEntry.from_record(record) for record in guild['queue']]
+            current_song = QueueEntry.from_record(guild['current']) if guild['current'] else None
+            queue_manager.restore_guild(guild_id, entries, current_song, guild['repeat'])
+            stats['songs'] += len(entries) + (current_song is not None)
+            batch += len(entries) + 1
+            if batch >= self.restore_batch:
+                stats['max_block_ms'] = max(stats['max_block_ms'], round((time.perf_counter() - batch_started) * 1000, 1))
+                await asyncio.sleep(0)
+                batch_started = time.perf_counter()
+                batch = 0
+        stats['max_block_ms'] = max(stats['max_block_ms'], round((time.perf_counter() - batch_started) * 1000, 1))
+        # Changes from now on are recorded on top of the restored state, guilds
+        # changed while it was being restored are recorded whole
+        self.journal.enable(queue_manager.export_guild)
+        stats['guilds'] = len(state)
+        stats['load_ms'] = round((loaded - started) * 1000, 1)
+        stats['rebuild_ms'] = round((time.perf_counter() - loaded) * 1000, 1)
+        if state:
+            logger.info(f"Restored {stats['songs']} songs in {stats['guilds']} guild queues "
+                        f"({stats['load_ms']} ms loading, {stats['rebuild_ms']} ms rebuilding)")
+        return state, sessions
+
+    async def _rejoin(self, guild_id, session, semaphore):
+        """Reconnect to a voice channel that was active before the restart and resume playing"""
+        voice_manager = self.music_cog.voice_manager
+        channel = self.music_cog.bot.get_channel(session['channel_id'])
+        if channel is None or not any(not member.bot for member in channel.members):
+            logger.info(f"Not rejoining voice in guild {guild_id}: the channel is gone or empty")
+            return
+        async with semaphore:
+            if voice_manager.get_voice_client(guild_id):
+                return  # someone brought the bot back already
+            try:
+                voice_client = await voice_manager.connect(channel)
+            except Exception as e:
+                logger.warning(f"Could not rejoin voice channel {channel.id} in guild {guild_id}: {e}")
+                return
+        voice_manager.set_voice_client(guild_id, voice_client)
+        self.restore_stats['rejoined'] += 1
+        logger.info(f"Rejoined voice channel {channel.id} in guild {guild_id} after a restart")
+        await self.music_cog.player_service.resume_session(guild_id, session.get('position') or 0)
+
+    def _get_sessions(self):
+        """Get the voice channel and position of every connected guild"""
+        sessions = {}
+        for guild_id, voice_client in self.music_cog.voice_manager.voice_clients.items():
+            if voice_client.is_connected() and voice_client.channel is not None:
+                position = self.music_cog.player_service.get_position(guild_id)
+                sessions[guild_id] = {'channel_id': voice_client.channel.id,
+                                      'position': round(position, 1) if position else 0}
+        return sessions
+
+    def _write(self, records, sessions):
+        self.journal.write(records)
+        if sessions is not None:
+            self.journal.save_sessions(sessions)
+
+    async def flush(self):
+        """Write the buffered queue changes and the voice sessions, compacting the log once it has grown"""
+        if not self.journal.enabled or self.closed:
+            return
+        async with self._lock:
+            records = self.journal.take_pending()
+            sessions = self._get_sessions()
+            changed = sessions != self._sessions
+            if records or changed:
+                await asyncio.to_thread(self._write, records, sessions if changed else None)
+                self._sessions = sessions
+        if self.journal.log_records >= self.journal.compact_after:
+            await self.compact()
+
+    async def compact(self):
+        """Fold the log into a new snapshot while queues keep changing"""
+        if self._compacting or self.closed:
+            return
+        self._compacting = True
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self.journal.write, self.journal.take_pending())
+                start_seq = self.journal.seq
+                await asyncio.to_thread(self.journal.rotate)
+
+            # Changes to a guild after it was exported go to the new log and are replayed on top
+            queue_manager = self.music_cog.queue_manager
+            guilds = []
+            batch = 0
+            for guild_id in queue_manager.get_guild_ids():
+                guilds.append((guild_id, self.journal.last_seq(), queue_manager.export_guild(guild_id)))
+                batch += len(guilds[-1][2]['queue']) + 1
+                if batch >= self.restore_batch:
+                    await asyncio.sleep(0)
+                    batch = 0
+            await asyncio.to_thread(self.journal.write_snapshot, start_seq, guilds)
+            logger.info(f"Compacted the queue journal into a snapshot of {len(guilds)} guilds")
+        except Exception as e:
+            logger.error(f"Error compacting the queue journal: {e}", exc_info=True)
+        finally:
+            self._compacting = False
+
+    def close(self):
+        """Write everything still buffered and stop recording (the cog is unloading)"""
+        if self.closed or not self.journal.enabled:
+            return
+        try:
+            self._write(self.journal.take_pending(), self._get_sessions())
+        except Exception as e:
+            logger.error(f"Error saving the queues: {e}")
+        # Leaving voice on shutdown must not wipe the saved queues
+        self.journal.enabled = False
+        self.closed = True
+
+    def get_stats(self):
+        return {**self.journal.get_stats(), **{f"restore_{key}": value for key, value in self.restore_stats.items()}}
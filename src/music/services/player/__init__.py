@@ -0,0 +1 @@
+# This package contains the collaborators of the player service
\ No newline at end of file
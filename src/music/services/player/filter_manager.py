@@ -0,0 +1,45 @@
+import logging
+from ...utils import AUDIO_FILTERS
+
+logger = logging.getLogger('discord')
+
+class FilterManager:
+    """Keeps each guild's audio filters and applies changes live at the current position"""
+    
+    def __init__(self, music_cog):
+        self.music_cog = music_cog
+        
+        # Audio filters (AUDIO_FILTERS presets) layered onto the ffmpeg options
+        self.filters = {}  # guild_id: list of preset names
+    
+    def get_filters(self, guild_id):
+        """Get the names of the audio filters active in a guild"""
+        return self.filters.get(guild_id, [])
+    
+    async def set_filters(self, guild_id, filters):
+        """Change a guild's audio filters, respawning ffmpeg at the current position to apply them"""
+        filters = [name for name in AUDIO_FILTERS if name in filters]
+        if filters == self.get_filters(guild_id):
+            return filters
+        if filters:
+            self.filters[guild_id] = filters
+        else:
+            self.filters.pop(guild_id, None)
+        player_service = self.music_cog.player_service
+        player_service.playback_stats['filter_changes'] += 1
+        # Uses the frame-counted position and the stream URL already resolved, no yt-dlp involved
+        await player_service.restart_song(guild_id)
+        return filters
+    
+    async def toggle_filter(self, guild_id, name):
+        """Turn one filter preset on or off, returns the active filters"""
+        filters = self.get_filters(guild_id)
+        if name in filters:
+            filters = [active for active in filters if active != name]
+        else:
+            filters = filters + [name]
+        return await self.set_filters(guild_id, filters)
+    
+    def cleanup(self, guild_id):
+        """Drop a guild's filters"""
+        self.filters.pop(guild_id, None)
\ No newline at end of file
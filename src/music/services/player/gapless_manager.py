@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from ...utils import GaplessAudio, prebuffer_track, GapStats
+
+logger = logging.getLogger('discord')
+
+class GaplessManager:
+    """Plays local sources in chains and, in gapless mode, prepares each chain's next track ahead of time"""
+    
+    def __init__(self, music_cog):
+        self.music_cog = music_cog
+        
+        # Gapless mode: pre-spawn the next track and switch to it on the frame boundary
+        self.guilds = set()
+        self.lead_time = 15  # seconds before the end to prepare the next track
+        self.prebuffer_frames = 25  # 20 ms frames read ahead
+        self.tasks = {}  # guild_id: task preparing the next track
+        self.chains = {}  # guild_id: GaplessAudio handed to the voice client
+        self.gap_stats = GapStats()
+        self._last_track_end = {}  # guild_id: when the previous track ran out (for gap stats)
+    
+    def toggle(self, guild_id):
+        """Turn gapless transitions on or off for a guild, returns the new state"""
+        if guild_id in self.guilds:
+            self.guilds.discard(guild_id)
+            self.cancel(guild_id)
+            chain = self.chains.get(guild_id)
+            if chain:
+                chain.clear_next()
+            return False
+        self.guilds.add(guild_id)
+        chain = self.chains.get(guild_id)
+        if chain:
+            self.schedule(guild_id, chain)
+        return True
+    
+    def create_chain(self, guild_id, source, song, position=0, restarted_at=None, restart_stats=None):
+        """Wrap a local source in the chain the voice client plays, timing how long it took to start
+        
+        A restart is timed from when the old source was stopped, a new song
+        from when the previous one ran out.
+        """
+        if restarted_at is not None:
+            start_stats, previous_end = restart_stats, restarted_at
+        else:
+            start_stats = self.gap_stats
+            previous_end = self._last_track_end.pop(guild_id, None) if position == 0 else None
+        chain = GaplessAudio(source, song, stats=self.gap_stats, previous_end=previous_end, start_stats=start_stats)
+        player_service = self.music_cog.player_service
+        chain.on_switch = lambda old, new, next_song: player_service.post(
+            guild_id, self._on_track_switch, guild_id, chain, old, new, next_song)
+        self.chains[guild_id] = chain
+        return chain
+    
+    def track_ended(self, guild_id, chain):
+        """Remember when a chain ran out, to measure how long the next song takes to start"""
+        self._last_track_end[guild_id] = chain.ended_at
+    
+    def queue_reordered(self, guild_id):
+        """Re-prepare the successor if the queue change means another song plays next"""
+        chain = self.chains.get(guild_id)
+        if (chain is not None and chain.has_next
+                and chain.next_song is not self.music_cog.player_service.peek_next_song(guild_id)):
+            chain.clear_next()
+            self.schedule(guild_id, chain)
+    
+    def schedule(self, guild_id, chain):
+        """Start preparing the track after the chain's current one, if gapless mode is on"""
+        if guild_id not in self.guilds:
+            return
+        self.cancel(guild_id)
+        self.tasks[guild_id] = asyncio.create_task(self._prepare_next_track(guild_id, chain))
+    
+    def cancel(self, guild_id):
+        """Stop preparing the next track for a guild"""
+        task = self.tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+    
+    async def _prepare_next_track(self, guild_id, chain):
+        """Near the end of the current track, spawn and pre-buffer the next one and attach it to the chain"""
+        loop = asyncio.get_running_loop()
+        player_service = self.music_cog.player_service
+        try:
+            while self.chains.get(guild_id) is chain and guild_id in self.guilds:
+                current = chain.current
+                duration = chain.song.get('duration') or 0
+                if not duration:
+                    return  # cannot tell when it ends (e.g. live), use a normal transition
+                remaining = (duration - current.position) / current.speed
+                if remaining > self.lead_time:
+                    await asyncio.sleep(min(remaining - self.lead_time, 5))
+                    continue
+                
+                next_song = player_service.peek_next_song(guild_id)
+                if next_song is None:
+                    # Nothing queued yet, something may still be added before the end
+                    await asyncio.sleep(1)
+                    continue
+                
+                audio_source = player_service.source_manager.create_cached_source(guild_id, next_song)
+                if audio_source is None:
+                    stream_url, _ = await player_service.get_stream_url(guild_id, next_song)
+                    if not stream_url:
+                        return
+                    audio_source = player_service.source_manager.create_source(guild_id, next_song, stream_url)
+                
+                # Spawning ffmpeg is done, now read the first frames ahead and drop leading silence.
+                # This goes inside the volume stage so the volume can still be changed.
+                buffered, trimmed = await loop.run_in_executor(None, prebuffer_track, audio_source,
+                                                                self.prebuffer_frames)
+                self.gap_stats.trimmed_frames += trimmed
+                
+                if not buffered.buffer or self.chains.get(guild_id) is not chain or chain.current is not current:
+                    # Nothing to play, or the situation changed while buffering
+                    await loop.run_in_executor(None, audio_source.cleanup)
+                    return
+                
+                chain.set_next(audio_source, next_song,
+                               still_valid=lambda: player_service.peek_next_song(guild_id) is next_song)
+                logger.debug(f"Prepared '{next_song['title']}' for a gapless transition in guild {guild_id}")
+                return
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error preparing next track in guild {guild_id}: {e}", exc_info=True)
+    
+    async def _on_track_switch(self, guild_id, chain, old_source, new_source, song):
+        """Bring the queue up to date after the voice client moved on to a prepared track (runs on the guild's actor)"""
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, old_source.cleanup)
+        if self.chains.get(guild_id) is not chain:
+            return
+        
+        player_service = self.music_cog.player_service
+        player_service.source_replaced(guild_id, old_source, new_source)
+        player_service.advance_queue(guild_id, song)
+        logger.info(f"Now playing (gapless): {song['title']} in guild {guild_id}")
+        
+        player_service.schedule_prefetch(guild_id)
+        self.schedule(guild_id, chain)
+        await self.music_cog.controller_service.update_controller(guild_id)
+    
+    def cleanup(self, guild_id):
+        """Drop a guild's chain and gapless state"""
+        self.chains.pop(guild_id, None)
+        self._last_track_end.pop(guild_id, None)
+        self.guilds.discard(guild_id)
+        self.cancel(guild_id)
\ No newline at end of file
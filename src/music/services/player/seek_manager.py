@@ -0,0 +1,65 @@
+import logging
+from ...utils import RemoteTrack
+
+logger = logging.getLogger('discord')
+
+class SeekManager:
+    """Moves playback within the current song: seeking, and resuming streams that end early"""
+    
+    def __init__(self, music_cog):
+        self.music_cog = music_cog
+        
+        # A stream that dies before the end of the song is resumed where it stopped
+        self.resume_margin = 5  # seconds before the end that count as finished
+        self.max_resumes = 3  # per song, in case the stream keeps dying at the same point
+        self._resumes = {}  # guild_id: (song, resumes so far)
+    
+    async def seek(self, guild_id, position):
+        """Jump to a position in the current song, restarting ffmpeg with -ss
+        
+        Returns:
+            float: the position playback continues from, or None if the song cannot be seeked
+        """
+        player_service = self.music_cog.player_service
+        song = self.music_cog.queue_manager.get_current_song(guild_id)
+        source = player_service.sources.get(guild_id)
+        if not song or not song.get('duration') or source is None:
+            return None  # nothing playing, or a live stream
+        position = min(max(position, 0), max(song['duration'] - 1, 0))
+        if isinstance(source, RemoteTrack):
+            # The node swaps in a source at the new position, the track keeps playing
+            player_service.source_manager.record_bandwidth(guild_id, source)
+            self.music_cog.voice_manager.get_voice_client(guild_id).seek(position)
+        elif not await player_service.restart_song(guild_id, position):
+            return None
+        player_service.playback_stats['seeks'] += 1
+        return position
+    
+    async def seek_by(self, guild_id, offset):
+        """Move playback forward (or back, for a negative offset) by some seconds"""
+        position = self.music_cog.player_service.get_position(guild_id)
+        if position is None:
+            return None
+        return await self.seek(guild_id, position + offset)
+    
+    def is_finished(self, song, position):
+        """Check if a position is close enough to the end of a song to count as played through"""
+        duration = song.get('duration') if song else None
+        return bool(duration) and position >= duration - self.resume_margin
+    
+    def should_resume(self, guild_id, song, source):
+        """Check if a song that just ended is still far from its end, counting the attempts"""
+        if (not song.get('duration') or self.is_finished(song, source.position)
+                or self.music_cog.queue_manager.get_current_song(guild_id) is not song):
+            return False
+        previous, resumes = self._resumes.get(guild_id, (None, 0))
+        if previous is not song:
+            resumes = 0
+        if resumes >= self.max_resumes:
+            return False
+        self._resumes[guild_id] = (song, resumes + 1)
+        return True
+    
+    def cleanup(self, guild_id):
+        """Forget a guild's resume attempts"""
+        self._resumes.pop(guild_id, None)
\ No newline at end of file
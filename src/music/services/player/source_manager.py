@@ -0,0 +1,228 @@
+import discord
+import logging
+from ...utils import (get_ffmpeg_options, get_filter_speed, is_opus_stream, get_opus_bitrate, TrackedAudio, DecodedAudio,
+                      BufferedAudio, GainAudio, gain_from_loudness, RemoteTrack, DEFAULT_BITRATE)
+
+logger = logging.getLogger('discord')
+
+class SourceManager:
+    """Builds the audio sources songs play from, and keeps them in step with volume and bitrate changes
+    
+    Opus streams are passed through untouched whenever nothing needs the
+    samples; volume, loudness normalization, filters or a lower channel
+    bitrate make it decode or re-encode instead.
+    """
+    
+    def __init__(self, music_cog):
+        self.music_cog = music_cog
+        
+        # Opus passthrough: hand YouTube's Opus packets to discord untouched,
+        # decoding to PCM only when the audio has to be changed (volume, normalization)
+        self.opus_passthrough = True
+        self.volumes = {}  # guild_id: volume (1.0 = 100%)
+        
+        # Bitrate matching: passthrough is only used if the stream is at most this much
+        # above the channel bitrate, otherwise ffmpeg encodes at the channel bitrate
+        self.passthrough_headroom = 1.25
+        self.bandwidth_sessions = {}  # guild_id: audio sent this voice session
+        
+        # Network sources are read ahead on their own thread to ride out stalls
+        self.jitter_buffer = True
+        self.buffer_stats = {'underruns': 0, 'stalls': 0, 'grown': 0, 'shrunk': 0}
+        
+        # Loudness normalization (opt-in per guild) to a target RMS level in dBFS
+        self.normalize_guilds = set()
+        self.target_loudness = -16.0
+        self.gain_stats = {'frames': 0, 'seconds': 0.0}
+    
+    def create_cached_source(self, guild_id, song, position=0):
+        """Create a tracked source reading the song from the disk cache, or None on a miss"""
+        player_service = self.music_cog.player_service
+        if player_service.filter_manager.get_filters(guild_id):
+            return None  # filters need ffmpeg, which cannot read the cache format
+        path, cached_bitrate = self.music_cog.audio_cache.lookup(song.get('video_id'))
+        if path is None:
+            return None
+        
+        source = self.music_cog.audio_cache.open(path, position)
+        bitrate = self.music_cog.voice_manager.get_bitrate(guild_id)
+        if self.opus_passthrough and not self._needs_pcm(guild_id) and cached_bitrate <= bitrate * self.passthrough_headroom:
+            player_service.playback_stats['passthrough'] += 1
+            return TrackedAudio(source, offset=position, bitrate=cached_bitrate, passthrough=True)
+        
+        # Decode for volume or normalization, or to re-encode for a channel with a lower bitrate
+        player_service.playback_stats['pcm'] += 1
+        return TrackedAudio(self._gain_stage(guild_id, song, DecodedAudio(source)), offset=position, bitrate=bitrate)
+    
+    def _choose_mode(self, guild_id, stream_url):
+        """Decide how a stream is played, skipping PCM whenever nothing needs the samples
+        
+        Returns:
+            tuple: ('passthrough', 'opus' (encoded by ffmpeg) or 'pcm', bitrate in kbps)
+        """
+        player_service = self.music_cog.player_service
+        bitrate = self.music_cog.voice_manager.get_bitrate(guild_id)
+        if not self.opus_passthrough or self._needs_pcm(guild_id):
+            mode = 'pcm'
+        elif not player_service.filter_manager.get_filters(guild_id) and self._fits_channel(stream_url, bitrate):
+            # Opus streams that fit the channel are copied packet for packet,
+            # anything else (or filtered audio) is encoded by ffmpeg at the channel's bitrate
+            mode, bitrate = 'passthrough', get_opus_bitrate(stream_url)
+        else:
+            mode = 'opus'
+        player_service.playback_stats['opus_encoded' if mode == 'opus' else mode] += 1
+        return mode, bitrate
+    
+    def create_source(self, guild_id, song, stream_url, position=0):
+        """Create the tracked ffmpeg source for a stream"""
+        player_service = self.music_cog.player_service
+        filters = player_service.filter_manager.get_filters(guild_id)
+        speed = get_filter_speed(filters)
+        ffmpeg_options = get_ffmpeg_options(start=position, filters=filters)
+        mode, bitrate = self._choose_mode(guild_id, stream_url)
+        if mode != 'pcm':
+            passthrough = mode == 'passthrough'
+            source = discord.FFmpegOpusAudio(stream_url, bitrate=bitrate, codec='opus' if passthrough else None,
+                                             **ffmpeg_options)
+            if position == 0 and not filters:
+                # Keep a copy on disk for the next time this song is played
+                source = self.music_cog.audio_cache.record(song.get('video_id'), source, bitrate, song.get('duration'))
+            return TrackedAudio(self._buffer(source), offset=position, bitrate=bitrate, passthrough=passthrough,
+                                speed=speed)
+        
+        # The voice client's encoder already runs at the channel bitrate (VoiceManager.apply_bitrate)
+        source = self._gain_stage(guild_id, song, self._buffer(discord.FFmpegPCMAudio(stream_url, **ffmpeg_options)),
+                                  measure=not filters)
+        return TrackedAudio(source, offset=position, bitrate=bitrate, speed=speed)
+    
+    def create_remote_source(self, guild_id, song, stream_url, position=0):
+        """Describe a stream for an audio node to play, with the same mode and settings as in-process playback"""
+        player_service = self.music_cog.player_service
+        filters = player_service.filter_manager.get_filters(guild_id)
+        mode, bitrate = self._choose_mode(guild_id, stream_url)
+        loudness = self.music_cog.metadata_cache.get_loudness(song.get('video_id'))
+        return RemoteTrack(stream_url, offset=position, bitrate=bitrate, mode=mode, filters=filters,
+                           volume=self.get_volume(guild_id), normalization=self._normalization(guild_id, loudness),
+                           speed=get_filter_speed(filters), duration=song.get('duration'))
+    
+    def _needs_pcm(self, guild_id):
+        """Check if the samples have to be changed (volume or loudness normalization)"""
+        return self.get_volume(guild_id) != 1.0 or guild_id in self.normalize_guilds
+    
+    def _gain_stage(self, guild_id, song, source, measure=True):
+        """Wrap a PCM source in the volume stage, normalized to the song's measured loudness if enabled"""
+        video_id = song.get('video_id')
+        loudness = self.music_cog.metadata_cache.get_loudness(video_id)
+        # Songs heard for the first time are measured so the next play can be normalized
+        return GainAudio(source, volume=self.get_volume(guild_id), normalization=self._normalization(guild_id, loudness),
+                         measure=measure and loudness is None and video_id is not None,
+                         on_measured=lambda value: self.music_cog.bot.loop.call_soon_threadsafe(
+                             self.music_cog.metadata_cache.store_loudness, video_id, value),
+                         stats=self.gain_stats)
+    
+    def _normalization(self, guild_id, loudness):
+        """Get the gain that brings a song measured at `loudness` to the target, 1.0 if the guild does not normalize"""
+        if guild_id in self.normalize_guilds and loudness is not None:
+            return gain_from_loudness(loudness, self.target_loudness)
+        return 1.0
+    
+    def get_gain_stats(self):
+        """Get the volume stage's processing cost per 20 ms frame"""
+        frames = self.gain_stats['frames']
+        return {
+            'frames': frames,
+            'avg_us_per_frame': round(self.gain_stats['seconds'] / frames * 1e6, 1) if frames else 0,
+            'normalizing_guilds': len(self.normalize_guilds)
+        }
+    
+    def toggle_normalize(self, guild_id):
+        """Turn loudness normalization on or off for a guild (from the next song), returns the new state"""
+        if guild_id in self.normalize_guilds:
+            self.normalize_guilds.discard(guild_id)
+            return False
+        self.normalize_guilds.add(guild_id)
+        return True
+    
+    def _buffer(self, source):
+        """Put a jitter buffer behind a network source (inside the volume stage, so volume stays live)"""
+        if not self.jitter_buffer:
+            return source
+        return BufferedAudio(source, stats=self.buffer_stats)
+    
+    def get_buffer_stats(self, guild_id):
+        """Get the jitter buffer counters, plus the state of the guild's current buffer"""
+        stats = dict(self.buffer_stats)
+        source = self.music_cog.player_service.sources.get(guild_id)
+        while source is not None and not isinstance(source, BufferedAudio):
+            source = getattr(source, 'original', None)
+        if source is not None:
+            stats.update({f"current_{key}": value for key, value in source.get_stats().items()})
+        return stats
+    
+    def _fits_channel(self, stream_url, bitrate):
+        """Check if a stream can be passed through without exceeding the channel bitrate by much"""
+        return is_opus_stream(stream_url) and get_opus_bitrate(stream_url) <= bitrate * self.passthrough_headroom
+    
+    async def update_bitrate(self, guild_id, channel=None):
+        """Re-adapt playback after the bot moved channels or the channel bitrate changed"""
+        player_service = self.music_cog.player_service
+        bitrate = self.music_cog.voice_manager.apply_bitrate(guild_id, channel)
+        source = player_service.sources.get(guild_id)
+        if source is None or source.bitrate == bitrate:
+            return
+        if isinstance(source.original, GainAudio) or (isinstance(source, RemoteTrack) and source.mode == 'pcm'):
+            # The encoder was updated in place (on the audio node for a RemoteTrack)
+            self.record_bandwidth(guild_id, source)
+            source.bitrate = bitrate
+        elif not source.passthrough or source.bitrate > bitrate * self.passthrough_headroom:
+            # ffmpeg's output bitrate is fixed per process, respawn it
+            await player_service.restart_song(guild_id)
+    
+    def record_bandwidth(self, guild_id, source):
+        """Add the audio sent by a source (since it was last counted) to the guild's session totals"""
+        seconds = source.frames * source.FRAME_LENGTH - source.counted
+        source.counted += seconds
+        session = self.bandwidth_sessions.setdefault(guild_id, {'seconds': 0.0, 'sent_kb': 0.0, 'saved_kb': 0.0})
+        session['seconds'] += seconds
+        session['sent_kb'] += source.bitrate * seconds / 8
+        session['saved_kb'] += (DEFAULT_BITRATE - source.bitrate) * seconds / 8
+    
+    def get_bandwidth_stats(self, guild_id):
+        """Get the audio data sent in this voice session compared to py-cord's fixed 128 kbps"""
+        source = self.music_cog.player_service.sources.get(guild_id)
+        if source is not None:
+            self.record_bandwidth(guild_id, source)
+        session = self.bandwidth_sessions.get(guild_id, {'seconds': 0.0, 'sent_kb': 0.0, 'saved_kb': 0.0})
+        return {
+            'bitrate': self.music_cog.voice_manager.get_bitrate(guild_id),
+            'minutes': round(session['seconds'] / 60, 1),
+            'sent_mb': round(session['sent_kb'] / 1024, 2),
+            'saved_mb': round(session['saved_kb'] / 1024, 2)
+        }
+    
+    def get_volume(self, guild_id):
+        """Get the playback volume for a guild (1.0 = 100%)"""
+        return self.volumes.get(guild_id, 1.0)
+    
+    async def set_volume(self, guild_id, volume):
+        """Change the volume, moving the current song from Opus passthrough to PCM if needed"""
+        player_service = self.music_cog.player_service
+        self.volumes[guild_id] = volume
+        source = player_service.sources.get(guild_id)
+        if source is None:
+            return
+        if isinstance(source, RemoteTrack) and source.mode == 'pcm':
+            # The node's volume stage ramps to it
+            self.music_cog.voice_manager.get_voice_client(guild_id).set_volume(volume)
+        elif isinstance(source.original, GainAudio):
+            # Ramps to the new volume over a few frames
+            source.original.volume = volume
+        elif volume != 1.0:
+            # Passthrough packets cannot be scaled, decode from where we are
+            await player_service.restart_song(guild_id)
+    
+    def cleanup(self, guild_id):
+        """Drop a guild's volume, normalization and bandwidth totals"""
+        self.volumes.pop(guild_id, None)
+        self.normalize_guilds.discard(guild_id)
+        self.bandwidth_sessions.pop(guild_id, None)
\ No newline at end of file
@@ -1,8 +1,16 @@
 import asyncio
 import discord
 import logging
+import time
+from itertools import islice
 
-from ..utils import get_song_info, is_youtube_playlist, get_fresh_stream_url
+from ..utils import (get_song_info, is_youtube_playlist, get_fresh_stream_url, get_ytdlp_options, get_song_stub,
+                     enrich_song, search_songs, ExtractionCancelled, GapStats, ScheduledPlayer, NodeVoiceClient,
+                     PlayerActor)
+from .player.gapless_manager import GaplessManager
+from .player.seek_manager import SeekManager
+from .player.filter_manager import FilterManager
+from .player.source_manager import SourceManager
 
 logger = logging.getLogger('discord')
 
@@ -10,6 +18,110 @@ class PlayerService:
     def __init__(self, music_cog):
         self.music_cog = music_cog
         self.bot = music_cog.bot
+        self.stream_cache = music_cog.stream_cache
+        self.stream_format = get_ytdlp_options('stream')['format']
+        self._skip_requested = set()  # guild ids whose current song was skipped by a user
+        
+        # Starting, restarting and ending songs run on one PlayerActor per guild, one command at a time
+        self.actors = {}  # guild_id: PlayerActor
+        self.max_start_failures = 5  # songs in a row that may fail to start before playback gives up
+        self.retry_backoff = 0.5  # seconds before the next try after a failed start, doubled each time
+        self.max_retry_backoff = 8
+        self.start_stats = {'failed_starts': 0, 'gave_up': 0}
+        
+        # Look-ahead: resolve the next songs' stream URLs while the current one plays
+        self.prefetch_depth = 2
+        self.prefetch_tasks = {}  # guild_id: task
+        self.prefetch_stats = {'used': 0, 'resolved': 0}  # prefetched URL used vs resolved at play time
+        
+        # Two-phase extraction: enqueue cheap placeholders, resolve them fully later
+        self.lazy_extraction = True
+        self.search_results = 5  # entries shown by /search
+        
+        # Sources are built in Opus passthrough, Opus or PCM mode depending on volume, normalization and bitrate
+        self.source_manager = SourceManager(music_cog)
+        self.sources = {}  # guild_id: TrackedAudio currently playing (RemoteTrack on an audio node)
+        self.playback_stats = {'passthrough': 0, 'opus_encoded': 0, 'pcm': 0, 'restarts': 0, 'seeks': 0, 'resumes': 0,
+                               'filter_changes': 0}
+        
+        # Seeking, and resuming a stream that dies before the end of the song where it stopped
+        self.seek_manager = SeekManager(music_cog)
+        
+        # Audio filters (AUDIO_FILTERS presets) layered onto the ffmpeg options
+        self.filter_manager = FilterManager(music_cog)
+        
+        # Seek, filter, volume and bitrate changes restart the current song at its position
+        self.restart_stats = GapStats(target=1.0)  # time from a restart to the first frame
+        self._restarted_at = {}  # guild_id: perf_counter() when a restart stopped the old source
+        
+        # Chains of local sources, with the next track prepared ahead in gapless mode
+        self.gapless_manager = GaplessManager(music_cog)
+    
+    async def resolve_songs(self, guild_id, url):
+        """Resolve a URL or search query into songs for the queue
+        
+        With lazy extraction only a cheap placeholder is resolved here and the
+        full extraction happens in the background or right before playing.
+        """
+        cache = self.music_cog.metadata_cache
+        if self.lazy_extraction:
+            return await get_song_stub(self.music_cog.extractor, url, guild_id, cache)
+        return await get_song_info(self.music_cog.extractor, url, guild_id, cache=cache)
+    
+    async def search(self, guild_id, query):
+        """Get the top results for a query with one flat search (nothing is resolved yet)"""
+        return await search_songs(self.music_cog.extractor, query, self.search_results, guild_id)
+    
+    async def add_songs(self, guild_id, url, requester=None):
+        """Resolve a URL, search query or playlist and add the result to the queue
+        
+        Returns:
+            tuple: (list of songs queued, dict with metadata)
+        """
+        if is_youtube_playlist(url):
+            return await self.music_cog.playlist_service.import_playlist(guild_id, url, requester)
+        
+        songs, metadata = await self.resolve_songs(guild_id, url)
+        if songs:
+            self.enqueue(guild_id, songs, requester)
+        return songs, metadata
+    
+    def enqueue(self, guild_id, songs, requester=None):
+        """Add resolved songs to the queue, remembering the stream URLs they came with
+        
+        Returns:
+            list: the queue entries made for the songs
+        """
+        for song in songs:
+            if song.get('url') and song.get('video_id'):
+                self.stream_cache.put(song['video_id'], self.stream_format, song['url'])
+        entries = self.music_cog.queue_manager.add_multiple_to_queue(guild_id, songs, requester)
+        
+        # Placeholders built from a bare video URL have no title/duration yet,
+        # fill them in now; other placeholders are resolved by the look-ahead
+        for entry in entries:
+            if entry.get('pending') and not entry.get('duration'):
+                asyncio.create_task(self._enrich_in_background(guild_id, entry))
+        self.schedule_prefetch(guild_id)
+        return entries
+    
+    async def _enrich_in_background(self, guild_id, song):
+        """Fully resolve a placeholder song without blocking playback or the user"""
+        stream_url, _, _ = await self._resolve_stream_url(guild_id, song)
+        if stream_url:
+            await self.music_cog.controller_service.update_controller(guild_id)
+    
+    async def _drop_failed_song(self, guild_id, song):
+        """Remove a placeholder that could not be resolved and refresh the controller"""
+        song['failed'] = True
+        queue_manager = self.music_cog.queue_manager
+        if queue_manager.remove_song(guild_id, song):
+            self.queue_reordered(guild_id)
+        if queue_manager.get_current_song(guild_id) is song:
+            # Make sure repeat modes do not bring it back
+            queue_manager.clear_current_song(guild_id)
+        logger.warning(f"Dropped '{song['title']}' from the queue in guild {guild_id}: it could not be resolved")
+        await self.music_cog.controller_service.update_controller(guild_id)
     
     async def play_song(self, guild_id, ctx=None, url=None):
         """Add song to queue and start playing if not already playing"""
@@ -20,18 +132,26 @@ class PlayerService:
                     await ctx.respond("🔍 Searching...", ephemeral=True)
                 
                 logger.info(f"Fetching info for: {url}")
-                songs_info, metadata = await get_song_info(self.music_cog.ytdl, url)
+                songs_info, metadata = await self.add_songs(guild_id, url, ctx.author.id if ctx else None)
                 
                 if not songs_info:
                     if ctx:
                         await ctx.respond("❌ No songs found for the provided URL or search query")
                     return
                 
-                # Add songs to queue
-                self.music_cog.queue_manager.add_multiple_to_queue(guild_id, songs_info)
-                
-                # Notify user (always single song now)
-                if ctx:
+                # Notify user
+                if ctx and 'playlist_title' in metadata:
+                    embed = discord.Embed(
+                        title="✅ Playlist Added",
+                        description=f"[{metadata['playlist_title']}]({url})",
+                        color=discord.Color.green()
+                    )
+                    status = f"{len(songs_info)} songs queued"
+                    if metadata['importing']:
+                        status += ", the rest are loading in the background"
+                    embed.add_field(name="Songs", value=status, inline=False)
+                    await ctx.respond(embed=embed)
+                elif ctx:
                     embed = discord.Embed(
                         title="✅ Added to Queue",
                         description=f"[{songs_info[0]['title']}]({songs_info[0]['webpage_url']})",
@@ -63,78 +183,438 @@ class PlayerService:
         if voice_client and not voice_client.is_playing():
             await self.play_next(guild_id)
     
+    def _actor(self, guild_id):
+        actor = self.actors.get(guild_id)
+        if actor is None:
+            actor = self.actors[guild_id] = PlayerActor(guild_id)
+        return actor
+    
+    def post(self, guild_id, command, *args):
+        """Queue a command on a guild's actor from any thread (voice and sender threads call this)
+        
+        Dropped if the guild's player was cleaned up in the meantime.
+        """
+        def send():
+            actor = self.actors.get(guild_id)
+            if actor is not None:
+                actor.send(None, command, *args)
+        self.bot.loop.call_soon_threadsafe(send)
+    
+    def get_actor_stats(self, guild_id):
+        """Get the guild's mailbox depth and command latencies, and the failed starts across guilds"""
+        actor = self.actors.get(guild_id)
+        return {**(actor.get_stats() if actor else {}), **self.start_stats}
+    
     async def play_next(self, guild_id):
-        """Play the next song in the queue"""
-        queue = self.music_cog.queue_manager.get_queue(guild_id)
+        """Start the next song in the queue unless something is playing
+        
+        Requests made while one is still waiting are merged into it, and
+        whether something is playing is checked when the request runs, so
+        concurrent commands and buttons cannot start two songs.
+        """
+        await self._actor(guild_id).send('play_next', self._play_next_if_idle, guild_id)
+    
+    async def _play_next_if_idle(self, guild_id):
         voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            return  # started by an earlier command
+        await self._play_next(guild_id)
+    
+    async def _play_next(self, guild_id):
+        """Play the next song in the queue, moving on (with a growing delay) past songs that fail to start"""
+        failures = 0
+        while True:
+            voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+            next_song = self.peek_next_song(guild_id)
+            
+            if next_song is None or not voice_client:
+                # No more songs and no repeat
+                self.music_cog.queue_manager.clear_current_song(guild_id)
+                await self.music_cog.controller_service.update_controller(guild_id)
+                return
+            
+            # Update current song info
+            self.advance_queue(guild_id, next_song)
+            if await self._start_song(guild_id, next_song):
+                return
+            
+            failures += 1
+            self.start_stats['failed_starts'] += 1
+            if failures >= self.max_start_failures:
+                logger.error(f"{failures} songs in a row failed to start in guild {guild_id}, stopping playback")
+                self.start_stats['gave_up'] += 1
+                self.music_cog.queue_manager.clear_current_song(guild_id)
+                await self.music_cog.controller_service.update_controller(guild_id)
+                return
+            await asyncio.sleep(min(self.retry_backoff * 2 ** (failures - 1), self.max_retry_backoff))
+    
+    async def resume_session(self, guild_id, position=0):
+        """Start playing again after the bot restarted: the saved current song at its saved position, else the queue"""
+        await self._actor(guild_id).send('resume', self._resume_session, guild_id, position)
+    
+    async def _resume_session(self, guild_id, position):
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            return
+        song = self.music_cog.queue_manager.get_current_song(guild_id)
+        if song is None or self.seek_manager.is_finished(song, position):
+            # Nothing was playing, or it had as good as finished
+            await self._play_next(guild_id)
+        elif not await self._start_song(guild_id, song, position=position):
+            await self._play_next(guild_id)
+    
+    def peek_next_song(self, guild_id):
+        """Get the song that should play after the current one, without changing the queue"""
+        queue = self.music_cog.queue_manager.get_queue(guild_id)
         repeat_mode = self.music_cog.queue_manager.get_repeat_mode(guild_id)
         current_song = self.music_cog.queue_manager.get_current_song(guild_id)
         
         # Handle repeat modes
         if repeat_mode == 'one' and current_song:
             # Repeat the current song
-            next_song = current_song
-        elif repeat_mode == 'all' and current_song and not queue:
+            return current_song
+        if repeat_mode == 'all' and current_song and not queue:
             # If queue is empty and repeat all is on, replay current song
-            next_song = current_song
-        elif not queue or not voice_client:
-            # No more songs and no repeat
-            self.music_cog.queue_manager.clear_current_song(guild_id)
-            await self.music_cog.controller_service.update_controller(guild_id)
-            return
-        else:
+            return current_song
+        return queue[0] if queue else None
+    
+    def advance_queue(self, guild_id, next_song):
+        """Make the song picked by _peek_next_song current, taking it off the queue"""
+        queue_manager = self.music_cog.queue_manager
+        queue = queue_manager.get_queue(guild_id)
+        current_song = queue_manager.get_current_song(guild_id)
+        if queue and queue[0] is next_song and next_song is not current_song:
             # Get the next song from queue
-            next_song = self.music_cog.queue_manager.get_next_song(guild_id)
+            queue_manager.get_next_song(guild_id)
             
             # If repeat all is on, add the finished song back to the end of queue
-            if repeat_mode == 'all' and current_song:
-                self.music_cog.queue_manager.add_to_queue(guild_id, current_song)
+            if queue_manager.get_repeat_mode(guild_id) == 'all' and current_song:
+                queue_manager.add_to_queue(guild_id, current_song.requeue())
+        queue_manager.set_current_song(guild_id, next_song)
+    
+    async def get_stream_url(self, guild_id, song, refresh=False):
+        """Get a stream URL for a song about to play
+
+        Uses the URL prefetched onto the queued song if it is still valid, then
+        the stream cache, and only extracts when both miss or a refresh is forced.
+
+        Returns:
+            tuple: (stream url or None, whether it was reused rather than extracted)
+        """
+        if not refresh:
+            prefetched_url = song.get('stream_url')
+            if prefetched_url and time.time() < song.get('stream_expires_at', 0):
+                self.prefetch_stats['used'] += 1
+                logger.debug(f"Using prefetched stream URL for: {song['title']}")
+                return prefetched_url, True
+            self.prefetch_stats['resolved'] += 1
         
-        # Update current song info
-        self.music_cog.queue_manager.set_current_song(guild_id, next_song)
+        stream_url, from_cache, _ = await self._resolve_stream_url(guild_id, song, refresh)
+        return stream_url, from_cache
+    
+    async def _resolve_stream_url(self, guild_id, song, refresh=False):
+        """Resolve a stream URL through the stream cache, extracting on a miss
+
+        Returns:
+            tuple: (stream url or None, whether it came from the cache, expiry timestamp)
+        """
+        if song.get('failed'):
+            return None, False, None
         
+        if song.get('pending'):
+            # Placeholder: one full extraction gives both the metadata and the stream URL
+            try:
+                stream_url = await enrich_song(self.music_cog.extractor, song, guild_id,
+                                               cache=self.music_cog.metadata_cache)
+                # The placeholder's duration is known now, keep the queue's total in step
+                self.music_cog.queue_manager.update_song(guild_id, song)
+            except ExtractionCancelled:
+                return None, False, None
+            except Exception as e:
+                logger.error(f"Could not resolve '{song['title']}': {e}")
+                if not song.get('failed'):
+                    await self._drop_failed_song(guild_id, song)
+                return None, False, None
+            expires_at = self.stream_cache.put(song['video_id'], self.stream_format, stream_url) if stream_url else None
+            return stream_url, False, expires_at
+        
+        video_id = song.get('video_id')
+        if video_id and not refresh:
+            cached_url, expires_at = self.stream_cache.get_entry(video_id, self.stream_format)
+            if cached_url:
+                logger.debug(f"Using cached stream URL for: {song['title']}")
+                return cached_url, True, expires_at
+        
+        # Get fresh stream URL to avoid 403 errors from expired URLs
+        logger.info(f"Getting fresh stream URL for: {song['title']}")
+        logger.debug(f"Webpage URL: {song['webpage_url']}")
+        fresh_url = await get_fresh_stream_url(self.music_cog.extractor, song['webpage_url'], guild_id)
+        expires_at = None
+        if fresh_url and video_id:
+            expires_at = self.stream_cache.put(video_id, self.stream_format, fresh_url)
+        return fresh_url, False, expires_at
+    
+    def queue_reordered(self, guild_id):
+        """Follow a change to the queue's order: look ahead again and re-prepare the gapless successor"""
+        self.schedule_prefetch(guild_id)
+        self.gapless_manager.queue_reordered(guild_id)
+    
+    def schedule_prefetch(self, guild_id):
+        """Start resolving the upcoming songs in the background (no-op if already running)"""
+        if self.prefetch_depth <= 0:
+            return
+        task = self.prefetch_tasks.get(guild_id)
+        if task and not task.done():
+            return
+        self.prefetch_tasks[guild_id] = asyncio.create_task(self._prefetch(guild_id))
+    
+    def cancel_prefetch(self, guild_id):
+        """Stop the look-ahead for a guild"""
+        task = self.prefetch_tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+    
+    async def _prefetch(self, guild_id):
+        """Resolve stream URLs for the next songs in the queue and store them on the songs"""
+        queue_manager = self.music_cog.queue_manager
         try:
-            # Get fresh stream URL to avoid 403 errors from expired URLs
-            logger.info(f"Getting fresh stream URL for: {next_song['title']}")
-            logger.debug(f"Webpage URL: {next_song['webpage_url']}")
+            while True:
+                version = queue_manager.get_queue_version(guild_id)
+                upcoming = list(islice(queue_manager.get_queue(guild_id), self.prefetch_depth))
+                song = next((s for s in upcoming
+                             if not s.get('stream_url') or time.time() >= s.get('stream_expires_at', 0)), None)
+                if song is None:
+                    return
+                
+                stream_url, _, expires_at = await self._resolve_stream_url(guild_id, song)
+                if song.get('failed'):
+                    continue  # placeholder was dropped from the queue, look at the next one
+                if not stream_url or not expires_at:
+                    return  # leave it to play time rather than retrying in a loop
+                
+                # Discard the result if the queue was cleared or reordered meanwhile
+                if queue_manager.get_queue_version(guild_id) != version:
+                    continue
+                song['stream_url'] = stream_url
+                song['stream_expires_at'] = expires_at
+                logger.debug(f"Prefetched stream URL for: {song['title']}")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error prefetching stream URLs for guild {guild_id}: {e}")
+        finally:
+            if self.prefetch_tasks.get(guild_id) is asyncio.current_task():
+                del self.prefetch_tasks[guild_id]
+    
+    def get_position(self, guild_id):
+        """Get the position in the current song in seconds (counted from frames sent), or None"""
+        source = self.sources.get(guild_id)
+        return source.position if source is not None else None
+    
+    async def restart_song(self, guild_id, position=None):
+        """Respawn ffmpeg for the current song at a position (default: where it is now)
+        
+        Returns:
+            bool: whether there was a song to restart
+        """
+        return await self._actor(guild_id).send(None, self._restart_song, guild_id, position)
+    
+    async def _restart_song(self, guild_id, position):
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        song = self.music_cog.queue_manager.get_current_song(guild_id)
+        source = self.sources.get(guild_id)
+        if not song or not source or not voice_client or not (voice_client.is_playing() or voice_client.is_paused()):
+            return False
+        
+        if position is None:
+            position = source.position
+        was_paused = voice_client.is_paused()
+        self.playback_stats['restarts'] += 1
+        
+        # The old source's after-callback sees it is no longer current and does nothing
+        self.source_manager.record_bandwidth(guild_id, source)
+        self.sources.pop(guild_id, None)
+        if not was_paused:
+            self._restarted_at[guild_id] = time.perf_counter()
+        voice_client.stop()
+        if not await self._start_song(guild_id, song, position=position):
+            await self._play_next(guild_id)
+        elif was_paused and voice_client.is_playing():
+            voice_client.pause()
+        return True
+    
+    async def _start_song(self, guild_id, song, refresh=False, position=0):
+        """Resolve a stream for the song and start playing it
+        
+        Returns:
+            bool: False if the song could not be started and the next one should be tried
+        """
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        remote = isinstance(voice_client, NodeVoiceClient)
+        restarted_at = self._restarted_at.pop(guild_id, None)
+        try:
+            # Songs played before are read from the disk cache, no stream URL needed (the node streams instead)
+            audio_source = None if remote else self.source_manager.create_cached_source(guild_id, song, position)
+            from_cache = False
+            if audio_source is None:
+                stream_url, from_cache = await self.get_stream_url(guild_id, song, refresh)
+                
+                if not stream_url:
+                    logger.error(f"Could not get fresh URL for: {song['title']}")
+                    return False
             
-            fresh_url = await get_fresh_stream_url(self.music_cog.ytdl, next_song['webpage_url'])
+            if not voice_client or not voice_client.is_connected():
+                logger.debug(f"Voice client gone before playback started in guild {guild_id}")
+                if audio_source is not None:
+                    audio_source.cleanup()
+                return True  # nothing to retry
             
-            if not fresh_url:
-                logger.error(f"Could not get fresh URL for: {next_song['title']}")
-                logger.error(f"Skipping song and trying next...")
-                # Try to play next song
-                await self.play_next(guild_id)
-                return
+            if remote:
+                # The audio node spawns ffmpeg and sends the audio, it reports frames back
+                audio_source = self.source_manager.create_remote_source(guild_id, song, stream_url, position)
+            elif audio_source is None:
+                logger.info(f"Got stream URL, creating audio source...")
+                # Create audio source and play, counting frames to detect dead URLs
+                audio_source = self.source_manager.create_source(guild_id, song, stream_url, position)
+            self.sources[guild_id] = audio_source
+            self._skip_requested.discard(guild_id)
             
-            logger.info(f"Got fresh URL, creating audio source...")
+            if remote:
+                # Gapless chains work on local sources only, a node track is played on its own
+                self.gapless_manager.chains.pop(guild_id, None)
+                voice_client.play(audio_source, after=lambda e: self.post(
+                    guild_id, self._play_next_error_handled, guild_id, e, song, audio_source, from_cache))
+            else:
+                # The chain lets gapless mode continue with a prepared next track without stopping
+                chain = self.gapless_manager.create_chain(guild_id, audio_source, song, position, restarted_at,
+                                                          self.restart_stats)
+                self._play(voice_client, chain, after=lambda e: self.post(
+                    guild_id, self._play_next_error_handled, guild_id, e, chain.song, chain.current,
+                    from_cache and not chain.switches, chain))
             
-            # Create audio source and play with fresh URL
-            audio_source = discord.FFmpegPCMAudio(fresh_url, **self.music_cog.ffmpeg_options)
-            voice_client.play(audio_source, after=lambda e: asyncio.run_coroutine_threadsafe(
-                self._play_next_error_handled(guild_id, e), self.bot.loop))
+            logger.info(f"Now playing: {song['title']} in guild {guild_id}")
             
-            logger.info(f"Now playing: {next_song['title']} in guild {guild_id}")
+            # Resolve what comes next while this song plays
+            self.schedule_prefetch(guild_id)
+            if not remote:
+                self.gapless_manager.schedule(guild_id, chain)
             
             # Update controller with new song info
             await self.music_cog.controller_service.update_controller(guild_id)
+            return True
         except Exception as e:
-            logger.error(f"Error playing song '{next_song['title']}': {e}", exc_info=True)
-            logger.error(f"Skipping to next song...")
-            # Try to play next song
-            await self.play_next(guild_id)
+            logger.error(f"Error playing song '{song['title']}': {e}", exc_info=True)
+            return False
     
-    async def _play_next_error_handled(self, guild_id, error):
-        """Handle errors when playing next song"""
+    async def _play_next_error_handled(self, guild_id, error, song=None, source=None, from_cache=False, chain=None):
+        """Handle the end of a song (runs on the guild's actor): retry or resume it, or move on"""
         if error:
             logger.error(f"Error playing song: {error}")
+        if source is not None:
+            if self.sources.get(guild_id) is not source:
+                return  # this source was replaced by a restart (or the guild was cleaned up)
+            self.source_manager.record_bandwidth(guild_id, source)
         try:
-            await self.play_next(guild_id)
+            skipped = guild_id in self._skip_requested
+            self._skip_requested.discard(guild_id)
+            if chain is not None and not skipped and not error:
+                # Measure how long the next song takes to start after this one ran out
+                self.gapless_manager.track_ended(guild_id, chain)
+            
+            # ffmpeg produced no audio from a cached URL: it has most likely
+            # expired (403), so re-extract once and retry the same song
+            if (from_cache and source is not None and source.frames == 0 and not skipped
+                    and self.music_cog.queue_manager.get_current_song(guild_id) is song):
+                logger.warning(f"Cached stream URL failed for '{song['title']}', re-extracting")
+                self.stream_cache.invalidate(song['video_id'], self.stream_format)
+                song.pop('stream_url', None)
+                song.pop('stream_expires_at', None)
+                if await self._start_song(guild_id, song, refresh=True, position=source.offset):
+                    return
+            
+            # The stream stopped before the end of the song (connection lost, URL
+            # expired mid-song): continue from the last frame sent instead of moving on
+            if (source is not None and source.frames and not skipped and not error
+                    and self.seek_manager.should_resume(guild_id, song, source)):
+                logger.warning(f"Stream of '{song['title']}' ended early at {source.position:.0f}s, resuming")
+                self.playback_stats['resumes'] += 1
+                # Tries the cached URL first, an expired one is re-extracted by the check above
+                if await self._start_song(guild_id, song, position=source.position):
+                    return
+            
+            await self._play_next(guild_id)
         except Exception as e:
             logger.error(f"Error in play_next: {e}")
     
+    def _play(self, voice_client, source, after):
+        """Start a source on a voice client, on the shared sender threads if they are enabled"""
+        scheduler = self.music_cog.send_scheduler
+        if scheduler is not None:
+            scheduler.play(voice_client, source, after=after)
+        else:
+            voice_client.play(source, after=after)
+    
+    def get_sender_stats(self, guild_id):
+        """Get the shared sender's load and this guild's send timing, or None if it is not used"""
+        scheduler = self.music_cog.send_scheduler
+        if scheduler is None:
+            return None
+        stats = scheduler.get_stats()
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        player = getattr(voice_client, '_player', None)
+        if isinstance(player, ScheduledPlayer):
+            stats.update({f"session_{key}": value for key, value in player.get_stats().items()})
+        return stats
+    
+    def source_replaced(self, guild_id, old_source, new_source):
+        """Make a source that took over from the playing one (gapless switch) the guild's current source"""
+        if self.sources.get(guild_id) is old_source:
+            self.source_manager.record_bandwidth(guild_id, old_source)
+        self.sources[guild_id] = new_source
+    
+    def skip(self, guild_id):
+        """Skip the current song, aborting a stream extraction that is still running"""
+        cancelled = self.music_cog.extractor.cancel_guild(guild_id, profile='stream')
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        if voice_client and voice_client.is_connected() and voice_client.is_playing():
+            self._skip_requested.add(guild_id)
+            voice_client.stop()  # This will trigger play_next via the after callback
+            return True
+        return cancelled > 0
+    
+    def cleanup(self, guild_id):
+        """Drop all playback state for a guild (after leaving voice)"""
+        self.music_cog.playlist_service.cancel(guild_id)
+        self.sources.pop(guild_id, None)
+        self.source_manager.cleanup(guild_id)
+        self.seek_manager.cleanup(guild_id)
+        self.filter_manager.cleanup(guild_id)
+        self._restarted_at.pop(guild_id, None)
+        self.gapless_manager.cleanup(guild_id)
+        self.cancel_prefetch(guild_id)
+        self.music_cog.extractor.cancel_guild(guild_id)
+        self.music_cog.queue_manager.clear_guild_data(guild_id)
+        actor = self.actors.pop(guild_id, None)
+        if actor is not None:
+            actor.close()
+    
     async def stop(self, guild_id):
         """Stop playback and clear the queue"""
+        # Abort playlist imports, the look-ahead and any extraction still running for this guild,
+        # and a song start (or its retry delay) in progress
+        self.music_cog.playlist_service.cancel(guild_id)
+        self.cancel_prefetch(guild_id)
+        self.gapless_manager.cancel(guild_id)
+        self.music_cog.extractor.cancel_guild(guild_id)
+        actor = self._actor(guild_id)
+        actor.interrupt()
+        await actor.send(None, self._stop, guild_id)
+    
+    async def _stop(self, guild_id):
+        source = self.sources.pop(guild_id, None)
+        if source is not None:
+            self.source_manager.record_bandwidth(guild_id, source)
+        
         voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
         if (voice_client and voice_client.is_playing()):
             voice_client.stop()
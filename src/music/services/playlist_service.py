@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from collections import deque
+from ..utils import get_flat_song, ExtractionCancelled
+
+logger = logging.getLogger('discord')
+
+# Titles yt-dlp gives to playlist entries that cannot be played
+UNAVAILABLE_TITLES = ('[Private video]', '[Deleted video]', '[Unavailable video]')
+
+
+class PlaylistImport:
+    """Progress of a playlist being streamed into a guild queue"""
+
+    def __init__(self, url, title=None, requester=None):
+        self.url = url
+        self.title = title or "Playlist"
+        self.requester = requester  # user id the queued songs are credited to
+        self.total = None  # entry count reported by YouTube, if any
+        self.queued = 0
+        self.skipped = 0
+        self.done = False
+        self.reason = None  # why the import stopped early
+        self.failures = []  # (line number, line, error) for bulk imports
+        self.entries = deque()  # placeholder songs listed but not queued yet
+        self.listed = 0  # playlist positions listed so far
+        self.has_more = True  # whether positions past `listed` may exist
+        self.task = None
+
+
+class PlaylistService:
+    """Import YouTube playlists as a stream of pages instead of all at once.
+
+    The first page is flat-extracted on its own so playback can start right
+    away. The rest is listed `list_size` entries per job, which matches the
+    100 entries YouTube returns per continuation, and queued a page at a time.
+    Queued entries are dropped from the listing, and nothing more is listed
+    while the guild already has `window` songs waiting, so memory is bounded
+    by the window rather than the playlist.
+    Bulk imports of user-supplied lines reuse the same progress and cancellation.
+    """
+
+    def __init__(self, music_cog):
+        self.music_cog = music_cog
+        self.page_size = 25
+        self.list_size = 100  # entries flat-extracted per job after the first page
+        self.window = 50  # max queued songs before fetching pauses
+        self.max_entries = 500  # per-guild cap on entries imported from one playlist
+        self.backpressure_interval = 5  # seconds between queue checks while paused
+        self.bulk_concurrency = 4  # lines of a bulk import resolved at the same time
+        self.imports = {}  # guild_id: PlaylistImport
+
+    def get_progress(self, guild_id):
+        """Get the running import for a guild, or None"""
+        playlist = self.imports.get(guild_id)
+        return playlist if playlist and not playlist.done else None
+
+    async def import_playlist(self, guild_id, url, requester=None):
+        """Queue the first page of a playlist and stream the rest in the background
+
+        Returns:
+            tuple: (list of songs queued so far, dict with metadata)
+        """
+        if self.get_progress(guild_id):
+            raise ValueError("A playlist is already being imported. Use /stop to cancel it first.")
+
+        playlist = PlaylistImport(url, requester=requester)
+        await self._fetch_entries(guild_id, playlist, self.page_size)
+        songs = self._take_page(playlist)
+        if not songs:
+            raise ValueError("No playable songs found in this playlist")
+
+        self.music_cog.player_service.enqueue(guild_id, songs, playlist.requester)
+        playlist.queued = len(songs)
+
+        if playlist.entries or playlist.has_more:
+            self.imports[guild_id] = playlist
+            playlist.task = asyncio.create_task(self._import_rest(guild_id, playlist))
+        else:
+            playlist.done = True
+
+        logger.info(f"Started importing playlist '{playlist.title}' in guild {guild_id}")
+        return songs, {'playlist_title': playlist.title,
+                       'total_entries': playlist.total,
+                       'skipped_count': playlist.skipped,
+                       'importing': not playlist.done}
+
+    async def import_lines(self, guild_id, lines, name="Song list", requester=None):
+        """Resolve URLs or search terms in parallel and queue them in their original order
+
+        Args:
+            lines: async iterator of (line number, line), consumed as resolutions free up
+
+        Returns:
+            PlaylistImport: the finished or cancelled import, with its failures
+        """
+        if self.get_progress(guild_id):
+            raise ValueError("A playlist is already being imported. Use /stop to cancel it first.")
+
+        playlist = PlaylistImport(None, name, requester)
+        self.imports[guild_id] = playlist
+        playlist.task = asyncio.create_task(self._import_lines(guild_id, playlist, lines))
+        await asyncio.wait([playlist.task])
+        return playlist
+
+    def cancel(self, guild_id):
+        """Stop a running import (on stop, clear or leave)"""
+        playlist = self.imports.pop(guild_id, None)
+        if playlist and playlist.task and not playlist.task.done():
+            playlist.task.cancel()
+            logger.info(f"Cancelled import of playlist '{playlist.title}' in guild {guild_id}")
+
+    async def _import_rest(self, guild_id, playlist):
+        """List and queue the remaining pages, waiting while the queue is full"""
+        queue_manager = self.music_cog.queue_manager
+        try:
+            while playlist.entries or playlist.has_more:
+                while len(queue_manager.get_queue(guild_id)) >= self.window:
+                    await asyncio.sleep(self.backpressure_interval)
+
+                if not playlist.entries:
+                    await self._fetch_entries(guild_id, playlist, self.list_size)
+                    continue
+                songs = self._take_page(playlist)
+                self.music_cog.player_service.enqueue(guild_id, songs, playlist.requester)
+                playlist.queued += len(songs)
+                await self._resume_playback(guild_id)
+                await self.music_cog.controller_service.update_controller(guild_id)
+            logger.info(f"Imported {playlist.queued} songs from playlist '{playlist.title}' in guild {guild_id}")
+        except (asyncio.CancelledError, ExtractionCancelled):
+            return
+        except Exception as e:
+            playlist.reason = "YouTube stopped responding"
+            logger.error(f"Error importing playlist '{playlist.title}' in guild {guild_id}: {e}")
+        finally:
+            playlist.done = True
+            if self.imports.get(guild_id) is playlist:
+                del self.imports[guild_id]
+
+        await self.music_cog.controller_service.update_controller(guild_id)
+
+    async def _import_lines(self, guild_id, playlist, lines):
+        """Resolve lines with bounded concurrency, enqueueing through a reorder buffer"""
+        player_service = self.music_cog.player_service
+        # A slot is only freed once its line has been queued, which bounds both
+        # the running resolutions and the results waiting for an earlier line
+        window = asyncio.Semaphore(self.bulk_concurrency)
+        results = {}  # line index: resolved songs, until every earlier line is in
+        next_index = 0
+        tasks = set()
+
+        async def flush():
+            nonlocal next_index
+            ready = []
+            while next_index in results:
+                ready.extend(results.pop(next_index))
+                next_index += 1
+                window.release()
+            if ready:
+                player_service.enqueue(guild_id, ready, playlist.requester)
+                playlist.queued += len(ready)
+                await self._resume_playback(guild_id)
+                await self.music_cog.controller_service.update_controller(guild_id)
+
+        async def resolve(index, line_number, line):
+            try:
+                songs, _ = await player_service.resolve_songs(guild_id, line)
+            except ExtractionCancelled:
+                raise
+            except Exception as e:
+                playlist.failures.append((line_number, line, str(e)))
+                songs = []
+            results[index] = songs
+            await flush()
+
+        index = 0
+        try:
+            try:
+                async for line_number, line in lines:
+                    if index >= self.max_entries:
+                        playlist.reason = f"limit of {self.max_entries} songs reached"
+                        break
+                    await window.acquire()
+                    task = asyncio.create_task(resolve(index, line_number, line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    index += 1
+            except (asyncio.CancelledError, ExtractionCancelled):
+                raise
+            except Exception as e:
+                playlist.reason = "the rest of the file could not be read"
+                logger.error(f"Error reading bulk import for guild {guild_id}: {e}")
+            if tasks:
+                await asyncio.gather(*tasks)
+            playlist.total = index
+            logger.info(f"Bulk imported {playlist.queued}/{index} songs in guild {guild_id}")
+        except (asyncio.CancelledError, ExtractionCancelled):
+            for task in tasks:
+                task.cancel()
+            return
+        finally:
+            playlist.done = True
+            if self.imports.get(guild_id) is playlist:
+                del self.imports[guild_id]
+
+        await self.music_cog.controller_service.update_controller(guild_id)
+
+    async def _fetch_entries(self, guild_id, playlist, count):
+        """Flat-extract the next `count` entries of the playlist, up to `max_entries`"""
+        start = playlist.listed + 1
+        end = min(start + count - 1, self.max_entries)
+        info = await self.music_cog.extractor.extract(
+            playlist.url, profile='playlist', guild_id=guild_id,
+            params={'playlist_items': f"{start}-{end}"})
+        playlist.listed = end
+        if not info:
+            playlist.has_more = False
+            return
+
+        playlist.title = info.get('title') or playlist.title
+        playlist.total = info.get('playlist_count') or playlist.total
+
+        entries = info.get('entries') or []
+        for entry in entries:
+            if not entry or not entry.get('id') or entry.get('title') in UNAVAILABLE_TITLES:
+                playlist.skipped += 1
+                continue
+            playlist.entries.append(get_flat_song(entry))
+
+        playlist.has_more = len(entries) > end - start and (playlist.total is None or end < playlist.total)
+        if playlist.has_more and end >= self.max_entries:
+            playlist.has_more = False
+            playlist.reason = f"limit of {self.max_entries} songs reached"
+
+    def _take_page(self, playlist):
+        """Remove and return the next page of listed songs to queue"""
+        count = min(self.page_size, len(playlist.entries))
+        return [playlist.entries.popleft() for _ in range(count)]
+
+    async def _resume_playback(self, guild_id):
+        """Start playing if the queue ran dry while the next page was loading"""
+        voice_client = self.music_cog.voice_manager.get_voice_client(guild_id)
+        if (voice_client and voice_client.is_connected() and not voice_client.is_playing()
+                and not voice_client.is_paused()
+                and not self.music_cog.queue_manager.get_current_song(guild_id)):
+            await self.music_cog.player_service.play_next(guild_id)
@@ -1,14 +1,37 @@
 from .youtube import *
+from .extractor_pool import ExtractorPool, ExtractionError, ExtractionCancelled
+from .client_selector import PlayerClientSelector
+from .stream_cache import StreamCache
+from .metadata_cache import MetadataCache
+from .audio import TrackedAudio
+from .audio_cache import AudioCache, DecodedAudio
+from .gapless import GaplessAudio, PrebufferedAudio, prebuffer_track, GapStats
+from .jitter_buffer import BufferedAudio
+from .gain import GainAudio, gain_from_loudness
+from .send_scheduler import SendScheduler, ScheduledPlayer
+from .audio_node import NodeClient, NodePool, NodeVoiceClient, RemoteTrack, NodeError
+from .player_actor import PlayerActor
+from .render_scheduler import RenderScheduler, EditBudget
+from .attachment import iter_attachment_lines
+from .track import Track, TrackCatalog, QueueEntry, TRACK_CATALOG
+from .track_queue import TrackQueue
 from .queue_manager import QueueManager
-from .voice_manager import VoiceManager
-from .formatter import format_duration
+from .queue_journal import QueueJournal
+from .voice_manager import VoiceManager, DEFAULT_BITRATE
+from .formatter import format_duration, parse_time
 from .controller import MusicControllerView
 
 __all__ = [
-    'get_ytdlp_options', 'get_ffmpeg_options', 
+    'get_ytdlp_options', 'is_opus_stream', 'get_opus_bitrate', 'get_ffmpeg_options', 'AUDIO_FILTERS', 'get_filter_speed',
     'is_youtube_url', 'is_youtube_playlist', 
+    'get_video_id', 'get_extraction_key', 'get_singleflight_stats',
     'extract_info', 'get_song_info', 'get_fresh_stream_url',
-    'QueueManager', 'VoiceManager',
-    'format_duration', 'format_time',
+    'get_watch_url', 'get_flat_song', 'get_song_stub', 'search_songs', 'enrich_song',
+    'ExtractorPool', 'ExtractionError', 'ExtractionCancelled', 'PlayerClientSelector',
+    'StreamCache', 'MetadataCache', 'TrackedAudio', 'AudioCache', 'DecodedAudio',
+    'GaplessAudio', 'PrebufferedAudio', 'prebuffer_track', 'GapStats', 'BufferedAudio', 'GainAudio', 'gain_from_loudness', 'SendScheduler', 'ScheduledPlayer',
+    'NodeClient', 'NodePool', 'NodeVoiceClient', 'RemoteTrack', 'NodeError', 'PlayerActor', 'RenderScheduler', 'EditBudget', 'iter_attachment_lines',
+    'Track', 'TrackCatalog', 'QueueEntry', 'TRACK_CATALOG', 'TrackQueue', 'QueueManager', 'QueueJournal', 'VoiceManager', 'DEFAULT_BITRATE',
+    'format_duration', 'format_time', 'parse_time',
     'MusicControllerView'
 ]
\ No newline at end of file
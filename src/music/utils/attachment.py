@@ -0,0 +1,25 @@
+import aiohttp
+
+
+async def iter_attachment_lines(url, max_lines=200, max_line_length=300):
+    """Stream a text attachment line by line without downloading it all first
+
+    Blank lines and lines starting with '#' are skipped, long lines are cut.
+
+    Yields:
+        tuple: (line number, stripped line)
+    """
+    count = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            line_number = 0
+            async for raw_line in response.content:
+                line_number += 1
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if not line or line.startswith('#'):
+                    continue
+                yield line_number, line[:max_line_length]
+                count += 1
+                if count >= max_lines:
+                    return
@@ -0,0 +1,36 @@
+import discord
+
+
+class TrackedAudio(discord.AudioSource):
+    """Audio source wrapper that counts the 20 ms frames handed to the voice client
+
+    Works for both PCM and Opus sources, each read is one 20 ms frame either way.
+    """
+
+    FRAME_LENGTH = discord.opus.Encoder.FRAME_LENGTH / 1000  # seconds per frame
+
+    def __init__(self, original, offset=0, bitrate=None, passthrough=False, speed=1.0):
+        self.original = original
+        self.offset = offset  # where in the song this source started
+        self.speed = speed  # seconds of the song per second played (filters like nightcore)
+        self.bitrate = bitrate  # kbps the audio is sent at
+        self.passthrough = passthrough  # Opus packets copied from the stream as-is
+        self.frames = 0
+        self.counted = 0.0  # seconds already added to bandwidth statistics
+
+    @property
+    def position(self):
+        """Seconds into the song"""
+        return self.offset + self.frames * self.FRAME_LENGTH * self.speed
+
+    def read(self):
+        data = self.original.read()
+        if data:
+            self.frames += 1
+        return data
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
@@ -0,0 +1,247 @@
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Cached files are Opus packets, each prefixed with its length (2 bytes, big endian)
+PACKET_HEADER = struct.Struct('>H')
+CACHE_FILE_REGEX = r'^([A-Za-z0-9_-]{11})_(\d+)\.opus$'
+TRACK_FRAME_LENGTH = discord.opus.Encoder.FRAME_LENGTH / 1000  # seconds per Opus packet
+
+
+class AudioCache:
+    """On-disk cache of Opus packets by video id, filled while songs play.
+
+    A song is recorded as it streams the first time and committed with an
+    atomic rename once it played to the end, so a partial recording is never
+    served. The total size is bounded, least recently played files go first.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, max_track_seconds=15 * 60, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_track_seconds = max_track_seconds  # longer songs are not recorded
+        self.enabled = enabled
+        self.entries = OrderedDict()  # video_id: (path, size, bitrate), least recently used first
+        self.total_bytes = 0
+        self.recording = set()  # video ids being recorded right now
+        self.stats = {'hits': 0, 'misses': 0, 'commits': 0, 'aborted': 0, 'evictions': 0}
+        self._lock = threading.Lock()  # recordings are committed from audio player threads
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    def lookup(self, video_id):
+        """Get the cached file for a video as (path, bitrate), or (None, None)"""
+        if not self.enabled or not video_id:
+            return None, None
+        with self._lock:
+            entry = self.entries.get(video_id)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, None
+            self.entries.move_to_end(video_id)
+            self.stats['hits'] += 1
+        path, _, bitrate = entry
+        try:
+            os.utime(path)  # keeps the LRU order across restarts
+        except OSError:
+            pass
+        return path, bitrate
+
+    def open(self, path, start=0):
+        """Create an audio source reading a cached file from `start` seconds"""
+        return CachedOpusAudio(path, start)
+
+    def record(self, video_id, source, bitrate, duration):
+        """Wrap an Opus source so its packets are written to the cache as they play
+
+        Returns the source unchanged if the song should not be cached.
+        """
+        if (not self.enabled or not video_id or not source.is_opus() or not duration
+                or duration > self.max_track_seconds):
+            return source
+        with self._lock:
+            if video_id in self.entries or video_id in self.recording:
+                return source
+            self.recording.add(video_id)
+        path = os.path.join(self.directory, f"{video_id}_{bitrate}.opus")
+        try:
+            return RecordingAudio(source, self, video_id, path, bitrate, duration)
+        except OSError as e:
+            logger.error(f"Could not start recording {video_id} to the audio cache: {e}")
+            with self._lock:
+                self.recording.discard(video_id)
+            return source
+
+    def get_stats(self):
+        """Get the cache size and counters"""
+        return {
+            'files': len(self.entries),
+            'size_mb': round(self.total_bytes / 1024 ** 2, 1),
+            'max_mb': round(self.max_bytes / 1024 ** 2),
+            **self.stats
+        }
+
+    def _commit(self, video_id, part_path, path, bitrate):
+        """Atomically publish a finished recording and evict old files beyond the size cap"""
+        os.replace(part_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self.recording.discard(video_id)
+            self.entries[video_id] = (path, size, bitrate)
+            self.total_bytes += size
+            self.stats['commits'] += 1
+            evicted = self._evict()
+        for old_path in evicted:
+            self._remove(old_path)
+        logger.info(f"Cached audio for video {video_id} ({size // 1024} KiB)")
+
+    def _abort(self, video_id, part_path):
+        """Throw away an unfinished recording"""
+        with self._lock:
+            self.recording.discard(video_id)
+            self.stats['aborted'] += 1
+        self._remove(part_path)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (lock held), returning their paths"""
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (path, size, _) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.stats['evictions'] += 1
+            evicted.append(path)
+        return evicted
+
+    def _scan(self):
+        """Index the files already on disk, oldest first, and delete leftover partial recordings"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.part'):
+                self._remove(path)
+                continue
+            match = re.match(CACHE_FILE_REGEX, name)
+            if match:
+                stat = os.stat(path)
+                files.append((stat.st_mtime, match.group(1), path, stat.st_size, int(match.group(2))))
+        for _, video_id, path, size, bitrate in sorted(files):
+            self.entries[video_id] = (path, size, bitrate)
+            self.total_bytes += size
+        for path in self._evict():
+            self._remove(path)
+        logger.info(f"Audio cache has {len(self.entries)} files ({self.total_bytes // 1024 ** 2} MiB)")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class RecordingAudio(discord.AudioSource):
+    """Pass-through Opus source that also writes every packet to a partial cache file"""
+
+    def __init__(self, original, cache, video_id, path, bitrate, duration):
+        self.original = original
+        self.cache = cache
+        self.video_id = video_id
+        self.path = path
+        self.bitrate = bitrate
+        self.part_path = path + '.part'
+        self.duration = duration
+        self.frames = 0
+        self.file = open(self.part_path, 'wb')
+
+    def read(self):
+        data = self.original.read()
+        if self.file is None:
+            return data
+        if data:
+            self.frames += 1
+            self.file.write(PACKET_HEADER.pack(len(data)))
+            self.file.write(data)
+        else:
+            self._close()
+        return data
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.original.cleanup()
+        if self.file is not None:
+            # Stopped before the end (skip, stop, restart): never publish it
+            self.file.close()
+            self.file = None
+            self.cache._abort(self.video_id, self.part_path)
+
+    def _close(self):
+        """The stream ended: commit it if it really reached the end of the song"""
+        self.file.close()
+        self.file = None
+        played = self.frames * TRACK_FRAME_LENGTH
+        if played < self.duration - 2:
+            # ffmpeg gave up early (network error), a cut-off song must not be served
+            logger.debug(f"Recording of {self.video_id} ended early ({played:.0f}s of {self.duration}s)")
+            self.cache._abort(self.video_id, self.part_path)
+            return
+        try:
+            self.cache._commit(self.video_id, self.part_path, self.path, self.bitrate)
+        except OSError as e:
+            logger.error(f"Could not commit cached audio for {self.video_id}: {e}")
+            self.cache._abort(self.video_id, self.part_path)
+
+
+class CachedOpusAudio(discord.AudioSource):
+    """Opus source reading packets from a cache file"""
+
+    def __init__(self, path, start=0):
+        self.file = open(path, 'rb')
+        # Every packet is one 20 ms frame, skip whole packets to seek
+        for _ in range(int(start / TRACK_FRAME_LENGTH)):
+            if not self._read_packet():
+                break
+
+    def _read_packet(self):
+        header = self.file.read(PACKET_HEADER.size)
+        if len(header) < PACKET_HEADER.size:
+            return b''
+        return self.file.read(PACKET_HEADER.unpack(header)[0])
+
+    def read(self):
+        return self._read_packet()
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.file.close()
+
+
+class DecodedAudio(discord.AudioSource):
+    """Decode an Opus source to PCM, for when the samples have to be changed (volume)"""
+
+    def __init__(self, original):
+        self.original = original
+        self.decoder = discord.opus.Decoder()
+
+    def read(self):
+        packet = self.original.read()
+        if not packet:
+            return b''
+        return self.decoder.decode(packet)
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
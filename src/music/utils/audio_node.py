@@ -0,0 +1,358 @@
+import asyncio
+import itertools
+import logging
+import time
+
+import discord
+
+from .node_protocol import encode_message, read_message, open_node_connection
+
+logger = logging.getLogger('discord')
+
+FRAME_LENGTH = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+
+class NodeError(Exception):
+    """The audio node could not be reached or refused a request"""
+
+
+class NodeClient:
+    """Connection from the bot to one audio node process.
+
+    Requests are answered in order by id. Events are routed to the
+    NodeVoiceClient of their guild. The connection is reopened on the next
+    request if the node restarted.
+    """
+
+    def __init__(self, address, token=None, request_timeout=10):
+        self.address = address
+        self.token = token  # shared secret sent in the hello
+        self.request_timeout = request_timeout
+        self.voice_clients = {}  # guild_id: NodeVoiceClient
+        self.reader = None
+        self.writer = None
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id: future
+        self._reader_task = None
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        """Open the connection if it is not open yet"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self.reader, self.writer = await open_node_connection(self.address)
+            except OSError as e:
+                raise NodeError(f"Audio node at {self.address} is not reachable: {e}") from e
+            self._reader_task = asyncio.create_task(self._read_loop())
+            try:
+                info = await self._send('hello', None, {'token': self.token} if self.token else {})
+            except NodeError:
+                # Refused (wrong token) or not answered, do not keep a connection that cannot be used
+                self.writer.close()
+                raise
+            logger.info(f"Connected to audio node at {self.address} ({info.get('mode', 'voice')} mode)")
+
+    async def request(self, op, guild_id=None, **fields):
+        """Send a request and wait for its reply
+
+        Returns:
+            dict: the reply's data
+        """
+        await self.connect()
+        return await self._send(op, guild_id, fields)
+
+    def notify(self, op, guild_id=None, **fields):
+        """Send a request without waiting for the reply (errors are logged)"""
+        task = asyncio.create_task(self.request(op, guild_id, **fields))
+        task.add_done_callback(self._log_failure)
+
+    def _log_failure(self, task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Audio node request failed: {task.exception()}")
+
+    async def _send(self, op, guild_id, fields):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self.writer.write(encode_message({'op': op, 'id': request_id, 'guild_id': guild_id, **fields}))
+            await self.writer.drain()
+            reply = await asyncio.wait_for(future, self.request_timeout)
+        except (OSError, ConnectionError) as e:
+            raise NodeError(f"Lost the audio node connection: {e}") from e
+        except asyncio.TimeoutError as e:
+            raise NodeError(f"Audio node did not answer '{op}' in time") from e
+        finally:
+            self._pending.pop(request_id, None)
+        if not reply.get('ok'):
+            raise NodeError(reply.get('error', f"Audio node refused '{op}'"))
+        return reply
+
+    async def _read_loop(self):
+        """Dispatch replies and events until the node goes away"""
+        try:
+            while True:
+                message = await read_message(self.reader)
+                if message is None:
+                    break
+                if message.get('op') == 'reply':
+                    future = self._pending.get(message.get('id'))
+                    if future and not future.done():
+                        future.set_result(message)
+                elif message.get('op') == 'event':
+                    voice_client = self.voice_clients.get(message.get('guild_id'))
+                    if voice_client:
+                        voice_client._on_event(message)
+        except (OSError, ConnectionError, ValueError) as e:
+            logger.error(f"Audio node connection failed: {e}")
+        finally:
+            self.writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(NodeError("Audio node connection closed"))
+            # Whatever was playing on the node is gone
+            for voice_client in list(self.voice_clients.values()):
+                voice_client._on_event({'type': 'voice_closed', 'reason': 'node connection lost'})
+            logger.warning(f"Disconnected from audio node at {self.address}")
+
+
+class NodePool:
+    """Audio nodes available to the bot, each guild is placed on the node with the fewest guilds"""
+
+    def __init__(self, addresses, token=None):
+        self.nodes = [NodeClient(address, token) for address in addresses]
+
+    def select(self):
+        return min(self.nodes, key=lambda node: (not node.connected, len(node.voice_clients)))
+
+    def get_stats(self):
+        """Get the guilds per node"""
+        return {node.address: len(node.voice_clients) if node.connected else 'disconnected'
+                for node in self.nodes}
+
+
+class RemoteTrack:
+    """What PlayerService keeps for a song playing on an audio node, in place of a local TrackedAudio.
+
+    The node reports the frames it sent now and then. In between, frames
+    are estimated from the time spent playing, so `position` is always
+    current enough to seek or restart from.
+    """
+
+    FRAME_LENGTH = FRAME_LENGTH
+
+    def __init__(self, url, offset=0, bitrate=None, mode='pcm', filters=(), volume=1.0, normalization=1.0,
+                 speed=1.0, duration=None):
+        self.url = url
+        self.offset = offset
+        self.bitrate = bitrate
+        self.mode = mode  # 'passthrough', 'opus' (encoded by ffmpeg) or 'pcm' (volume stage on the node)
+        self.passthrough = mode == 'passthrough'
+        self.filters = list(filters)
+        self.volume = volume
+        self.normalization = normalization
+        self.speed = speed
+        self.duration = duration
+        self.original = None  # no local source chain
+        self.counted = 0.0
+        self.track_id = None
+        self._reported_frames = 0
+        self._reported_at = None  # monotonic time of the last report while playing, None while paused
+
+    @property
+    def frames(self):
+        if self._reported_at is None:
+            return self._reported_frames
+        return self._reported_frames + int((time.monotonic() - self._reported_at) / FRAME_LENGTH)
+
+    @property
+    def position(self):
+        return self.offset + self.frames * self.FRAME_LENGTH * self.speed
+
+    def _report(self, frames, playing):
+        self._reported_frames = frames
+        self._reported_at = time.monotonic() if playing else None
+
+    def to_message(self):
+        return {'url': self.url, 'start': self.offset, 'bitrate': self.bitrate, 'mode': self.mode,
+                'filters': self.filters, 'volume': self.volume, 'normalization': self.normalization,
+                'speed': self.speed, 'duration': self.duration}
+
+
+class NodeVoiceClient(discord.VoiceProtocol):
+    """Voice connection whose audio is sent by an audio node process.
+
+    The gateway stays in the bot: voice state and server updates are
+    forwarded to the node, which runs the voice websocket and UDP. The
+    methods the music cog uses on a py-cord VoiceClient (play, stop, pause,
+    is_playing, move_to, ...) are mirrored, with `play` taking a RemoteTrack.
+    """
+
+    def __init__(self, client, channel, node=None, timeout=30):
+        super().__init__(client, channel)
+        self.node = node
+        self.timeout = timeout
+        self.encoder = None  # encoding happens on the node
+        self.track = None
+        self._connected = False
+        self._reconnecting = False  # the node dropped the voice server and is joining again
+        self._ready = asyncio.Event()
+        self._playing = False
+        self._paused = False
+        self._afters = {}  # track_id: after callback
+        self._track_ids = itertools.count(1)
+
+    @property
+    def guild(self):
+        return getattr(self.channel, 'guild', None)
+
+    @property
+    def source(self):
+        return self.track if self._playing or self._paused else None
+
+    async def connect(self, *, timeout, reconnect):
+        self.node.voice_clients[self.guild.id] = self
+        self._ready.clear()
+        try:
+            # The node asks for the voice updates with a 'voice_connect' event once it is listening
+            await self.node.request('connect', self.guild.id, channel_id=self.channel.id,
+                                    user_id=self.client.user.id, timeout=timeout)
+        except NodeError:
+            self.node.voice_clients.pop(self.guild.id, None)
+            self.cleanup()
+            raise
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        self._connected = True
+
+    async def on_voice_state_update(self, data):
+        if data.get('channel_id') is None and not self._reconnecting:
+            await self.disconnect(force=True)
+            return
+        self.channel = self.guild.get_channel(int(data['channel_id'])) or self.channel
+        self.node.notify('voice_state', self.guild.id, data=data)
+
+    async def on_voice_server_update(self, data):
+        self.node.notify('voice_server', self.guild.id, data=data)
+
+    async def disconnect(self, *, force=False):
+        if not force and not self._connected:
+            return
+        self.stop()
+        self._connected = False
+        try:
+            if self.node.connected:
+                await self.node.request('destroy', self.guild.id)
+        except NodeError as e:
+            logger.error(f"Could not release the audio node session for guild {self.guild.id}: {e}")
+        finally:
+            self.node.voice_clients.pop(self.guild.id, None)
+            await self.guild.change_voice_state(channel=None)
+            self.cleanup()
+
+    async def move_to(self, channel):
+        await self.guild.change_voice_state(channel=channel)
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._playing and not self._paused
+
+    def is_paused(self):
+        return self._playing and self._paused
+
+    def play(self, track, after=None):
+        """Start a RemoteTrack on the node, `after(error)` is called when it ends or is stopped"""
+        if not self._connected:
+            raise discord.ClientException('Not connected to voice.')
+        track.track_id = next(self._track_ids)
+        track._report(0, True)
+        self.track = track
+        self._afters[track.track_id] = after
+        self._playing = True
+        self._paused = False
+        self.node.notify('play', self.guild.id, track_id=track.track_id, track=track.to_message())
+
+    def stop(self):
+        if self._playing and self.track:
+            self.node.notify('stop', self.guild.id, track_id=self.track.track_id)
+        self._playing = False
+        self._paused = False
+
+    def pause(self):
+        if self.is_playing():
+            self._paused = True
+            self.track._report(self.track.frames, False)
+            self.node.notify('pause', self.guild.id)
+
+    def resume(self):
+        if self.is_paused():
+            self._paused = False
+            self.track._report(self.track.frames, True)
+            self.node.notify('resume', self.guild.id)
+
+    def seek(self, position):
+        """Continue the current track from `position` seconds, the node swaps its source in place"""
+        if self.track:
+            self.track.offset = position
+            self.track.counted = 0.0
+            self.track._report(0, self.is_playing())
+            self.node.notify('seek', self.guild.id, position=position)
+
+    def set_volume(self, volume):
+        """Change the volume of the PCM track playing on the node"""
+        if self.track:
+            self.track.volume = volume
+            self.node.notify('volume', self.guild.id, volume=volume)
+
+    def set_bitrate(self, kbps):
+        """Set the node's Opus encoder bitrate for this guild"""
+        if self._connected:
+            self.node.notify('bitrate', self.guild.id, bitrate=kbps)
+
+    def _on_event(self, event):
+        """Handle an event from the node for this guild"""
+        kind = event.get('type')
+        track_id = event.get('track_id')
+        track = self.track if self.track and self.track.track_id == track_id else None
+
+        if kind == 'ready':
+            self._reconnecting = False
+            self._ready.set()
+        elif kind == 'voice_connect':
+            # The node is (re)joining and needs fresh voice state/server updates
+            asyncio.create_task(self.guild.change_voice_state(channel=self.channel))
+        elif kind == 'voice_disconnect':
+            self._reconnecting = True
+            asyncio.create_task(self.guild.change_voice_state(channel=None))
+        elif kind == 'progress' and track and event.get('offset') == track.offset:
+            # Reports from before a seek are ignored
+            track._report(event['frames'], self.is_playing())
+        elif kind == 'track_end':
+            if track:
+                track._report(event.get('frames', track.frames), False)
+                self._playing = False
+                self._paused = False
+            after = self._afters.pop(track_id, None)
+            if after:
+                error = NodeError(event['error']) if event.get('error') else None
+                try:
+                    after(error)
+                except Exception:
+                    logger.exception("Calling the after function failed.")
+        elif kind == 'voice_closed':
+            logger.warning(f"Audio node closed the voice connection of guild {self.guild.id}: "
+                           f"{event.get('reason', 'unknown reason')}")
+            # Ends the current track (the after callbacks run) and leaves the channel
+            for track_id in list(self._afters):
+                self._on_event({'type': 'track_end', 'track_id': track_id, 'error': event.get('reason')})
+            if self._connected:
+                self._connected = False
+                self.node.voice_clients.pop(self.guild.id, None)
+                asyncio.create_task(self.guild.change_voice_state(channel=None))
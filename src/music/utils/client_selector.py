@@ -0,0 +1,98 @@
+import logging
+import time
+
+logger = logging.getLogger('discord')
+
+
+class _ClientHealth:
+    __slots__ = ('latency', 'error_rate', 'successes', 'failures', 'consecutive_failures',
+                 'open_until', 'trips')
+
+    def __init__(self):
+        self.latency = None  # EWMA of seconds per extraction
+        self.error_rate = 0.0  # EWMA of failures (0..1)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # circuit breaker: skipped until this time
+        self.trips = 0
+
+
+class PlayerClientSelector:
+    """Order yt-dlp YouTube player clients by how well they have been doing.
+
+    Latency and error rate are tracked per client as moving averages and
+    clients are tried best first. A client that fails `failure_threshold`
+    times in a row is skipped for `cooldown` seconds (circuit breaker), then
+    gets a single trial extraction before it is trusted again.
+    """
+
+    def __init__(self, clients=('android', 'web'), alpha=0.3, failure_threshold=3, cooldown=300,
+                 clock=time.monotonic):
+        self.clients = list(clients)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.health = {client: _ClientHealth() for client in self.clients}
+
+    def order(self):
+        """Get the clients to try, best first, leaving out those with an open breaker"""
+        now = self.clock()
+        available = [client for client in self.clients if self.health[client].open_until <= now]
+        if not available:
+            # Every breaker is open, fall back to the one that reopens first
+            available = [min(self.clients, key=lambda client: self.health[client].open_until)]
+        # Stable sort keeps the configured order for ties and unmeasured clients
+        return sorted(available, key=self._score)
+
+    def record_success(self, client, latency):
+        """Record a successful extraction and close the client's breaker"""
+        health = self.health.get(client)
+        if health is None:
+            return
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.open_until = 0.0
+        health.latency = latency if health.latency is None else self._ewma(health.latency, latency)
+        health.error_rate = self._ewma(health.error_rate, 0.0)
+
+    def record_failure(self, client, latency):
+        """Record a failed extraction, opening the breaker after repeated failures"""
+        health = self.health.get(client)
+        if health is None:
+            return
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.latency = latency if health.latency is None else self._ewma(health.latency, latency)
+        health.error_rate = self._ewma(health.error_rate, 1.0)
+        if health.consecutive_failures >= self.failure_threshold:
+            # Also re-opens after a failed trial in the half-open state
+            health.open_until = self.clock() + self.cooldown
+            health.trips += 1
+            logger.warning(f"yt-dlp player client '{client}' keeps failing, not using it for {self.cooldown}s")
+
+    def get_stats(self):
+        """Get the per-client measurements"""
+        now = self.clock()
+        return {
+            client: {
+                'latency': round(health.latency, 3) if health.latency is not None else None,
+                'error_rate': round(health.error_rate, 3),
+                'successes': health.successes,
+                'failures': health.failures,
+                'breaker_open': health.open_until > now,
+                'trips': health.trips
+            }
+            for client, health in self.health.items()
+        }
+
+    def _score(self, client):
+        """Expected seconds per successful extraction (0 for unmeasured clients, so they get tried)"""
+        health = self.health[client]
+        if health.latency is None:
+            return 0.0
+        return health.latency / max(1.0 - health.error_rate, 0.05)
+
+    def _ewma(self, current, sample):
+        return (1 - self.alpha) * current + self.alpha * sample
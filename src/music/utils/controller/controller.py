@@ -1,6 +1,7 @@
 import discord
 from discord.ui import View, Button
 from .utils import (AddSongModal,
+                    SearchModal,
                     get_volume_percentage,
                     volume_down_callback,
                     volume_up_callback,
@@ -11,7 +12,9 @@ from .utils import (AddSongModal,
                     play_next,
                     join_vc_callback,
                     leave_vc_callback,
-                    repeat_callback)
+                    repeat_callback,
+                    seek_back_callback,
+                    seek_forward_callback)
 
 
 class MusicControllerView(View):
@@ -53,6 +56,12 @@ class MusicControllerView(View):
                   custom_id="music_add_song")
         add_song_button.callback = self.add_song_callback
         
+        # Search button (pick from several results)
+        search_button = Button(style=discord.ButtonStyle.secondary,
+                  label="🔎 Search",
+                  custom_id="music_search")
+        search_button.callback = self.search_callback
+        
         # Volume control buttons
         volume_down_button = Button(style=discord.ButtonStyle.secondary, 
                                     label="🔉 -10%", 
@@ -91,6 +100,17 @@ class MusicControllerView(View):
                                   custom_id="music_repeat")
         repeat_button.callback = self.repeat_callback
         
+        # Seek buttons
+        seek_back_button = Button(style=discord.ButtonStyle.secondary,
+                                   label="⏪ -10s",
+                                     custom_id="music_seek_back")
+        seek_back_button.callback = self.seek_back_callback
+        
+        seek_forward_button = Button(style=discord.ButtonStyle.secondary,
+                                      label="⏩ +10s",
+                                        custom_id="music_seek_forward")
+        seek_forward_button.callback = self.seek_forward_callback
+        
         # Refresh button - moved to end
         refresh_button = Button(style=discord.ButtonStyle.secondary,
                                  label="🔄 Refresh",
@@ -111,8 +131,11 @@ class MusicControllerView(View):
         self.add_item(join_button)
         self.add_item(leave_button)
         
-        # Third row - repeat and refresh
+        # Third row - seek, repeat, search and refresh
+        self.add_item(seek_back_button)
+        self.add_item(seek_forward_button)
         self.add_item(repeat_button)
+        self.add_item(search_button)
         self.add_item(refresh_button)
 
     def get_volume_percentage(self):
@@ -149,7 +172,7 @@ class MusicControllerView(View):
         await interaction.response.defer(ephemeral=True)
         
         # Update the controller
-        await self.music_cog.controller_service.update_controller(self.guild_id)
+        await self.music_cog.controller_service.update_controller(self.guild_id, force=True)
         
         # Send confirmation
         await interaction.followup.send("Controller refreshed!", ephemeral=True)
@@ -162,10 +185,23 @@ class MusicControllerView(View):
         # Send the modal
         await interaction.response.send_modal(modal)
     
+    async def search_callback(self, interaction):
+        """Show a modal to search for a song"""
+        modal = SearchModal(self.music_cog, self.guild_id)
+        await interaction.response.send_modal(modal)
+    
     async def repeat_callback(self, interaction):
         """Toggle repeat mode"""
         await repeat_callback(self, interaction)
 
+    async def seek_back_callback(self, interaction):
+        """Go back 10 seconds"""
+        await seek_back_callback(self, interaction)
+    
+    async def seek_forward_callback(self, interaction):
+        """Go forward 10 seconds"""
+        await seek_forward_callback(self, interaction)
+
     async def play_next(self, guild_id):
         """Play the next song in the queue"""
         await play_next(self, guild_id)
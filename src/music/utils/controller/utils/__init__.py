@@ -1,4 +1,6 @@
 from .add_song_modal import AddSongModal
+from .search_modal import SearchModal
+from .search_view import SearchResultsView, build_search_embed
 from .volume import get_volume_percentage, volume_down_callback, volume_up_callback
 from .play_pause_next import play_pause_callback, play_next
 from .skip import skip_callback
@@ -6,10 +8,14 @@ from .queue import clear_queue_callback, queue_callback
 from .join import join_vc_callback
 from .leave import leave_vc_callback
 from .repeat import repeat_callback
+from .seek import seek_back_callback, seek_forward_callback
 
 
 __all__ = [
     'AddSongModal',
+    'SearchModal',
+    'SearchResultsView',
+    'build_search_embed',
     'get_volume_percentage',
     'volume_down_callback',
     'volume_up_callback',
@@ -20,5 +26,7 @@ __all__ = [
     'play_next',
     'join_vc_callback',
     'leave_vc_callback',
-    'repeat_callback'
+    'repeat_callback',
+    'seek_back_callback',
+    'seek_forward_callback'
 ]
\ No newline at end of file
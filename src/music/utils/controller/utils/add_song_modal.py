@@ -38,25 +38,22 @@ class AddSongModal(Modal):
                 
                 # Connect to voice channel directly
                 try:
-                    voice_client = await voice_channel.connect()
+                    voice_client = await self.music_cog.voice_manager.connect(voice_channel)
                     self.music_cog.voice_manager.set_voice_client(self.guild_id, voice_client)
                 except Exception as e:
                     await interaction.followup.send(f"Error connecting to voice channel: {str(e)}", ephemeral=True)
                     return
             
             # Get song info
-            from ...youtube import get_song_info
             #type_msg = 'playlist' if is_youtube_playlist(url) else 'video/search'
             #await interaction.followup.send(f"Processing {type_msg}... This may take a moment.", ephemeral=True)
             
-            songs_info, metadata = await get_song_info(self.music_cog.ytdl, url)
+            # Resolve and add songs to queue
+            songs_info, metadata = await self.music_cog.player_service.add_songs(self.guild_id, url, interaction.user.id)
             if not songs_info:
                 await interaction.followup.send("No songs found for the provided URL or search query", ephemeral=True)
                 return
             
-            # Add songs to queue
-            self.music_cog.queue_manager.add_multiple_to_queue(self.guild_id, songs_info)
-            
             # Notify user
             """if len(songs_info) == 1:
                 await interaction.followup.send(f"Added to queue: {songs_info[0]['title']}", ephemeral=True)
@@ -24,7 +24,7 @@ async def join_vc_callback(self, interaction):
         else:
             # Connect to the voice channel
             try:
-                voice_client = await voice_channel.connect()
+                voice_client = await self.music_cog.voice_manager.connect(voice_channel)
                 self.music_cog.voice_manager.set_voice_client(guild_id, voice_client)
                 #await interaction.followup.send(f"Joined {voice_channel.name}", ephemeral=True)
             except Exception as e:
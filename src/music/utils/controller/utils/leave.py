@@ -13,7 +13,7 @@ async def leave_vc_callback(self, interaction):
     
     # Clear data
     self.music_cog.voice_manager.clear_voice_client(guild_id)
-    self.music_cog.queue_manager.clear_guild_data(guild_id)
+    self.music_cog.player_service.cleanup(guild_id)
     
     await interaction.response.defer(ephemeral=True)
     
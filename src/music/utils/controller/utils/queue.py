@@ -1,10 +1,14 @@
 import discord
 from ...formatter import format_duration, split_text
 
+# Songs listed by the queue button, an embed cannot hold a long queue
+QUEUE_SHOWN = 20
+
 async def clear_queue_callback(self, interaction):
     guild_id = interaction.guild_id
     
-    # Clear the queue
+    # Clear the queue (and stop a playlist import from refilling it)
+    self.music_cog.playlist_service.cancel(guild_id)
     self.music_cog.queue_manager.clear_queue(guild_id)
     
     await interaction.response.defer(ephemeral=True)
@@ -42,9 +46,11 @@ async def queue_callback(self, interaction):
         # Add queue
         if queue:
             queue_list = []
-            for i, song in enumerate(queue, 1):
+            for i, song in enumerate(queue[:QUEUE_SHOWN], 1):
                 duration = format_duration(song['duration'])
                 queue_list.append(f"{i}. [{song['title']}]({song['webpage_url']}) ({duration})")
+            if len(queue) > QUEUE_SHOWN:
+                queue_list.append(f"... and {len(queue) - QUEUE_SHOWN} more songs")
             
             queue_text = "\n".join(queue_list)
             if len(queue_text) <= 1024:
@@ -58,10 +64,10 @@ async def queue_callback(self, interaction):
                         inline=False
                     )
         
-        # Add total duration
-        total_duration = sum(song['duration'] for song in queue)
+        # Add total duration (kept up to date by the queue, no need to add it up here)
+        total_duration = queue.total_duration
         if current_song:
-            total_duration += current_song['duration']
+            total_duration += current_song.get('duration') or 0
         embed.set_footer(
             text=f"Total songs: {len(queue) + (1 if current_song else 0)} | " +
                 f"Total duration: {format_duration(total_duration)}"
@@ -0,0 +1,50 @@
+import discord
+from discord.ui import Modal, InputText
+from .search_view import SearchResultsView, build_search_embed
+
+class SearchModal(Modal):
+    def __init__(self, music_cog, guild_id):
+        super().__init__(title="Search for a Song")
+        self.music_cog = music_cog
+        self.guild_id = guild_id
+        
+        # Add text input for the search term
+        self.query_input = InputText(
+            label="Search Term",
+            placeholder="Enter a song name or artist...",
+            style=discord.InputTextStyle.short,
+            required=True,
+            max_length=200
+        )
+        self.add_item(self.query_input)
+    
+    async def callback(self, interaction):
+        await interaction.response.defer(ephemeral=True)
+        
+        query = self.query_input.value
+        
+        try:
+            # Join voice channel if not already in one
+            voice_client = self.music_cog.voice_manager.get_voice_client(self.guild_id)
+            if not voice_client:
+                if not interaction.user.voice or not interaction.user.voice.channel:
+                    await interaction.followup.send("You need to be in a voice channel to use this command.", ephemeral=True)
+                    return
+                
+                try:
+                    voice_client = await self.music_cog.voice_manager.connect(interaction.user.voice.channel)
+                    self.music_cog.voice_manager.set_voice_client(self.guild_id, voice_client)
+                except Exception as e:
+                    await interaction.followup.send(f"Error connecting to voice channel: {str(e)}", ephemeral=True)
+                    return
+            
+            songs = await self.music_cog.player_service.search(self.guild_id, query)
+            if not songs:
+                await interaction.followup.send("No results found", ephemeral=True)
+                return
+            
+            view = SearchResultsView(self.music_cog, self.guild_id, interaction.user.id, songs)
+            await interaction.followup.send(embed=build_search_embed(query, songs), view=view, ephemeral=True)
+        
+        except Exception as e:
+            await interaction.followup.send(f"Error processing your request: {str(e)}", ephemeral=True)
@@ -0,0 +1,65 @@
+import discord
+import logging
+from discord.ui import View, Select
+from ...formatter import format_duration
+
+logger = logging.getLogger('discord')
+
+def build_search_embed(query, songs):
+    """Build the embed listing search results"""
+    lines = [f"{i+1}. [{song['title']}]({song['webpage_url']}) ({format_duration(song['duration'])}) - {song['channel']}"
+             for i, song in enumerate(songs)]
+    return discord.Embed(
+        title=f"🔎 Results for: {query[:200]}",
+        description="\n".join(lines),
+        color=discord.Color.blue()
+    )
+
+class SearchResultsView(View):
+    """Select menu over flat search results, only the picked entry gets resolved"""
+    
+    def __init__(self, music_cog, guild_id, user_id, songs, timeout=120):
+        super().__init__(timeout=timeout)
+        self.music_cog = music_cog
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.songs = songs
+        
+        select = Select(
+            placeholder="Choose a song to add to the queue",
+            options=[
+                discord.SelectOption(
+                    label=song['title'][:100],
+                    description=f"{format_duration(song['duration'])} • {song['channel']}"[:100],
+                    value=str(i)
+                )
+                for i, song in enumerate(songs)
+            ]
+        )
+        select.callback = self.select_callback
+        self.add_item(select)
+    
+    async def select_callback(self, interaction):
+        """Queue the chosen result"""
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Only the person who searched can pick a result.", ephemeral=True)
+            return
+        
+        song = self.songs[int(interaction.data['values'][0])]
+        voice_client = self.music_cog.voice_manager.get_voice_client(self.guild_id)
+        if not voice_client or not voice_client.is_connected():
+            await interaction.response.send_message("I'm not connected to a voice channel", ephemeral=True)
+            return
+        
+        # The view is single use
+        self.stop()
+        await interaction.response.edit_message(
+            content=f"✅ Added to queue: [{song['title']}]({song['webpage_url']})", embed=None, view=None)
+        
+        try:
+            self.music_cog.player_service.enqueue(self.guild_id, [song], interaction.user.id)
+            await self.music_cog.player_service.play_song(self.guild_id)
+            await self.music_cog.controller_service.update_controller(self.guild_id)
+        except Exception as e:
+            logger.error(f"Error adding search result: {e}", exc_info=True)
+            await interaction.followup.send(f"Error processing your request: {str(e)}", ephemeral=True)
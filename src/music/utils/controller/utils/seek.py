@@ -0,0 +1,22 @@
+from ...formatter import format_duration
+
+SEEK_STEP = 10  # seconds moved by the controller buttons
+
+async def seek_callback(self, interaction, offset):
+        """Move playback by an offset in seconds"""
+        await interaction.response.defer(ephemeral=True)
+        
+        position = await self.music_cog.player_service.seek_manager.seek_by(self.guild_id, offset)
+        if position is None:
+            await interaction.followup.send("Nothing to seek in (not playing, or a live stream)", ephemeral=True)
+        else:
+            await interaction.followup.send(f"Jumped to {format_duration(position) if position >= 1 else '0:00'}",
+                                            ephemeral=True)
+
+async def seek_back_callback(self, interaction):
+        """Go back 10 seconds"""
+        await seek_callback(self, interaction, -SEEK_STEP)
+
+async def seek_forward_callback(self, interaction):
+        """Go forward 10 seconds"""
+        await seek_callback(self, interaction, SEEK_STEP)
\ No newline at end of file
@@ -0,0 +1,396 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import yt_dlp
+
+logger = logging.getLogger('discord')
+
+# Keys stripped from extraction results before they leave the worker.
+# They are large, never used by the bot and expensive to pickle across processes.
+HEAVY_INFO_KEYS = ('formats', 'thumbnails', 'automatic_captions', 'subtitles', 'heatmap')
+
+# Error fragments that mean a link will keep failing (cached as negative entries).
+# Anything else (network errors, timeouts, throttling) is treated as transient, and so are
+# format errors ("Requested format is not available"), which depend on the player client.
+NEGATIVE_ERROR_MARKERS = (
+    'private video',
+    'video unavailable',
+    'this video is not available',
+    'has been removed',
+    'no results found',
+    'does not exist',
+    'account associated with this video has been terminated',
+)
+
+
+def is_permanent_error(error):
+    """Check if an extraction error means the link is dead rather than temporarily failing"""
+    error_str = str(error).lower()
+    return any(marker in error_str for marker in NEGATIVE_ERROR_MARKERS)
+
+
+# Profiles that run YouTube's player API, where the player_client choice matters
+ADAPTIVE_PROFILES = ('default', 'stream')
+
+# Warm YoutubeDL instances, one set per worker thread/process
+_worker_state = threading.local()
+
+
+def _get_worker_ytdl(profile):
+    """Get (or lazily build) the warm YoutubeDL instance for a profile in this worker"""
+    instances = getattr(_worker_state, 'instances', None)
+    if instances is None:
+        instances = _worker_state.instances = {}
+    ytdl = instances.get(profile)
+    if ytdl is None:
+        from .youtube import get_ytdlp_options
+        ytdl = instances[profile] = yt_dlp.YoutubeDL(get_ytdlp_options(profile))
+    return ytdl
+
+
+def _warm_worker():
+    """Process pool initializer: build the default YoutubeDL before the first job arrives"""
+    _get_worker_ytdl('default')
+
+
+def _run_extraction(profile, url, params=None):
+    """Run a single extraction inside a worker and return a slim, picklable info dict"""
+    ytdl = _get_worker_ytdl(profile)
+
+    # Per-job params are applied on top of the warm instance and restored afterwards
+    saved = {}
+    if params:
+        for key, value in params.items():
+            saved[key] = ytdl.params.get(key)
+            ytdl.params[key] = value
+    try:
+        info = ytdl.extract_info(url, download=False)
+    except Exception as e:
+        # yt-dlp errors carry loggers and other unpicklable state, only the message crosses back
+        raise ExtractionError(str(e)) from None
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                ytdl.params.pop(key, None)
+            else:
+                ytdl.params[key] = value
+
+    if not info:
+        return None
+    for key in HEAVY_INFO_KEYS:
+        info.pop(key, None)
+    return ytdl.sanitize_info(info)
+
+
+class ExtractionError(Exception):
+    """Raised when yt-dlp fails to extract a URL"""
+
+
+class ExtractionCancelled(Exception):
+    """Raised to callers whose extraction was cancelled by a skip, stop or leave"""
+
+
+class _ExtractionJob:
+    __slots__ = ('guild_id', 'profile', 'url', 'params', 'timeout', 'future', 'timer', 'started_at', 'elapsed',
+                 'executor')
+
+    def __init__(self, guild_id, profile, url, params, timeout, future):
+        self.guild_id = guild_id
+        self.profile = profile
+        self.url = url
+        self.params = params
+        self.timeout = timeout
+        self.future = future
+        self.timer = None
+        self.started_at = None
+        self.elapsed = None  # seconds spent in a worker, once finished
+        self.executor = None  # executor the job was submitted to
+
+
+class ExtractorPool:
+    """Bounded yt-dlp extraction pool shared by all guilds.
+
+    Jobs are queued per guild and dispatched round-robin, so a burst of requests
+    from one guild cannot starve the others. Workers keep their YoutubeDL
+    instances warm between jobs and, by default, run in separate processes so
+    signature decoding does not hold the bot's GIL.
+
+    A job that times out or is cancelled while running is abandoned: its caller
+    is released and it stops counting against `max_workers`. A timeout, or
+    abandoned jobs holding every worker, replaces the executor. The old one
+    drains its healthy jobs, then its remaining workers are terminated.
+    """
+
+    def __init__(self, max_workers=4, use_processes=True, job_timeout=30, client_selector=None):
+        self.max_workers = max_workers
+        self.client_selector = client_selector  # PlayerClientSelector, picks the yt-dlp player_client
+        self.job_timeout = job_timeout
+        self.use_processes = use_processes
+        self._executor = self._create_executor()
+
+        self._pending = {}  # guild_id: deque(jobs)
+        self._rotation = deque()  # guild ids with pending jobs, in round-robin order
+        self._running = set()  # jobs counted against max_workers
+        self._abandoned = set()  # jobs whose caller was released while a worker still runs them
+        self._retired = []  # (executor, its worker processes) replaced while jobs were still running
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'cancelled': 0,
+            'recycled': 0
+        }
+        self.profile_stats = {}  # profile: {'jobs', 'seconds'} of successful extractions
+
+    def _create_executor(self):
+        """Create the worker executor, falling back to threads if processes are unavailable"""
+        if self.use_processes:
+            try:
+                return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable for extraction, using threads: {e}")
+                self.use_processes = False
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ytdl')
+
+    async def extract(self, url, profile='default', guild_id=None, params=None, timeout=None):
+        """Queue an extraction for a guild and wait for its result"""
+        if self.client_selector and profile in ADAPTIVE_PROFILES and 'extractor_args' not in (params or {}):
+            return await self._extract_adaptive(url, profile, guild_id, params, timeout)
+        return await self._submit(self._new_job(url, profile, guild_id, params, timeout))
+
+    async def _extract_adaptive(self, url, profile, guild_id, params, timeout):
+        """Extract with the best player client first, falling back to the others on failure"""
+        last_error = None
+        for client in self.client_selector.order():
+            job_params = dict(params or {}, extractor_args=self._get_client_args(profile, client))
+            job = self._new_job(url, profile, guild_id, job_params, timeout)
+            try:
+                result = await self._submit(job)
+            except ExtractionCancelled:
+                raise
+            except Exception as e:
+                if is_permanent_error(e):
+                    raise  # the video is dead, not the client
+                self.client_selector.record_failure(client, job.elapsed or job.timeout)
+                logger.warning(f"Extraction with player client '{client}' failed: {e}")
+                last_error = e
+                continue
+            self.client_selector.record_success(client, job.elapsed)
+            return result
+        raise last_error
+
+    def _get_client_args(self, profile, client):
+        """Get the profile's extractor_args restricted to a single player client"""
+        from .youtube import get_ytdlp_options
+        extractor_args = get_ytdlp_options(profile).get('extractor_args', {})
+        youtube_args = dict(extractor_args.get('youtube', {}), player_client=[client])
+        return dict(extractor_args, youtube=youtube_args)
+
+    def _new_job(self, url, profile, guild_id, params, timeout):
+        """Create a job with a future bound to the running loop"""
+        loop = asyncio.get_running_loop()
+        return _ExtractionJob(guild_id, profile, url, params, timeout or self.job_timeout, loop.create_future())
+
+    async def _submit(self, job):
+        """Queue a job behind the guild's other jobs and wait for its result"""
+        jobs = self._pending.get(job.guild_id)
+        if jobs is None:
+            jobs = self._pending[job.guild_id] = deque()
+            self._rotation.append(job.guild_id)
+        jobs.append(job)
+        self.stats['submitted'] += 1
+        self._dispatch()
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # The caller went away, drop the job if it has not started yet
+            self._remove_pending(job)
+            self._abandon(job)
+            raise
+
+    def cancel_guild(self, guild_id, profile=None):
+        """Cancel queued and running extractions for a guild, optionally only for one profile"""
+        cancelled = 0
+        jobs = self._pending.get(guild_id)
+        if jobs:
+            for job in [job for job in jobs if profile is None or job.profile == profile]:
+                self._remove_pending(job)
+                cancelled += self._cancel_job(job)
+
+        # Running jobs are abandoned: their callers are released right away and
+        # their workers are terminated once the executor is replaced
+        for job in list(self._running):
+            if job.guild_id == guild_id and (profile is None or job.profile == profile):
+                cancelled += self._cancel_job(job)
+
+        if cancelled:
+            logger.debug(f"Cancelled {cancelled} extraction(s) for guild {guild_id}")
+            self._dispatch()
+        return cancelled
+
+    def get_stats(self):
+        """Get a snapshot of the pool state and counters"""
+        return {
+            'mode': 'processes' if self.use_processes else 'threads',
+            'workers': self.max_workers,
+            'running': len(self._running),
+            'abandoned': len(self._abandoned),
+            'queued': sum(len(jobs) for jobs in self._pending.values()),
+            'queued_guilds': len(self._pending),
+            'player_clients': self.client_selector.get_stats() if self.client_selector else {},
+            'profiles': {profile: {'jobs': stats['jobs'],
+                                   'avg_seconds': round(stats['seconds'] / stats['jobs'], 3)}
+                         for profile, stats in self.profile_stats.items()},
+            **self.stats
+        }
+
+    def shutdown(self):
+        """Cancel everything and stop the workers"""
+        for guild_id in list(self._pending):
+            self.cancel_guild(guild_id)
+        for job in list(self._running):
+            self._cancel_job(job)
+        processes = self._get_processes(self._executor)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for _, retired_processes in self._retired:
+            processes.extend(retired_processes)
+        self._retired.clear()
+        for process in processes:
+            process.terminate()
+
+    def _dispatch(self):
+        """Start queued jobs round-robin across guilds while there are free workers"""
+        while self._rotation and len(self._running) < self.max_workers:
+            if self._occupied(self._executor) >= self.max_workers:
+                # Abandoned jobs hold every worker, start over rather than queue behind them
+                self._recycle()
+            guild_id = self._rotation.popleft()
+            jobs = self._pending[guild_id]
+            job = jobs.popleft()
+            if jobs:
+                self._rotation.append(guild_id)
+            else:
+                del self._pending[guild_id]
+            self._start(job)
+
+    def _start(self, job):
+        """Submit a job to the executor"""
+        loop = asyncio.get_running_loop()
+        self._running.add(job)
+        try:
+            future = loop.run_in_executor(self._executor, _run_extraction, job.profile, job.url, job.params)
+        except RuntimeError as e:
+            # Executor was shut down underneath us
+            self._running.discard(job)
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        job.executor = self._executor
+        future.add_done_callback(lambda f: self._finish(job, f))
+        job.started_at = time.monotonic()
+        job.timer = loop.call_later(job.timeout, self._expire, job)
+
+    def _finish(self, job, future):
+        """Deliver a worker result to the waiting caller and start the next job"""
+        self._running.discard(job)
+        self._abandoned.discard(job)
+        if job.timer:
+            job.timer.cancel()
+        job.elapsed = time.monotonic() - job.started_at
+
+        error = future.exception() if not future.cancelled() else ExtractionCancelled("Extraction was cancelled")
+        if isinstance(error, BrokenProcessPool) and job.executor is self._executor:
+            # Every job in flight fails with the dead pool, only the first one restarts it
+            logger.error("Extraction worker process died, restarting the pool")
+            broken, self._executor = self._executor, self._create_executor()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+        if not job.future.done():
+            if error:
+                self.stats['failed'] += 1
+                job.future.set_exception(error)
+            else:
+                self.stats['completed'] += 1
+                self._record_time(job)
+                job.future.set_result(future.result())
+        if job.executor is not self._executor:
+            self._reap()
+        self._dispatch()
+
+    def _record_time(self, job):
+        """Add a finished job's wall time to its profile's totals (shows what flat extraction saves)"""
+        stats = self.profile_stats.setdefault(job.profile, {'jobs': 0, 'seconds': 0.0})
+        stats['jobs'] += 1
+        stats['seconds'] += job.elapsed
+
+    def _expire(self, job):
+        """Fail a job that exceeded its timeout and replace the executor its worker is stuck in"""
+        if not job.future.done():
+            self.stats['timed_out'] += 1
+            logger.warning(f"Extraction timed out after {job.timeout}s: {job.url}")
+            job.future.set_exception(asyncio.TimeoutError(f"Extraction timed out after {job.timeout}s"))
+        self._abandon(job)
+        if job in self._abandoned and job.executor is self._executor:
+            self._recycle()
+        self._dispatch()
+
+    def _cancel_job(self, job):
+        """Release the caller of a job with ExtractionCancelled"""
+        self._abandon(job)
+        if job.future.done():
+            return 0
+        self.stats['cancelled'] += 1
+        job.future.set_exception(ExtractionCancelled("Extraction was cancelled"))
+        return 1
+
+    def _abandon(self, job):
+        """Stop counting a running job against max_workers, its result will be discarded"""
+        if job in self._running:
+            self._running.discard(job)
+            self._abandoned.add(job)
+
+    def _occupied(self, executor):
+        """Count the jobs, abandoned or not, still holding a worker of an executor"""
+        return sum(1 for job in self._running | self._abandoned if job.executor is executor)
+
+    def _recycle(self):
+        """Replace the executor, letting the old one finish its healthy jobs"""
+        self.stats['recycled'] += 1
+        logger.warning("Extraction workers are stuck, starting new ones")
+        old, self._executor = self._executor, self._create_executor()
+        # The process list is gone after shutdown, keep it to terminate the stuck workers later
+        self._retired.append((old, self._get_processes(old)))
+        old.shutdown(wait=False, cancel_futures=True)
+        self._reap()
+
+    def _reap(self):
+        """Terminate the workers of replaced executors once only abandoned jobs are left on them"""
+        for retired in list(self._retired):
+            executor, processes = retired
+            if not any(job.executor is executor for job in self._running):
+                self._retired.remove(retired)
+                for process in processes:
+                    process.terminate()
+
+    @staticmethod
+    def _get_processes(executor):
+        """Get the worker processes of an executor (none for threads, which cannot be stopped and drain instead)"""
+        return list((getattr(executor, '_processes', None) or {}).values())
+
+    def _remove_pending(self, job):
+        """Remove a job from the pending queues if it has not started"""
+        jobs = self._pending.get(job.guild_id)
+        if not jobs or job not in jobs:
+            return
+        jobs.remove(job)
+        if not jobs:
+            del self._pending[job.guild_id]
+            self._rotation.remove(job.guild_id)
@@ -11,6 +11,16 @@ def format_duration(duration_seconds):
     else:
         return f"{minutes}:{seconds:02d}"
 
+def parse_time(text):
+    """Parse a time like '83', '1:23' or '1:02:03' into seconds, raises ValueError if invalid"""
+    parts = text.strip().split(':')
+    if not 1 <= len(parts) <= 3 or not all(part.strip().isdigit() for part in parts):
+        raise ValueError(f"Invalid time: {text}")
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
 def split_text(text, max_length):
     """Split text into chunks of max_length"""
     chunks = []
@@ -0,0 +1,130 @@
+import logging
+import math
+import threading
+import time
+
+import discord
+import numpy as np
+
+logger = logging.getLogger('discord')
+
+# Frames quieter than this are left out of the loudness measurement (gating)
+SILENCE_GATE_DB = -60.0
+
+_stats_lock = threading.Lock()
+
+
+def gain_from_loudness(loudness, target=-16.0, max_boost=6.0, max_cut=12.0):
+    """Get the linear gain that brings a track measured at `loudness` dBFS to the target"""
+    change = max(-max_cut, min(max_boost, target - loudness))
+    return 10 ** (change / 20)
+
+
+class GainAudio(discord.AudioSource):
+    """PCM volume stage using vectorized NumPy math, a drop-in for PCMVolumeTransformer.
+
+    The applied gain is `volume` times a per-track normalization gain. Changing
+    `volume` ramps to the new value over `ramp_frames` frames instead of
+    jumping, which avoids clicks. The track's loudness (RMS in dBFS, with
+    near-silent frames gated out) is measured from the samples as they play
+    and handed to `on_measured` once enough of the track has been heard.
+    """
+
+    def __init__(self, original, volume=1.0, normalization=1.0, ramp_frames=10, measure=False,
+                 on_measured=None, min_measure_seconds=30, stats=None):
+        if original.is_opus():
+            raise discord.ClientException('AudioSource must not be Opus encoded.')
+        self.original = original
+        self.normalization = normalization
+        self.ramp_frames = ramp_frames
+        self._volume = max(volume, 0.0)
+        self._gain = self._volume * normalization  # gain applied at the end of the last frame
+        self._ramp_step = 0.0
+        self._ramp_left = 0
+        self.measure = measure
+        self.on_measured = on_measured  # called from the player thread with the loudness in dBFS
+        self.min_measure_frames = int(min_measure_seconds / (discord.opus.Encoder.FRAME_LENGTH / 1000))
+        self.stats = stats  # shared {'frames', 'seconds'} of processing time
+        self._energy = 0.0
+        self._measured_frames = 0
+        self._frames = 0
+        self._seconds = 0.0
+        self._reported = False
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(value, 0.0)
+        target = self._volume * self.normalization
+        self._ramp_left = self.ramp_frames
+        self._ramp_step = (target - self._gain) / self.ramp_frames
+
+    def read(self):
+        data = self.original.read()
+        if not data:
+            self._report()
+            return data
+
+        if not self.measure and not self._ramp_left and self._gain == 1.0:
+            return data
+
+        started = time.perf_counter()
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        if self.measure:
+            energy = float(np.dot(samples, samples)) / len(samples)
+            if energy > (32768 * 10 ** (SILENCE_GATE_DB / 20)) ** 2:
+                self._energy += energy
+                self._measured_frames += 1
+
+        if self._ramp_left:
+            # Interpolate across the frame so the change is spread over every sample
+            start = self._gain
+            self._gain += self._ramp_step
+            self._ramp_left -= 1
+            if not self._ramp_left:
+                self._gain = self._volume * self.normalization
+            samples *= np.linspace(start, self._gain, len(samples), dtype=np.float32)
+            data = None
+        elif self._gain != 1.0:
+            samples *= np.float32(self._gain)
+            data = None
+
+        if data is None:
+            # Symmetric, so a boosted waveform clips the same on both sides
+            np.clip(samples, -32767, 32767, out=samples)
+            data = samples.astype(np.int16).tobytes()
+
+        self._frames += 1
+        self._seconds += time.perf_counter() - started
+        return data
+
+    def get_loudness(self):
+        """Get the loudness measured so far in dBFS, or None if nothing was heard"""
+        if not self._measured_frames:
+            return None
+        return 10 * math.log10(self._energy / self._measured_frames / 32768 ** 2)
+
+    def _report(self):
+        """Hand over the measurement and processing time, once"""
+        if self._reported:
+            return
+        self._reported = True
+        if self.stats is not None:
+            with _stats_lock:
+                self.stats['frames'] += self._frames
+                self.stats['seconds'] += self._seconds
+        if self.measure and self.on_measured and self._measured_frames >= self.min_measure_frames:
+            try:
+                self.on_measured(self.get_loudness())
+            except Exception as e:
+                logger.error(f"Error storing measured loudness: {e}")
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self._report()
+        self.original.cleanup()
\ No newline at end of file
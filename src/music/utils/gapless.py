@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+from array import array
+from collections import deque
+
+import discord
+
+from .gain import GainAudio
+from .jitter_buffer import frame_ready
+
+logger = logging.getLogger('discord')
+
+# Opus packets this small carry no audio (DTX/silence frames)
+OPUS_SILENCE_BYTES = 8
+# PCM frames whose samples all stay below this are treated as silence
+PCM_SILENCE_LEVEL = 64
+
+
+def is_silent(frame, opus):
+    """Check if a 20 ms frame is (near) silence"""
+    if opus:
+        return len(frame) <= OPUS_SILENCE_BYTES
+    samples = array('h', frame)
+    return max(samples, default=0) < PCM_SILENCE_LEVEL and -min(samples, default=0) < PCM_SILENCE_LEVEL
+
+
+class GapStats:
+    """Thread-safe record of the silence between consecutive tracks"""
+
+    def __init__(self, target=0.02):
+        self.target = target  # seconds; a gap above this is audible
+        self.transitions = 0
+        self.gapless = 0
+        self.total_gap = 0.0
+        self.max_gap = 0.0
+        self.over_target = 0
+        self.trimmed_frames = 0
+        self._lock = threading.Lock()
+
+    def record(self, gap, gapless=False):
+        """Record the time between the last frame of one track and the first of the next"""
+        with self._lock:
+            self.transitions += 1
+            self.gapless += gapless
+            self.total_gap += gap
+            self.max_gap = max(self.max_gap, gap)
+            self.over_target += gap > self.target
+
+    def get_stats(self):
+        """Get the transition counters, gaps in milliseconds"""
+        with self._lock:
+            return {
+                'transitions': self.transitions,
+                'gapless': self.gapless,
+                'avg_gap_ms': round(self.total_gap / self.transitions * 1000, 1) if self.transitions else 0,
+                'max_gap_ms': round(self.max_gap * 1000, 1),
+                'over_target': self.over_target,
+                'trimmed_ms': self.trimmed_frames * 20
+            }
+
+
+class PrebufferedAudio(discord.AudioSource):
+    """Source wrapper that can read its first frames ahead of time, dropping leading silence"""
+
+    def __init__(self, original):
+        self.original = original
+        self.buffer = deque()
+
+    def fill(self, frames, trim_silence=True, max_trim=150):
+        """Read frames ahead (blocking, run it in an executor)
+
+        Returns:
+            int: number of leading silent frames dropped
+        """
+        opus = self.original.is_opus()
+        trimmed = 0
+        while trim_silence and trimmed < max_trim:
+            frame = self.original.read()
+            if not frame:
+                return trimmed
+            if not is_silent(frame, opus):
+                self.buffer.append(frame)
+                break
+            trimmed += 1
+        while len(self.buffer) < frames:
+            frame = self.original.read()
+            if not frame:
+                break
+            self.buffer.append(frame)
+        return trimmed
+
+    def read(self):
+        if self.buffer:
+            return self.buffer.popleft()
+        return self.original.read()
+
+    def ready(self):
+        return bool(self.buffer) or frame_ready(self.original)
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.buffer.clear()
+        self.original.cleanup()
+
+
+def prebuffer_track(source, frames, trim_silence=True):
+    """Read the first frames of a TrackedAudio ahead, dropping leading silence (blocking, run it in an executor)
+
+    The frames are kept inside the volume stage so the volume can still be
+    changed, and the source's offset moves past the silence that was dropped.
+
+    Returns:
+        tuple: (the PrebufferedAudio that was put in, number of frames dropped)
+    """
+    parent = source.original if isinstance(source.original, GainAudio) else source
+    buffered = PrebufferedAudio(parent.original)
+    parent.original = buffered
+    trimmed = buffered.fill(frames, trim_silence)
+    source.offset += trimmed * source.FRAME_LENGTH * source.speed
+    return buffered, trimmed
+
+
+class GaplessAudio(discord.AudioSource):
+    """Source handed to the voice client that can move on to the next track without stopping.
+
+    The next track's source is attached ahead of time. When the current one
+    runs dry the switch happens inside the same read call, so the next frame
+    the voice client sends is already the next track's first frame.
+    """
+
+    def __init__(self, source, song, stats=None, previous_end=None, start_stats=None):
+        self.current = source
+        self.song = song
+        self.stats = stats  # GapStats
+        self.previous_end = previous_end  # perf_counter() when the track before this one ended
+        self.start_stats = start_stats or stats  # where the wait for the first frame is recorded
+        self.on_switch = None  # called from the player thread as on_switch(old source, new source, song)
+        self.switches = 0
+        self.ended_at = None  # perf_counter() when the last track ran dry without a successor
+        self._started = False
+        self._next = None  # (source, song, still_valid)
+        self._lock = threading.Lock()
+
+    @property
+    def has_next(self):
+        return self._next is not None
+
+    @property
+    def next_song(self):
+        next_track = self._next
+        return next_track[1] if next_track else None
+
+    def set_next(self, source, song, still_valid=None):
+        """Queue the source to continue with; still_valid() is checked right before switching"""
+        with self._lock:
+            old, self._next = self._next, (source, song, still_valid)
+        if old:
+            old[0].cleanup()
+
+    def clear_next(self):
+        """Drop the prepared next track"""
+        with self._lock:
+            old, self._next = self._next, None
+        if old:
+            old[0].cleanup()
+
+    def read(self):
+        data = self.current.read()
+        if not self._started:
+            self._started = True
+            if self.start_stats and self.previous_end is not None:
+                self.start_stats.record(time.perf_counter() - self.previous_end)
+        if data:
+            return data
+
+        with self._lock:
+            prepared, self._next = self._next, None
+        if prepared is None:
+            self.ended_at = time.perf_counter()
+            return b''
+
+        source, song, still_valid = prepared
+        if still_valid is not None and not still_valid():
+            # The queue changed since the next track was prepared
+            source.cleanup()
+            self.ended_at = time.perf_counter()
+            return b''
+
+        ended_at = time.perf_counter()
+        old = self.current
+        self.current = source
+        self.song = song
+        self.switches += 1
+        data = self.current.read()
+        if self.stats:
+            self.stats.record(time.perf_counter() - ended_at, gapless=True)
+        if self.on_switch:
+            # Cleaning up the old track (killing ffmpeg) is left to the callback, off this thread
+            self.on_switch(old, source, song)
+        else:
+            old.cleanup()
+        return data
+
+    def is_opus(self):
+        return self.current.is_opus()
+
+    def cleanup(self):
+        self.clear_next()
+        self.current.cleanup()
@@ -0,0 +1,174 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import discord
+
+logger = logging.getLogger('discord')
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+_stats_lock = threading.Lock()
+
+
+def frame_ready(source):
+    """Check if reading a source chain would return right away instead of waiting on a jitter buffer
+
+    The chain is followed through `current` (GaplessAudio) and `original`
+    (the other wrappers) to the first source that can tell, by having a
+    ready() method. A chain without a jitter buffer is always ready.
+    """
+    while source is not None:
+        ready = getattr(source, 'ready', None)
+        if ready is not None:
+            return ready()
+        source = getattr(source, 'current', None) or getattr(source, 'original', None)
+    return True
+
+
+def _count(stats, key, amount=1):
+    """Add to a counter shared by all buffers (updated from their threads)"""
+    if stats is not None:
+        with _stats_lock:
+            stats[key] = stats.get(key, 0) + amount
+
+
+class BufferedAudio(discord.AudioSource):
+    """Read frames ahead on a background thread so network stalls do not reach the voice client.
+
+    The buffer targets `target` frames and never holds more than `max_frames`,
+    which bounds memory per session (150 PCM frames are ~560 KiB). A read from
+    the source slower than `stall_threshold`, or the voice client finding the
+    buffer empty, grows the target enough to have covered it; after
+    `shrink_after` seconds without trouble it shrinks back towards `min_frames`.
+
+    Frames are stored as read, so a PCMVolumeTransformer wrapped around this
+    still applies volume changes to the very next frame sent.
+
+    read() waits for a frame like the source itself would. A sender shared
+    with other guilds checks ready() first and skips the frame instead, an
+    empty buffer then counts as one underrun until frames arrive again.
+    """
+
+    def __init__(self, original, min_frames=10, max_frames=150, target=25, stall_threshold=0.1,
+                 shrink_after=30, stats=None):
+        self.original = original
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.target = max(min_frames, min(target, max_frames))
+        self.stall_threshold = stall_threshold
+        self.shrink_after = shrink_after
+        self.stats = stats  # dict of counters shared between buffers
+        self.underruns = 0
+        self.stalls = 0
+        self.max_latency = 0.0
+        self.buffer = deque()
+        self._eof = False
+        self._stopped = False
+        self._delivered = False  # no underruns are counted before the first frame
+        self._starved = False  # the current underrun was counted already
+        self._last_trouble = time.monotonic()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._reader, name='audio-buffer', daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        """Keep the buffer filled up to the target until the source ends or cleanup is called"""
+        try:
+            while True:
+                with self._cond:
+                    while len(self.buffer) >= self.target and not self._stopped:
+                        self._cond.wait()
+                    if self._stopped:
+                        return
+
+                started = time.monotonic()
+                frame = self.original.read()
+                latency = time.monotonic() - started
+
+                with self._cond:
+                    self.max_latency = max(self.max_latency, latency)
+                    if latency > self.stall_threshold:
+                        self.stalls += 1
+                        _count(self.stats, 'stalls')
+                        self._grow(math.ceil(latency / FRAME_SECONDS))
+                    elif self.target > self.min_frames and time.monotonic() - self._last_trouble >= self.shrink_after:
+                        self.target = max(self.min_frames, self.target - 5)
+                        self._last_trouble = time.monotonic()  # one step per quiet period
+                        _count(self.stats, 'shrunk')
+                    if not frame:
+                        self._eof = True
+                    else:
+                        self.buffer.append(frame)
+                    self._cond.notify_all()
+                    if self._eof:
+                        return
+        except Exception as e:
+            if not self._stopped:
+                logger.error(f"Audio buffer reader failed: {e}")
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def _grow(self, frames):
+        """Raise the target so a gap of this many frames would have been covered (lock held)"""
+        self._last_trouble = time.monotonic()
+        target = min(self.max_frames, max(self.target, frames + self.min_frames))
+        if target > self.target:
+            self.target = target
+            _count(self.stats, 'grown')
+
+    def _underrun(self):
+        """Count running out of frames once per empty period and grow the target (lock held)"""
+        if not self.buffer and not self._eof and self._delivered and not self._starved:
+            self._starved = True
+            self.underruns += 1
+            _count(self.stats, 'underruns')
+            self._grow(self.target)
+            self._cond.notify_all()
+
+    def ready(self):
+        """Check if read() would return without waiting (a frame is buffered or the source ended)"""
+        with self._cond:
+            if self.buffer or self._eof or self._stopped:
+                return True
+            self._underrun()
+            return False
+
+    def read(self):
+        with self._cond:
+            self._underrun()
+            while not self.buffer and not self._eof and not self._stopped:
+                # Same as reading the source directly: wait for the next frame
+                self._cond.wait()
+            if not self.buffer:
+                return b''
+            frame = self.buffer.popleft()
+            self._delivered = True
+            self._starved = False
+            self._cond.notify_all()
+            return frame
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def get_stats(self):
+        """Get this buffer's state"""
+        return {
+            'buffered': len(self.buffer),
+            'target': self.target,
+            'underruns': self.underruns,
+            'stalls': self.stalls,
+            'max_latency_ms': round(self.max_latency * 1000)
+        }
+
+    def cleanup(self):
+        with self._cond:
+            self._stopped = True
+            self.buffer.clear()
+            self._cond.notify_all()
+        # Let a read in progress finish, then kill the source (which also unblocks a stalled read)
+        self._thread.join(timeout=0.5)
+        self.original.cleanup()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from ...utils.json_manager import JsonManager
+from .youtube import get_extraction_key
+from .extractor_pool import is_permanent_error
+
+logger = logging.getLogger('discord')
+
+
+class MetadataCache:
+    """Persistent cache mapping search queries to video ids and video ids to song metadata.
+
+    Each table is a size-bounded LRU with its own TTL. Failed lookups for dead
+    links are kept as negative entries so they are not extracted again. Changes
+    are kept in memory and written to disk by flush() (in a worker thread) or
+    save(), replacing the file atomically so a crash never leaves half of one.
+    """
+
+    def __init__(self, filename="music_metadata_cache.json", max_entries=5000,
+                 query_ttl=7 * 24 * 3600, metadata_ttl=30 * 24 * 3600, negative_ttl=6 * 3600):
+        self.json_manager = JsonManager(filename)
+        self.max_entries = max_entries
+        self.query_ttl = query_ttl
+        self.metadata_ttl = metadata_ttl
+        self.negative_ttl = negative_ttl
+
+        self.queries = OrderedDict()  # normalized query: {'video_id', 'cached_at'}
+        self.videos = OrderedDict()  # video_id: {'title', 'duration', 'webpage_url', 'cached_at', 'loudness'}
+        self.negative = OrderedDict()  # normalized query or video key: {'error', 'cached_at'}
+        self.dirty = False
+        self._saving = False  # a flush is writing
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0}
+
+        self.load()
+
+    def load(self):
+        """Load the cache from disk, dropping entries that expired while the bot was down"""
+        try:
+            data = self.json_manager.get_all()
+            now = time.time()
+            self.queries = OrderedDict((k, v) for k, v in data.get("queries", {}).items()
+                                       if now - v['cached_at'] < self.query_ttl)
+            self.videos = OrderedDict((k, v) for k, v in data.get("videos", {}).items()
+                                      if now - v['cached_at'] < self.metadata_ttl)
+            self.negative = OrderedDict((k, v) for k, v in data.get("negative", {}).items()
+                                        if now - v['cached_at'] < self.negative_ttl)
+            logger.info(f"Loaded metadata cache with {len(self.videos)} videos and {len(self.queries)} queries")
+        except Exception as e:
+            logger.error(f"Error loading metadata cache: {e}")
+
+    def _snapshot(self):
+        """Copy the tables for writing (entries are updated in place, e.g. by store_loudness)"""
+        return {
+            "queries": {key: dict(value) for key, value in self.queries.items()},
+            "videos": {key: dict(value) for key, value in self.videos.items()},
+            "negative": {key: dict(value) for key, value in self.negative.items()}
+        }
+
+    def _write(self, data):
+        """Write compact JSON to a temporary file and move it over the cache file"""
+        path = self.json_manager.filename
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    async def flush(self):
+        """Write the cache to disk in a worker thread if it changed"""
+        if not self.dirty or self._saving:
+            return
+        self._saving = True
+        self.dirty = False
+        try:
+            await asyncio.to_thread(self._write, self._snapshot())
+        except Exception as e:
+            self.dirty = True
+            logger.error(f"Error saving metadata cache: {e}")
+        finally:
+            self._saving = False
+
+    def save(self):
+        """Write the cache to disk if it changed (blocking, for shutdown)"""
+        if not self.dirty:
+            return
+        try:
+            self._write(self._snapshot())
+            self.dirty = False
+        except Exception as e:
+            logger.error(f"Error saving metadata cache: {e}")
+
+    def lookup(self, url):
+        """Look up a URL or search query
+
+        Returns:
+            tuple: ('hit', song dict), ('negative', error message) or (None, None)
+        """
+        key = self._key(url)
+        negative = self._get(self.negative, key, self.negative_ttl)
+        if negative:
+            self.stats['negative_hits'] += 1
+            return 'negative', negative['error']
+
+        video_id = key[len('video:'):] if key.startswith('video:') else None
+        if video_id is None:
+            query = self._get(self.queries, key, self.query_ttl)
+            video_id = query['video_id'] if query else None
+
+        video = self._get(self.videos, video_id, self.metadata_ttl) if video_id else None
+        if not video:
+            self.stats['misses'] += 1
+            return None, None
+
+        self.stats['hits'] += 1
+        return 'hit', {
+            'title': video['title'],
+            'url': None,  # stream URLs expire, they are resolved at play time
+            'webpage_url': video['webpage_url'],
+            'duration': video['duration'],
+            'video_id': video_id
+        }
+
+    def store(self, url, song):
+        """Remember the song a URL or query resolved to (placeholders still pending are not stored)"""
+        video_id = song.get('video_id')
+        if not video_id or song.get('pending'):
+            return
+        now = time.time()
+        key = self._key(url)
+        self.store_query(url, video_id)
+        entry = {
+            'title': song['title'],
+            'duration': song['duration'],
+            'webpage_url': song['webpage_url'],
+            'cached_at': now
+        }
+        previous = self.videos.get(video_id)
+        if previous and 'loudness' in previous:
+            entry['loudness'] = previous['loudness']
+        self._put(self.videos, video_id, entry)
+        self.negative.pop(key, None)
+    
+    def store_query(self, url, video_id):
+        """Remember which video a search query found, it is a hit once the video itself is stored"""
+        key = self._key(url)
+        if video_id and not key.startswith('video:'):
+            self._put(self.queries, key, {'video_id': video_id, 'cached_at': time.time()})
+
+    def get_loudness(self, video_id):
+        """Get the measured loudness of a video in dBFS, or None"""
+        video = self._get(self.videos, video_id, self.metadata_ttl) if video_id else None
+        return video.get('loudness') if video else None
+    
+    def store_loudness(self, video_id, loudness):
+        """Remember the loudness measured while a video played"""
+        video = self.videos.get(video_id)
+        if video is None:
+            return
+        video['loudness'] = round(loudness, 2)
+        self.dirty = True
+
+    def store_failure(self, url, error):
+        """Remember that a URL or query is dead, if the error is permanent
+
+        Errors that may go away with another player client or later on (format
+        errors, throttling, network) are not cached.
+        """
+        if not is_permanent_error(error):
+            return False
+        self._put(self.negative, self._key(url), {'error': str(error), 'cached_at': time.time()})
+        return True
+
+    def get_stats(self):
+        """Get the cache sizes and counters"""
+        return {
+            'queries': len(self.queries),
+            'videos': len(self.videos),
+            'negative': len(self.negative),
+            **self.stats
+        }
+
+    def _key(self, url):
+        """Normalize a URL or query into a cache key"""
+        _, kind, value = get_extraction_key(url)
+        return f"{kind}:{value}"
+
+    def _get(self, table, key, ttl):
+        """Get a fresh entry and mark it as recently used"""
+        entry = table.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['cached_at'] >= ttl:
+            del table[key]
+            self.dirty = True
+            return None
+        table.move_to_end(key)
+        return entry
+
+    def _put(self, table, key, value):
+        """Insert an entry, evicting the least recently used ones beyond the size bound"""
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+        self.dirty = True
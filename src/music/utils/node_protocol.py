@@ -0,0 +1,88 @@
+import asyncio
+import hmac
+import json
+import os
+import tempfile
+from urllib.parse import urlsplit
+
+# Default address of the audio node: a unix socket, or "host:port" for TCP (e.g. on Windows)
+DEFAULT_NODE_ADDRESS = os.path.join(tempfile.gettempdir(), 'discordbot-audio-node.sock')
+
+# Requests (bot -> node) carry an "id" that the reply ({"op": "reply", "id", "ok", ...}) repeats.
+# Events (node -> bot) are {"op": "event", "type", "guild_id", ...}.
+REQUESTS = ('hello', 'connect', 'voice_state', 'voice_server', 'play', 'stop', 'pause', 'resume', 'seek',
+            'volume', 'bitrate', 'destroy', 'stats')
+EVENTS = ('ready', 'voice_connect', 'voice_disconnect', 'voice_closed', 'progress', 'track_end')
+
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+# Shared secret the bot sends in its hello (MUSIC_AUDIO_NODE_TOKEN in .env, the node reads the same variable).
+# A unix socket is only reachable by its owner and may go without, a TCP node always needs one.
+TOKEN_ENV = 'MUSIC_AUDIO_NODE_TOKEN'
+
+# Tracks are played from the network only: no local files, pipes or other ffmpeg protocols
+TRACK_URL_SCHEMES = ('http', 'https')
+FFMPEG_PROTOCOL_WHITELIST = 'http,https,tls,tcp'
+
+
+def get_node_token():
+    """Get the shared secret from the environment, or None if none is set"""
+    return os.getenv(TOKEN_ENV) or None
+
+
+def check_token(expected, given):
+    """Check a hello's token in constant time (anything goes if the node has no token)"""
+    if expected is None:
+        return True
+    return isinstance(given, str) and hmac.compare_digest(expected.encode(), given.encode())
+
+
+def check_track_url(url):
+    """Raise ValueError unless a track URL is an http(s) URL"""
+    if not isinstance(url, str) or urlsplit(url).scheme.lower() not in TRACK_URL_SCHEMES:
+        raise ValueError("Track URLs must be http(s) URLs")
+
+
+def encode_message(message):
+    """Serialize a message as one line of JSON"""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+async def read_message(reader):
+    """Read the next message, or None once the connection is closed"""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def is_tcp_address(address):
+    """Check if an address is "host:port" rather than a unix socket path"""
+    return _split_address(address)[0] is not None
+
+
+def _split_address(address):
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit() and os.sep not in address:
+        return host, int(port)
+    return None, None
+
+
+async def open_node_connection(address):
+    """Connect to a node at a unix socket path or a "host:port" address"""
+    host, port = _split_address(address)
+    if host is None:
+        return await asyncio.open_unix_connection(address, limit=MAX_MESSAGE_SIZE)
+    return await asyncio.open_connection(host, port, limit=MAX_MESSAGE_SIZE)
+
+
+async def start_node_server(handler, address):
+    """Listen on a unix socket path (replacing a stale socket file) or a "host:port" address"""
+    host, port = _split_address(address)
+    if host is None:
+        if os.path.exists(address):
+            os.remove(address)
+        server = await asyncio.start_unix_server(handler, address, limit=MAX_MESSAGE_SIZE)
+        os.chmod(address, 0o600)  # only the user running the node (and the bot) may connect
+        return server
+    return await asyncio.start_server(handler, host, port, limit=MAX_MESSAGE_SIZE)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger('discord')
+
+
+class PlayerActor:
+    """Mailbox that runs one guild's playback commands one at a time, in the order they were sent.
+
+    A command is a coroutine function and its arguments. Commands sent with a
+    key are merged into a command with the same key that is still waiting, so
+    a burst of identical requests runs once and every sender gets its result.
+    interrupt() cancels the running command and drops the queued ones, a
+    cancelled, dropped or failed command resolves to None. The worker task
+    only exists while there is work.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.mailbox = deque()  # (key, function, args, future, time sent)
+        self.waiting = {}  # key: future of the queued command with that key
+        self.worker = None
+        self.running = None  # task of the command being processed
+        self.closed = False
+        self.stats = {'processed': 0, 'collapsed': 0, 'interrupted': 0, 'failed': 0, 'max_depth': 0}
+        self._wait_total = self._wait_max = 0.0
+        self._run_total = self._run_max = 0.0
+
+    def send(self, key, function, *args):
+        """Queue a command, returns an awaitable for its result
+
+        A command sent from inside a running command is run right away
+        instead of queued, waiting for it there would never end.
+        """
+        if self.running is not None and asyncio.current_task() is self.running:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        if self.closed:
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+        if key is not None and key in self.waiting:
+            self.stats['collapsed'] += 1
+            return self.waiting[key]
+        future = loop.create_future()
+        self.mailbox.append((key, function, args, future, time.perf_counter()))
+        if key is not None:
+            self.waiting[key] = future
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self.mailbox))
+        if self.worker is None or self.worker.done():
+            self.worker = loop.create_task(self._work())
+        return future
+
+    async def _work(self):
+        while self.mailbox:
+            key, function, args, future, sent_at = self.mailbox.popleft()
+            if key is not None and self.waiting.get(key) is future:
+                del self.waiting[key]
+            started = time.perf_counter()
+            self.running = asyncio.create_task(function(*args))
+            await asyncio.wait({self.running})
+            finished = time.perf_counter()
+            result = None
+            if self.running.cancelled():
+                self.stats['interrupted'] += 1
+            elif self.running.exception() is not None:
+                self.stats['failed'] += 1
+                logger.error(f"Player command {function.__name__} failed in guild {self.name}",
+                             exc_info=self.running.exception())
+            else:
+                result = self.running.result()
+            self.running = None
+            if not future.done():
+                future.set_result(result)
+
+            self.stats['processed'] += 1
+            self._wait_total += started - sent_at
+            self._wait_max = max(self._wait_max, started - sent_at)
+            self._run_total += finished - started
+            self._run_max = max(self._run_max, finished - started)
+
+    def interrupt(self):
+        """Cancel the running command and drop the queued ones, their senders get None"""
+        if self.running is not None and not self.running.done():
+            self.running.cancel()
+        while self.mailbox:
+            future = self.mailbox.popleft()[3]
+            if not future.done():
+                future.set_result(None)
+            self.stats['interrupted'] += 1
+        self.waiting.clear()
+
+    def close(self):
+        """Interrupt and refuse further commands (the guild's player is gone)"""
+        self.closed = True
+        self.interrupt()
+
+    def get_stats(self):
+        """Get the mailbox depth, command counts and latencies in milliseconds"""
+        processed = self.stats['processed']
+        return {
+            'depth': len(self.mailbox),
+            **self.stats,
+            'avg_wait_ms': round(self._wait_total / processed * 1000, 1) if processed else 0,
+            'max_wait_ms': round(self._wait_max * 1000, 1),
+            'avg_run_ms': round(self._run_total / processed * 1000, 1) if processed else 0,
+            'max_run_ms': round(self._run_max * 1000, 1),
+        }
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger('discord')
+
+LOG_FILE = 'queue_journal.log'
+OLD_LOG_FILE = 'queue_journal.log.old'  # log being folded into a snapshot
+SNAPSHOT_FILE = 'queue_snapshot.jsonl'  # a header line, then one line per guild
+SESSIONS_FILE = 'queue_sessions.jsonl'  # one line per guild
+
+
+def _write_atomic(path, lines):
+    """Write JSON lines so that a crash leaves either the old or the new file, never half of one"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_lines(path):
+    """Yield the JSON lines of a file, stopping at a line torn by a crash
+
+    Parsing line by line also lets the event loop run between lines when this
+    is called from a worker thread.
+    """
+    try:
+        f = open(path, encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Ignoring a torn record at the end of {path}")
+                return
+
+
+def apply_record(state, op, guild_id, *args):
+    """Replay one journal record onto saved state (guild_id: {'queue', 'current', 'repeat'})"""
+    if op == 'drop':
+        state.pop(guild_id, None)
+        return
+    guild = state.setdefault(guild_id, {'queue': [], 'current': None, 'repeat': 'off'})
+    queue = guild['queue']
+    if op == 'add':
+        queue.extend(args[0])
+    elif op == 'pop':
+        del queue[args[0]]
+    elif op == 'move':
+        queue.insert(args[1], queue.pop(args[0]))
+    elif op == 'queue':
+        guild['queue'] = args[0]
+    elif op == 'clear':
+        guild['queue'] = []
+    elif op == 'current':
+        guild['current'] = args[0]
+    elif op == 'resolve':
+        index, song = args
+        if index is None:
+            guild['current'] = song
+        else:
+            queue[index] = song
+    elif op == 'repeat':
+        guild['repeat'] = args[0]
+    else:
+        raise ValueError(f"unknown journal record '{op}'")
+
+
+class QueueJournal:
+    """Append-only journal of queue changes with periodic snapshots, so queues survive restarts and crashes.
+
+    QueueManager reports each change with record(). Records are buffered and
+    appended to the log in batches (write-behind, fsynced), so a crash loses
+    at most the changes since the last write. A compaction moves the log
+    aside, writes every guild's state to a snapshot and deletes the old log.
+    Records are numbered and the snapshot keeps, per guild, the number of the
+    last record it includes, so replaying the snapshot and the logs gives the
+    same queues wherever a crash interrupted a compaction.
+
+    record() and take_pending() run on the event loop, the file methods block
+    and are meant for a worker thread.
+    """
+
+    def __init__(self, directory, compact_after=10000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_after = compact_after  # log records that trigger a compaction
+        self.pending = []  # records not written yet, numbered when they are handed over
+        self.seq = 0  # number of the last record handed over for writing
+        self.log_records = 0  # records in the log since the last compaction
+        self.enabled = False  # changes are only recorded once the saved state was restored
+        self.touched = set()  # guilds changed while disabled, their whole state is recorded on enable()
+        self.stats = {'records': 0, 'writes': 0, 'compactions': 0, 'replay_errors': 0}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def record(self, op, guild_id, *args):
+        """Buffer one change (see apply_record for the operations)"""
+        if self.enabled:
+            self.pending.append([op, guild_id, *args])
+        else:
+            # Positions in a record made before the saved songs were put back
+            # would not match the restored queue, the guild is saved whole instead
+            self.touched.add(guild_id)
+
+    def enable(self, export_guild):
+        """Start recording, first saving the whole state of the guilds changed until now
+
+        `export_guild(guild_id)` returns {'queue', 'current', 'repeat'} as records.
+        """
+        self.enabled = True
+        for guild_id in sorted(self.touched):
+            guild = export_guild(guild_id)
+            self.record('queue', guild_id, guild['queue'])
+            self.record('current', guild_id, guild['current'])
+            self.record('repeat', guild_id, guild['repeat'])
+        self.touched.clear()
+
+    def last_seq(self):
+        """Number of the last record made so far, written or not"""
+        return self.seq + len(self.pending)
+
+    def take_pending(self):
+        """Number the buffered records and hand them over for writing"""
+        records = [[self.seq + i, *record] for i, record in enumerate(self.pending, 1)]
+        self.seq += len(records)
+        self.pending = []
+        return records
+
+    def load(self):
+        """Rebuild the saved state from the snapshot and the logs
+
+        Returns:
+            tuple: (dict guild_id: {'queue', 'current', 'repeat'} with songs as records,
+                    dict guild_id: {'channel_id', 'position'} of the voice sessions)
+        """
+        snapshot = _read_lines(self._path(SNAPSHOT_FILE))
+        start_seq = next(snapshot, {'seq': 0})['seq']
+        state = {}
+        covered = {}  # guild_id: last record included in the snapshot
+        for guild_id, guild_seq, guild in snapshot:
+            covered[guild_id] = guild_seq
+            state[guild_id] = guild
+
+        seq = start_seq
+        for name in (OLD_LOG_FILE, LOG_FILE):
+            for record_seq, op, guild_id, *args in _read_lines(self._path(name)):
+                seq = max(seq, record_seq)
+                if record_seq <= covered.get(guild_id, start_seq):
+                    continue
+                try:
+                    apply_record(state, op, guild_id, *args)
+                except (IndexError, ValueError, TypeError) as e:
+                    self.stats['replay_errors'] += 1
+                    logger.error(f"Could not replay journal record {record_seq} ({op}) for guild {guild_id}: {e}")
+                self.log_records += 1
+        self.seq = seq
+
+        sessions = {guild_id: session for guild_id, session in _read_lines(self._path(SESSIONS_FILE))}
+        return {guild_id: guild for guild_id, guild in state.items()
+                if guild['queue'] or guild['current']}, sessions
+
+    def write(self, records):
+        """Append numbered records to the log and fsync it"""
+        if not records:
+            return
+        with open(self._path(LOG_FILE), 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_records += len(records)
+        self.stats['records'] += len(records)
+        self.stats['writes'] += 1
+
+    def rotate(self):
+        """Move the log aside for a compaction, it is kept until the new snapshot is written"""
+        log_path, old_path = self._path(LOG_FILE), self._path(OLD_LOG_FILE)
+        if not os.path.exists(log_path):
+            return
+        if os.path.exists(old_path):
+            # An earlier compaction did not finish, its records are still needed
+            with open(log_path, encoding='utf-8') as src, open(old_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(log_path)
+        else:
+            os.replace(log_path, old_path)
+        self.log_records = 0
+
+    def write_snapshot(self, start_seq, guilds):
+        """Write the state of every guild and drop the old log
+
+        `start_seq` is the last record in the rotated log, all of it is covered
+        by the snapshot. `guilds` holds (guild_id, last record included, state).
+        """
+        _write_atomic(self._path(SNAPSHOT_FILE), [{'seq': start_seq}, *guilds])
+        try:
+            os.remove(self._path(OLD_LOG_FILE))
+        except FileNotFoundError:
+            pass
+        self.stats['compactions'] += 1
+
+    def save_sessions(self, sessions):
+        """Write the voice channel and position of every guild that is playing"""
+        _write_atomic(self._path(SESSIONS_FILE), sessions.items())
+
+    def get_stats(self):
+        return {**self.stats, 'unwritten': len(self.pending), 'log_records': self.log_records}
@@ -1,15 +1,18 @@
-from collections import deque
+from .track import QueueEntry
+from .track_queue import TrackQueue
 
 class QueueManager:
     def __init__(self):
-        self.queues = {}  # guild_id: deque(songs)
+        self.queues = {}  # guild_id: TrackQueue of QueueEntry
         self.current_songs = {}  # guild_id: current_song_info
         self.repeat_mode = {}  # guild_id: 'off', 'one', or 'all'
+        self.queue_versions = {}  # guild_id: counter bumped when the queue is cleared or reordered
+        self.journal = None  # QueueJournal every change is reported to, None to keep queues in memory only
     
     def get_queue(self, guild_id):
         """Get the queue for a guild"""
         if guild_id not in self.queues:
-            self.queues[guild_id] = deque()
+            self.queues[guild_id] = TrackQueue()
         return self.queues[guild_id]
     
     def get_current_song(self, guild_id):
@@ -19,41 +22,134 @@ class QueueManager:
     def set_current_song(self, guild_id, song):
         """Set the current song for a guild"""
         self.current_songs[guild_id] = song
+        self._record('current', guild_id, song.to_record() if self.journal else None)
     
     def clear_current_song(self, guild_id):
         """Clear the current song for a guild"""
         if guild_id in self.current_songs:
             del self.current_songs[guild_id]
+            self._record('current', guild_id, None)
     
-    def add_to_queue(self, guild_id, song):
-        """Add a song to the queue"""
-        self.get_queue(guild_id).append(song)
+    def add_to_queue(self, guild_id, song, requester=None):
+        """Add a song to the queue, returns its queue entry"""
+        entry = QueueEntry.from_song(song, requester)
+        self.get_queue(guild_id).append(entry)
+        self._record('add', guild_id, self._to_records([entry]))
+        return entry
     
-    def add_multiple_to_queue(self, guild_id, songs):
-        """Add multiple songs to the queue"""
+    def add_multiple_to_queue(self, guild_id, songs, requester=None):
+        """Add multiple songs to the queue, returns their queue entries"""
+        entries = [QueueEntry.from_song(song, requester) for song in songs]
+        self.get_queue(guild_id).extend(entries)
+        self._record('add', guild_id, self._to_records(entries))
+        return entries
+    
+    def remove_song(self, guild_id, song):
+        """Remove a specific song (by identity) from the queue, returns True if it was queued"""
+        queue = self.get_queue(guild_id)
+        try:
+            index = queue.index(song)
+        except ValueError:
+            return False
+        queue.pop(index)
+        self._bump_version(guild_id)
+        self._record('pop', guild_id, index)
+        return True
+    
+    def remove_at(self, guild_id, index):
+        """Remove and return the song at a position (0 = next up), raises IndexError if there is none"""
+        queue = self.get_queue(guild_id)
+        if index < 0:
+            index += len(queue)
+        song = queue.pop(index)
+        self._bump_version(guild_id)
+        self._record('pop', guild_id, index)
+        return song
+    
+    def move_song(self, guild_id, source, destination):
+        """Move the song at one position to another, returns it (raises IndexError for a bad source)"""
+        queue = self.get_queue(guild_id)
+        if source < 0:
+            source += len(queue)
+        song = queue.move(source, destination)
+        self._bump_version(guild_id)
+        self._record('move', guild_id, source, destination)
+        return song
+    
+    def shuffle_queue(self, guild_id):
+        """Shuffle the queue in place"""
+        queue = self.get_queue(guild_id)
+        queue.shuffle()
+        self._bump_version(guild_id)
+        self._record('queue', guild_id, self._to_records(queue))
+    
+    def dedupe_queue(self, guild_id):
+        """Remove repeats of the same video from the queue, returns how many were removed"""
+        queue = self.get_queue(guild_id)
+        removed = queue.dedupe()
+        if removed:
+            self._bump_version(guild_id)
+            self._record('queue', guild_id, self._to_records(queue))
+        return removed
+    
+    def update_song(self, guild_id, song):
+        """Refresh the queue's running totals after a queued (or the current) song was resolved"""
         queue = self.get_queue(guild_id)
-        for song in songs:
-            queue.append(song)
+        queue.refresh(song)
+        if self.journal is None:
+            return
+        try:
+            index = queue.index(song)
+        except ValueError:
+            if self.current_songs.get(guild_id) is not song:
+                return
+            index = None  # the current song
+        self._record('resolve', guild_id, index, song.to_record())
+    
+    def get_queue_stats(self, guild_id):
+        """Get the queue's size and length from its running totals"""
+        queue = self.get_queue(guild_id)
+        return {'songs': len(queue), 'total_minutes': round(queue.total_duration / 60, 1)}
     
     def get_next_song(self, guild_id):
         """Get the next song in the queue"""
         queue = self.get_queue(guild_id)
         if not queue:
             return None
+        self._record('pop', guild_id, 0)
         return queue.popleft()
     
     def clear_queue(self, guild_id):
         """Clear the queue for a guild"""
-        self.queues[guild_id] = deque()
+        self.invalidate_prefetch(guild_id)
+        self.queues[guild_id] = TrackQueue()
+        self._record('clear', guild_id)
+    
+    def get_queue_version(self, guild_id):
+        """Get the queue version, used to discard look-ahead results for a stale queue"""
+        return self.queue_versions.get(guild_id, 0)
+    
+    def _bump_version(self, guild_id):
+        """Mark the queue as reordered: songs keep their prefetched URLs, which belong to the song not the position"""
+        self.queue_versions[guild_id] = self.get_queue_version(guild_id) + 1
+    
+    def invalidate_prefetch(self, guild_id):
+        """Drop stream URLs prefetched onto queued songs (call when the queue is cleared)"""
+        self._bump_version(guild_id)
+        for song in self.queues.get(guild_id, ()):
+            song.pop('stream_url', None)
+            song.pop('stream_expires_at', None)
     
     def clear_guild_data(self, guild_id):
         """Clear all data for a guild"""
+        self.invalidate_prefetch(guild_id)
         if guild_id in self.queues:
             del self.queues[guild_id]
         if guild_id in self.current_songs:
             del self.current_songs[guild_id]
         if guild_id in self.repeat_mode:
             del self.repeat_mode[guild_id]
+        self._record('drop', guild_id)
     
     def get_repeat_mode(self, guild_id):
         """Get the repeat mode for a guild"""
@@ -63,6 +159,7 @@ class QueueManager:
         """Set the repeat mode for a guild. Modes: 'off', 'one', 'all'"""
         if mode in ['off', 'one', 'all']:
             self.repeat_mode[guild_id] = mode
+            self._record('repeat', guild_id, mode)
         else:
             raise ValueError(f"Invalid repeat mode: {mode}. Must be 'off', 'one', or 'all'")
     
@@ -70,11 +167,43 @@ class QueueManager:
         """Toggle through repeat modes: off -> one -> all -> off"""
         current = self.get_repeat_mode(guild_id)
         if current == 'off':
-            self.repeat_mode[guild_id] = 'one'
-            return 'one'
+            new_mode = 'one'
         elif current == 'one':
-            self.repeat_mode[guild_id] = 'all'
-            return 'all'
+            new_mode = 'all'
         else:  # 'all'
-            self.repeat_mode[guild_id] = 'off'
-            return 'off'
\ No newline at end of file
+            new_mode = 'off'
+        self.set_repeat_mode(guild_id, new_mode)
+        return new_mode
+    
+    def get_guild_ids(self):
+        """Get the guilds that have a queue, a current song or a repeat mode"""
+        return list(self.queues.keys() | self.current_songs.keys() | self.repeat_mode.keys())
+    
+    def export_guild(self, guild_id):
+        """Get a guild's queue, current song and repeat mode as JSON-serializable data"""
+        current_song = self.current_songs.get(guild_id)
+        return {'queue': self._to_records(self.queues.get(guild_id, ())),
+                'current': current_song.to_record() if current_song else None,
+                'repeat': self.get_repeat_mode(guild_id)}
+    
+    def restore_guild(self, guild_id, entries, current_song=None, repeat_mode='off'):
+        """Put back a guild's state saved before a restart (not journaled, it is already on disk)
+        
+        Songs queued since the restart stay behind the restored ones, a current
+        song or repeat mode set since then is kept.
+        """
+        queue = TrackQueue(entries)
+        queue.extend(self.queues.get(guild_id, ()))
+        self.queues[guild_id] = queue
+        if current_song is not None:
+            self.current_songs.setdefault(guild_id, current_song)
+        if repeat_mode != 'off':
+            self.repeat_mode.setdefault(guild_id, repeat_mode)
+    
+    def _to_records(self, songs):
+        return [song.to_record() for song in songs] if self.journal else None
+    
+    def _record(self, op, guild_id, *args):
+        """Report a change to the journal, if queues are persisted"""
+        if self.journal is not None:
+            self.journal.record(op, guild_id, *args)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('discord')
+
+
+class EditBudget:
+    """Token bucket per channel: up to `burst` edits at once, refilled at `rate` edits per second"""
+
+    def __init__(self, rate=0.4, burst=3):
+        # Discord allows about 5 message edits per 5 seconds in a channel, burst + 5 * rate stays within that
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}  # channel id: (tokens, monotonic time they were counted)
+
+    def _tokens(self, channel_id):
+        tokens, counted_at = self.buckets.get(channel_id, (self.burst, None))
+        now = time.monotonic()
+        if counted_at is not None:
+            tokens = min(self.burst, tokens + (now - counted_at) * self.rate)
+        return tokens, now
+
+    def delay(self, channel_id):
+        """Seconds until the channel can take another edit (0 if it can now)"""
+        tokens, _ = self._tokens(channel_id)
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, channel_id):
+        tokens, now = self._tokens(channel_id)
+        self.buckets[channel_id] = (tokens - 1, now)
+
+
+class RenderScheduler:
+    """Coalesces refresh requests per key into one render, and only publishes renders that changed.
+
+    request() marks a key dirty. A task per key waits `debounce` seconds so a
+    burst of requests becomes one render, then calls `render(key)`, which
+    returns None (nothing to show) or (channel id, digest, publish coroutine
+    function). A render with the same digest as the last published one is
+    dropped unless it was forced. Edits are paced by a per-channel EditBudget:
+    when it is empty the scheduler waits and renders again, so what is sent
+    is the state at the time of sending.
+    """
+
+    def __init__(self, render, debounce=0.3, budget=None):
+        self.render = render
+        self.debounce = debounce
+        self.budget = budget or EditBudget()
+        self.tasks = {}  # key: task rendering it
+        self.dirty = set()  # keys requested since their last render
+        self.forced = set()  # keys to publish even if unchanged
+        self.digests = {}  # key: digest of the last published render
+        self.stats = {'requested': 0, 'rendered': 0, 'unchanged': 0, 'throttled': 0, 'sent': 0, 'failed': 0}
+
+    def request(self, key, force=False):
+        """Ask for a key to be rendered soon"""
+        self.stats['requested'] += 1
+        self.dirty.add(key)
+        if force:
+            self.forced.add(key)
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            self.tasks[key] = asyncio.create_task(self._run(key))
+
+    def invalidate(self, key):
+        """Forget what was last published for a key, so its next render is sent (the message was replaced)"""
+        self.digests.pop(key, None)
+
+    def forget(self, key):
+        """Drop a key's pending render and last digest (its message is gone)"""
+        task = self.tasks.pop(key, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        self.dirty.discard(key)
+        self.forced.discard(key)
+        self.digests.pop(key, None)
+
+    async def _run(self, key):
+        try:
+            while key in self.dirty:
+                await asyncio.sleep(self.debounce)
+                self.dirty.discard(key)
+                rendered = await self.render(key)
+                if rendered is None:
+                    continue
+                self.stats['rendered'] += 1
+                channel_id, digest, publish = rendered
+                if key not in self.forced and self.digests.get(key) == digest:
+                    self.stats['unchanged'] += 1
+                    continue
+
+                delay = self.budget.delay(channel_id)
+                if delay > 0:
+                    # Wait for the budget, then render again with whatever changed meanwhile
+                    self.stats['throttled'] += 1
+                    self.dirty.add(key)
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.budget.take(channel_id)
+                self.forced.discard(key)
+                if await publish():
+                    self.digests[key] = digest
+                    self.stats['sent'] += 1
+                else:
+                    self.stats['failed'] += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error rendering {key}: {e}", exc_info=True)
+        finally:
+            if self.tasks.get(key) is asyncio.current_task():
+                del self.tasks[key]
+
+    def get_stats(self):
+        return {**self.stats, 'pending': len(self.tasks)}
@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+
+from .jitter_buffer import frame_ready
+
+logger = logging.getLogger('discord')
+
+FRAME_DELAY = discord.opus.Encoder.FRAME_LENGTH / 1000  # seconds between frames
+
+
+class ScheduledPlayer:
+    """Stand-in for py-cord's AudioPlayer that is driven by a sender thread shared with other guilds.
+
+    It is installed as the voice client's `_player`, so is_playing(), pause(),
+    resume(), stop() and the `source` property work exactly as with
+    voice_client.play(). Frames are due at `start + n * 20 ms`, the same
+    drift-free schedule AudioPlayer uses.
+    """
+
+    DELAY = FRAME_DELAY
+
+    def __init__(self, source, client, after=None, late_threshold=0.005, resync_after=0.1):
+        if after is not None and not callable(after):
+            raise TypeError('Expected a callable for the "after" parameter.')
+        self.source = source
+        self.client = client
+        self.after = after
+        self.late_threshold = late_threshold  # a frame sent later than this counts as late
+        self.resync_after = resync_after  # further behind than this, the schedule restarts instead of bursting
+        self.loops = 0
+        self._start = None
+        self._frame_due = None  # when the next frame is due, None while paused or disconnected
+        self._end = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()  # we are not paused
+        self._connected = client._connected
+        self._current_error = None
+        self._lock = threading.Lock()
+
+        # Jitter of this session: how late frames were sent compared to their due time
+        self.frames = 0
+        self.total_late = 0.0
+        self.max_late = 0.0
+        self.late_frames = 0
+        self.resyncs = 0
+        self.starved_ticks = 0  # frames skipped because the source had none ready
+
+    def _begin(self):
+        """Start the schedule (called by the scheduler), returns when the first frame is due"""
+        self._start = time.perf_counter()
+        self._frame_due = self._start
+        self._speak(True)
+        return self._start
+
+    def _tick(self, due):
+        """Send one frame if one is due
+
+        Returns:
+            float: when to come back, or None once playback is over
+        """
+        if self._end.is_set():
+            return None
+        if not self._resumed.is_set():
+            # Paused: check again a frame later, resume() restarts the schedule
+            self._frame_due = None
+            return time.perf_counter() + self.DELAY
+        if not self._connected.is_set():
+            # Voice reconnecting: wait for it without holding up the other sessions
+            self._frame_due = None
+            return time.perf_counter() + 0.1
+        if not frame_ready(self.source):
+            # The jitter buffer is empty (song starting or underrun): skip this frame rather than
+            # wait for it and hold up the other sessions, the schedule restarts once frames arrive
+            self.starved_ticks += 1
+            self._frame_due = None
+            return time.perf_counter() + self.DELAY
+        if self._frame_due is None:
+            self.loops = 0
+            self._start = time.perf_counter()
+            due = self._start
+
+        with self._lock:
+            now = time.perf_counter()
+            late = now - due
+            self.loops += 1
+            try:
+                data = self.source.read()
+                if not data:
+                    self.stop()
+                    return None
+                self.client.send_audio_packet(data, encode=not self.source.is_opus())
+            except Exception as exc:
+                self._current_error = exc
+                self.stop()
+                return None
+
+        self.frames += 1
+        self.total_late += max(late, 0.0)
+        self.max_late = max(self.max_late, late)
+        self.late_frames += late > self.late_threshold
+
+        self._frame_due = self._start + self.DELAY * self.loops
+        if time.perf_counter() - self._frame_due > self.resync_after:
+            # Too far behind to catch up without an audible burst, start the schedule over
+            self.resyncs += 1
+            self.loops = 0
+            self._start = self._frame_due = time.perf_counter()
+        return self._frame_due
+
+    def _finish(self):
+        """Clean up the source and call the after callback, like AudioPlayer does when it ends"""
+        try:
+            self.source.cleanup()
+        except Exception as e:
+            logger.error(f"Error cleaning up audio source: {e}")
+        error = self._current_error
+        if self.after is not None:
+            try:
+                self.after(error)
+            except Exception:
+                logger.exception("Calling the after function failed.")
+        elif error:
+            logger.error(f"Exception in scheduled audio player: {error}", exc_info=error)
+
+    def stop(self):
+        self._end.set()
+        self._resumed.set()
+        self._speak(False)
+
+    def pause(self, *, update_speaking=True):
+        self._resumed.clear()
+        if update_speaking:
+            self._speak(False)
+
+    def resume(self, *, update_speaking=True):
+        self._frame_due = None  # restart the schedule on the next tick
+        self._resumed.set()
+        if update_speaking:
+            self._speak(True)
+
+    def is_playing(self):
+        return self._resumed.is_set() and not self._end.is_set()
+
+    def is_paused(self):
+        return not self._end.is_set() and not self._resumed.is_set()
+
+    def _set_source(self, source):
+        with self._lock:
+            self.source = source
+
+    def _speak(self, speaking):
+        try:
+            asyncio.run_coroutine_threadsafe(self.client.ws.speak(speaking), self.client.loop)
+        except Exception as e:
+            logger.info(f"Speaking call in scheduled player failed: {e}")
+
+    def get_stats(self):
+        """Get this session's send timing"""
+        return {
+            'frames': self.frames,
+            'avg_late_ms': round(self.total_late / self.frames * 1000, 2) if self.frames else 0,
+            'max_late_ms': round(self.max_late * 1000, 2),
+            'late_frames': self.late_frames,
+            'resyncs': self.resyncs,
+            'starved_ticks': self.starved_ticks
+        }
+
+
+class _SenderWorker(threading.Thread):
+    """One sender thread serving many sessions from a heap ordered by due time"""
+
+    def __init__(self, scheduler, index):
+        super().__init__(name=f'audio-sender-{index}', daemon=True)
+        self.scheduler = scheduler
+        self.heap = []  # (due, sequence, player)
+        self.sessions = 0
+        self.ticks = 0
+        self.batched_frames = 0
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def add(self, player):
+        with self._cond:
+            self.sessions += 1
+            heapq.heappush(self.heap, (player._begin(), next(self._sequence), player))
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self.heap:
+                    self._cond.wait()
+                delay = self.heap[0][0] - time.perf_counter()
+                if delay > 0:
+                    # Woken early when a session is added
+                    self._cond.wait(delay)
+                    continue
+                # Everything due within the batch window is sent in this tick
+                horizon = time.perf_counter() + self.scheduler.batch_window
+                batch = []
+                while self.heap and self.heap[0][0] <= horizon:
+                    batch.append(heapq.heappop(self.heap))
+            self.ticks += 1
+            self.batched_frames += len(batch)
+
+            for due, _, player in batch:
+                try:
+                    next_due = player._tick(due)
+                except Exception as e:
+                    logger.error(f"Error in audio sender: {e}", exc_info=True)
+                    player._current_error = e
+                    player.stop()
+                    next_due = None
+                with self._cond:
+                    if next_due is None:
+                        self.sessions -= 1
+                    else:
+                        heapq.heappush(self.heap, (next_due, next(self._sequence), player))
+                if next_due is None:
+                    # Killing ffmpeg can take a while, keep it off the sender thread
+                    self.scheduler.finisher.submit(player._finish)
+
+
+class SendScheduler:
+    """A fixed number of sender threads that send audio for all voice clients.
+
+    Replaces the thread py-cord starts for each voice_client.play(). Each
+    session is assigned to the least busy sender; a sender sleeps until its
+    next frame is due and sends every frame due within `batch_window` in the
+    same tick. Sources must not block on read, as a blocking read delays the
+    sender's other sessions: network sources sit behind the jitter buffer and
+    a session whose buffer is empty skips its frame (see frame_ready).
+    """
+
+    def __init__(self, workers=2, batch_window=0.002, late_threshold=0.005):
+        self.batch_window = batch_window
+        self.late_threshold = late_threshold
+        self.finisher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='audio-finish')
+        self.workers = [_SenderWorker(self, index) for index in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def play(self, voice_client, source, after=None):
+        """Play a source on a voice client, like voice_client.play() but on a shared sender"""
+        if not voice_client.is_connected():
+            raise discord.ClientException('Not connected to voice.')
+        if voice_client.is_playing():
+            raise discord.ClientException('Already playing audio.')
+        if not isinstance(source, discord.AudioSource):
+            raise TypeError(f"source must be an AudioSource not {source.__class__.__name__}")
+        if not voice_client.encoder and not source.is_opus():
+            voice_client.encoder = discord.opus.Encoder()
+
+        player = ScheduledPlayer(source, voice_client, after=after, late_threshold=self.late_threshold)
+        voice_client._player = player
+        min(self.workers, key=lambda worker: worker.sessions).add(player)
+        return player
+
+    def get_stats(self):
+        """Get the load of the sender threads"""
+        ticks = sum(worker.ticks for worker in self.workers)
+        return {
+            'threads': len(self.workers),
+            'sessions': sum(worker.sessions for worker in self.workers),
+            'ticks': ticks,
+            'avg_frames_per_tick': round(sum(worker.batched_frames for worker in self.workers) / ticks, 2)
+            if ticks else 0
+        }
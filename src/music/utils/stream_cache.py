@@ -0,0 +1,95 @@
+import logging
+import re
+import time
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger('discord')
+
+# googlevideo URLs carry the expiry either as a query parameter or as a path segment
+EXPIRE_PATH_REGEX = r'/expire/(\d+)'
+
+def get_stream_expiry(url):
+    """Get the unix timestamp at which a googlevideo stream URL expires, if present"""
+    try:
+        parsed = urlparse(url)
+        expire = parse_qs(parsed.query).get('expire')
+        if expire:
+            return int(expire[0])
+        match = re.search(EXPIRE_PATH_REGEX, parsed.path)
+        if match:
+            return int(match.group(1))
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+class StreamCache:
+    """Cache of resolved stream URLs keyed by video id and format.
+
+    Each entry lives until the URL's own ``expire`` timestamp minus a safety
+    margin, so a cached URL is never handed to ffmpeg just before it dies.
+    """
+
+    def __init__(self, safety_margin=300, default_ttl=1800, max_entries=5000):
+        self.safety_margin = safety_margin  # seconds subtracted from the URL expiry
+        self.default_ttl = default_ttl  # used when the URL has no expire parameter
+        self.max_entries = max_entries
+        self.entries = {}  # (video_id, format): (url, expires_at)
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'invalidated': 0}
+
+    def get(self, video_id, fmt):
+        """Get a cached stream URL, or None if missing or about to expire"""
+        return self.get_entry(video_id, fmt)[0]
+
+    def get_entry(self, video_id, fmt):
+        """Get a cached stream URL with the time it stops being served, or (None, None)"""
+        key = (video_id, fmt)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None, None
+
+        url, expires_at = entry
+        if time.time() >= expires_at:
+            del self.entries[key]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None, None
+
+        self.stats['hits'] += 1
+        return url, expires_at
+
+    def put(self, video_id, fmt, url):
+        """Cache a stream URL and return the time at which it stops being served"""
+        now = time.time()
+        expiry = get_stream_expiry(url)
+        expires_at = (expiry - self.safety_margin) if expiry else (now + self.default_ttl)
+        if expires_at <= now:
+            return None
+
+        key = (video_id, fmt)
+        self.entries.pop(key, None)
+        self.entries[key] = (url, expires_at)
+        if len(self.entries) > self.max_entries:
+            self._evict(now)
+        return expires_at
+
+    def invalidate(self, video_id, fmt=None):
+        """Drop the cached URL(s) for a video, e.g. after ffmpeg got a 403"""
+        keys = [key for key in self.entries if key[0] == video_id and (fmt is None or key[1] == fmt)]
+        for key in keys:
+            del self.entries[key]
+        self.stats['invalidated'] += len(keys)
+        if keys:
+            logger.debug(f"Invalidated cached stream URL for video {video_id}")
+
+    def get_stats(self):
+        """Get the cache counters"""
+        return {'entries': len(self.entries), **self.stats}
+
+    def _evict(self, now):
+        """Drop expired entries, then the oldest ones until the cache fits"""
+        for key in [key for key, (_, expires_at) in self.entries.items() if expires_at <= now]:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
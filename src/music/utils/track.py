@@ -0,0 +1,153 @@
+import time
+import weakref
+
+from .youtube import get_watch_url
+
+
+class Track:
+    """Immutable metadata of one video, shared by every queue it is in.
+
+    Tracks are made by the catalog, which hands out the same object for the
+    same video id. `pending` tracks are placeholders from a flat extraction
+    whose title and duration are not final yet.
+    """
+
+    __slots__ = ('video_id', 'title', 'duration', '_webpage_url', 'pending', '__weakref__')
+
+    def __init__(self, video_id, title, duration=0, webpage_url=None, pending=False):
+        set_field = object.__setattr__
+        set_field(self, 'video_id', video_id)
+        set_field(self, 'title', title)
+        set_field(self, 'duration', duration or 0)
+        # The usual watch URL is rebuilt from the id instead of being stored
+        set_field(self, '_webpage_url', None if video_id and webpage_url == get_watch_url(video_id) else webpage_url)
+        set_field(self, 'pending', pending)
+
+    @property
+    def webpage_url(self):
+        return self._webpage_url or get_watch_url(self.video_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Track is immutable, intern a new one through the catalog")
+
+    def __repr__(self):
+        return f"Track({self.video_id!r}, {self.title!r}{', pending' if self.pending else ''})"
+
+
+class TrackCatalog:
+    """Global index of tracks by video id, so guilds queueing the same video share one Track.
+
+    Entries are weak: a track no queue refers to any more is dropped. A
+    resolved track replaces a placeholder for the same video, a placeholder
+    never replaces a resolved track.
+    """
+
+    def __init__(self):
+        self.tracks = weakref.WeakValueDictionary()  # video_id: Track
+        self.stats = {'interned': 0, 'shared': 0}
+
+    def intern(self, song):
+        """Get the shared Track for a song dict (or the fields of one)"""
+        video_id = song.get('video_id')
+        pending = bool(song.get('pending'))
+        if video_id:
+            track = self.tracks.get(video_id)
+            if track is not None and (pending or not track.pending):
+                self.stats['shared'] += 1
+                return track
+        track = Track(video_id, song.get('title') or 'Unknown', song.get('duration'), song.get('webpage_url'), pending)
+        if video_id:
+            self.tracks[video_id] = track
+        self.stats['interned'] += 1
+        return track
+
+    def get_stats(self):
+        """Get the number of live tracks and how often one was shared"""
+        return {'tracks': len(self.tracks), **self.stats}
+
+
+TRACK_CATALOG = TrackCatalog()
+
+
+class QueueEntry:
+    """One song in a guild's queue: a shared Track plus what belongs to this queueing of it.
+
+    Reads like the song dicts it replaces (`entry['title']`, `entry.get('pending')`),
+    track fields come from the Track. Only the per-entry fields can be set.
+    """
+
+    __slots__ = ('track', 'requester', 'enqueued_at', 'stream_url', 'stream_expires_at', 'failed')
+
+    TRACK_FIELDS = ('video_id', 'title', 'duration', 'webpage_url', 'pending')
+    ENTRY_FIELDS = ('requester', 'enqueued_at', 'stream_url', 'stream_expires_at', 'failed')
+
+    def __init__(self, track, requester=None, enqueued_at=None):
+        self.track = track
+        self.requester = requester  # user id of whoever queued it
+        self.enqueued_at = enqueued_at or time.time()
+        self.stream_url = None  # prefetched stream URL
+        self.stream_expires_at = None
+        self.failed = False  # the placeholder could not be resolved
+
+    @classmethod
+    def from_song(cls, song, requester=None):
+        """Make an entry for a song dict, interning its track (entries are returned as they are)"""
+        if isinstance(song, cls):
+            return song
+        return cls(TRACK_CATALOG.intern(song), requester)
+
+    @classmethod
+    def from_record(cls, record):
+        """Make an entry from a to_record() dict"""
+        return cls(TRACK_CATALOG.intern(record), record.get('requester'), record.get('enqueued_at'))
+
+    def to_record(self):
+        """Get the entry as a JSON-serializable dict, without its stream URL (which expires anyway)"""
+        track = self.track
+        record = {'video_id': track.video_id, 'title': track.title, 'duration': track.duration,
+                  'requester': self.requester, 'enqueued_at': self.enqueued_at}
+        if track._webpage_url:
+            record['webpage_url'] = track._webpage_url
+        if track.pending:
+            record['pending'] = True
+        return record
+
+    def requeue(self):
+        """Get a fresh entry for the same track and requester (repeat all)"""
+        return QueueEntry(self.track, self.requester)
+
+    def resolve(self, title, duration, webpage_url, video_id):
+        """Swap the placeholder track for the fully extracted one"""
+        self.track = TRACK_CATALOG.intern({'video_id': video_id, 'title': title, 'duration': duration,
+                                           'webpage_url': webpage_url})
+
+    def __getitem__(self, key):
+        if key in self.TRACK_FIELDS:
+            return getattr(self.track, key)
+        if key in self.ENTRY_FIELDS:
+            return getattr(self, key)
+        if key == 'url':
+            return self.stream_url
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        if key not in self.ENTRY_FIELDS:
+            raise KeyError(f"'{key}' belongs to the shared track and cannot be changed per entry")
+        setattr(self, key, value)
+
+    def pop(self, key, default=None):
+        """Reset a per-entry field, returning its old value"""
+        value = self.get(key, default)
+        if key in ('stream_url', 'stream_expires_at'):
+            setattr(self, key, None)
+        return value
+
+    def __repr__(self):
+        return f"QueueEntry({self.track!r}, requester={self.requester})"
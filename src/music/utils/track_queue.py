@@ -0,0 +1,272 @@
+import random
+from itertools import islice
+
+
+class _Node:
+    __slots__ = ('song', 'priority', 'duration', 'left', 'right', 'parent', 'size', 'total')
+
+    def __init__(self, song):
+        self.song = song
+        self.priority = random.random()
+        self.duration = song.get('duration') or 0
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.size = 1
+        self.total = self.duration
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    """Recompute a node's subtree size and duration from its children"""
+    node.size = 1
+    node.total = node.duration
+    for child in (node.left, node.right):
+        if child:
+            child.parent = node
+            node.size += child.size
+            node.total += child.total
+
+
+def _split(node, k):
+    """Split a subtree into its first k songs and the rest"""
+    if node is None:
+        return None, None
+    if _size(node.left) >= k:
+        left, node.left = _split(node.left, k)
+        _update(node)
+        if left:
+            left.parent = None
+        return left, node
+    node.right, right = _split(node.right, k - _size(node.left) - 1)
+    _update(node)
+    if right:
+        right.parent = None
+    return node, right
+
+
+def _merge(left, right):
+    """Join two subtrees, all of `left` coming first"""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _build(nodes):
+    """Build a subtree holding `nodes` in order, in O(n), using the priorities they already have"""
+    stack = []  # right spine of the tree built so far
+    for node in nodes:
+        node.left = node.right = node.parent = None
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+            _update(last)
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    for node in reversed(stack):
+        _update(node)
+    if not stack:
+        return None
+    stack[0].parent = None
+    return stack[0]
+
+
+class TrackQueue:
+    """Song queue kept as an implicit treap (a randomized balanced tree ordered by position).
+
+    Insert, remove and move at any position take O(log n), so does finding
+    a song's position. Each subtree keeps its song count and total duration,
+    so the queue's length and total duration never require a scan. Iteration
+    and slicing work like a list's.
+    """
+
+    def __init__(self, songs=()):
+        self._root = None
+        self._nodes = {}  # id(song): nodes holding that song (normally exactly one)
+        self.extend(songs)
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        for node in self._iter_nodes():
+            yield node.song
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return [node.song for node in islice(self._iter_nodes(start), max(stop - start, 0))]
+        return self._node_at(self._check_index(index)).song
+
+    def __repr__(self):
+        return f"TrackQueue({len(self)} songs, {self.total_duration}s)"
+
+    @property
+    def total_duration(self):
+        """Seconds of music queued (songs without a known duration count as 0)"""
+        return self._root.total if self._root else 0
+
+    def append(self, song):
+        self._root = _merge(self._root, self._new_node(song))
+        self._root.parent = None
+
+    def extend(self, songs):
+        nodes = [self._new_node(song) for song in songs]
+        if nodes:
+            self._root = _merge(self._root, _build(nodes))
+            self._root.parent = None
+
+    def insert(self, index, song):
+        """Insert a song before position `index` (clamped to the queue, like list.insert)"""
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        left, right = _split(self._root, index)
+        self._set_root(_merge(_merge(left, self._new_node(song)), right))
+
+    def pop(self, index=-1):
+        """Remove and return the song at a position"""
+        index = self._check_index(index)
+        left, rest = _split(self._root, index)
+        node, right = _split(rest, 1)
+        self._set_root(_merge(left, right))
+        self._forget(node)
+        return node.song
+
+    def popleft(self):
+        return self.pop(0)
+
+    def index(self, song):
+        """Get the position of a song (by identity), raises ValueError if it is not queued"""
+        nodes = self._nodes.get(id(song))
+        if not nodes:
+            raise ValueError("song is not in the queue")
+        return min(self._position(node) for node in nodes)
+
+    def remove(self, song):
+        """Remove a song (by identity), returns True if it was queued"""
+        try:
+            self.pop(self.index(song))
+        except ValueError:
+            return False
+        return True
+
+    def move(self, source, destination):
+        """Move the song at position `source` to position `destination`, returns it"""
+        song = self.pop(source)
+        self.insert(destination, song)
+        return song
+
+    def shuffle(self, rng=random):
+        """Shuffle the queue in place, reusing its nodes"""
+        nodes = list(self._iter_nodes())
+        rng.shuffle(nodes)
+        self._set_root(_build(nodes))
+
+    def dedupe(self, key=lambda song: song.get('video_id') or song.get('webpage_url')):
+        """Drop songs whose key was already seen earlier in the queue, returns how many were removed"""
+        seen = set()
+        kept = []
+        for node in self._iter_nodes():
+            song_key = key(node.song)
+            if song_key is not None and song_key in seen:
+                self._forget(node)
+                continue
+            seen.add(song_key)
+            kept.append(node)
+        removed = len(self) - len(kept)
+        if removed:
+            self._set_root(_build(kept))
+        return removed
+
+    def refresh(self, song):
+        """Pick up a change to a queued song's duration (e.g. once a placeholder is resolved)"""
+        for node in self._nodes.get(id(song), ()):
+            node.duration = song.get('duration') or 0
+            while node is not None:
+                _update(node)
+                node = node.parent
+
+    def clear(self):
+        self._root = None
+        self._nodes = {}
+
+    def _new_node(self, song):
+        node = _Node(song)
+        self._nodes.setdefault(id(song), []).append(node)
+        return node
+
+    def _forget(self, node):
+        nodes = self._nodes.get(id(node.song), [])
+        if node in nodes:
+            nodes.remove(node)
+        if not nodes:
+            self._nodes.pop(id(node.song), None)
+
+    def _set_root(self, root):
+        self._root = root
+        if root:
+            root.parent = None
+
+    def _check_index(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("queue index out of range")
+        return index
+
+    def _node_at(self, index):
+        node = self._root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node
+            else:
+                index -= left + 1
+                node = node.right
+
+    def _position(self, node):
+        position = _size(node.left)
+        while node.parent is not None:
+            if node is node.parent.right:
+                position += _size(node.parent.left) + 1
+            node = node.parent
+        return position
+
+    def _iter_nodes(self, start=0):
+        """Walk the nodes in queue order from position `start`"""
+        stack = []
+        node = self._root
+        # Descend to the start position, keeping the ancestors that come after it
+        while node is not None:
+            left = _size(node.left)
+            if start < left:
+                stack.append(node)
+                node = node.left
+            elif start == left:
+                stack.append(node)
+                break
+            else:
+                start -= left + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
@@ -1,11 +1,26 @@
 import logging
+from functools import partial
+
 import discord
 
+from .audio_node import NodeVoiceClient
+
 logger = logging.getLogger('discord')
 
+# py-cord encodes at this bitrate (kbps) whatever the channel allows
+DEFAULT_BITRATE = 128
+
 class VoiceManager:
-    def __init__(self):
-        self.voice_clients = {}  # guild_id: VoiceClient
+    def __init__(self, audio_nodes=None):
+        self.voice_clients = {}  # guild_id: VoiceClient, or NodeVoiceClient when audio runs on a node
+        self.bitrates = {}  # guild_id: kbps of the channel the bot is in
+        self.audio_nodes = audio_nodes  # NodePool, None to play audio in this process
+    
+    async def connect(self, channel):
+        """Connect to a voice channel, through an audio node if any are configured"""
+        if self.audio_nodes is None:
+            return await channel.connect()
+        return await channel.connect(cls=partial(NodeVoiceClient, node=self.audio_nodes.select()))
     
     def get_voice_client(self, guild_id):
         """Get the voice client for a guild"""
@@ -14,11 +29,41 @@ class VoiceManager:
     def set_voice_client(self, guild_id, voice_client):
         """Set the voice client for a guild"""
         self.voice_clients[guild_id] = voice_client
+        self.apply_bitrate(guild_id)
     
     def clear_voice_client(self, guild_id):
         """Clear the voice client for a guild"""
         if guild_id in self.voice_clients:
             del self.voice_clients[guild_id]
+        self.bitrates.pop(guild_id, None)
+    
+    def get_bitrate(self, guild_id):
+        """Get the bitrate (kbps) audio should be sent at in a guild"""
+        return self.bitrates.get(guild_id, DEFAULT_BITRATE)
+    
+    def apply_bitrate(self, guild_id, channel=None):
+        """Match the voice client's Opus encoder to its channel's bitrate
+        
+        Returns:
+            int: the bitrate in kbps
+        """
+        voice_client = self.get_voice_client(guild_id)
+        channel = channel or (voice_client.channel if voice_client else None)
+        if channel is None or not getattr(channel, 'bitrate', None):
+            return self.get_bitrate(guild_id)
+        
+        kbps = min(512, max(16, channel.bitrate // 1000))
+        self.bitrates[guild_id] = kbps
+        
+        # The encoder is only used for PCM sources, create it up front so it starts at the right bitrate
+        if isinstance(voice_client, NodeVoiceClient):
+            voice_client.set_bitrate(kbps)
+        elif voice_client and discord.opus.is_loaded():
+            if not voice_client.encoder:
+                voice_client.encoder = discord.opus.Encoder()
+            voice_client.encoder.set_bitrate(kbps)
+        logger.debug(f"Voice bitrate for guild {guild_id} set to {kbps} kbps")
+        return kbps
     
     async def join_voice_channel(self, ctx):
         """Join a voice channel"""
@@ -36,11 +81,12 @@ class VoiceManager:
             # Move to new channel if needed
             if voice_client.channel != voice_channel:
                 await voice_client.move_to(voice_channel)
+                self.apply_bitrate(guild_id, voice_channel)
             return voice_client
         
         # Connect to voice channel
         try:
-            voice_client = await voice_channel.connect()
+            voice_client = await self.connect(voice_channel)
             self.set_voice_client(guild_id, voice_client)
             return voice_client
         except Exception as e:
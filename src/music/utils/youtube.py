@@ -1,18 +1,35 @@
 import re
 import asyncio
 import logging
-import yt_dlp
+from urllib.parse import urlparse, parse_qs
+
+from .extractor_pool import ExtractionCancelled
 
 # YouTube URL regex patterns
 YOUTUBE_URL_REGEX = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
 YOUTUBE_PLAYLIST_REGEX = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(playlist\?list=)([^&=%\?]+)'
+YOUTUBE_VIDEO_ID_REGEX = r'(?:[?&]v=|youtu\.be/|/embed/|/v/|/shorts/|/live/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+
+# Approximate bitrates (kbps) of YouTube's Opus audio formats by itag
+OPUS_ITAG_BITRATES = {'249': 50, '250': 70, '251': 160}
 
 logger = logging.getLogger('discord')
 
-def get_ytdlp_options():
-    """Get the options for yt-dlp"""
-    return {
-        'format': 'bestaudio/best',
+# Single-flight registry: identical extractions running at the same time share one job
+_inflight_extractions = {}  # key: (future, guild_id that started it)
+singleflight_stats = {'started': 0, 'saved': 0}
+
+def get_ytdlp_options(profile='default'):
+    """Get the options for yt-dlp
+
+    Profiles:
+        default: metadata/search extraction
+        stream: full single-video extraction for a playable stream URL
+        flat: list search results without resolving them (cheap, no formats)
+        playlist: list playlist entries without resolving them, in one pass
+    """
+    options = {
+        'format': 'bestaudio[acodec=opus]/bestaudio/best',  # Opus can be played without re-encoding
         'extractaudio': True,
         'audioformat': 'mp3',
         'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',
@@ -37,11 +54,65 @@ def get_ytdlp_options():
         }
     }
 
-def get_ffmpeg_options():
-    """Get the options for FFmpeg"""
+    if profile == 'stream':
+        options['extract_flat'] = False  # Force full extraction
+        options['noplaylist'] = True  # Don't process as playlist
+    elif profile == 'flat':
+        options['extract_flat'] = True  # Only list entries, do not resolve formats
+    elif profile == 'playlist':
+        options['extract_flat'] = True
+        options['noplaylist'] = False  # The entry range is selected per job with 'playlist_items'
+
+    return options
+
+def is_opus_stream(url):
+    """Check if a googlevideo stream URL serves Opus (audio/webm), which can be passed through as-is"""
+    try:
+        mime = parse_qs(urlparse(url).query).get('mime')
+    except (ValueError, TypeError):
+        return False
+    return bool(mime) and mime[0] == 'audio/webm'
+
+def get_opus_bitrate(url):
+    """Get the approximate bitrate (kbps) of an Opus stream URL, assuming the best format if unknown"""
+    try:
+        itag = parse_qs(urlparse(url).query).get('itag')
+    except (ValueError, TypeError):
+        itag = None
+    return OPUS_ITAG_BITRATES.get(itag[0] if itag else None, OPUS_ITAG_BITRATES['251'])
+
+# Audio filter presets: ffmpeg filtergraph and how fast they play the song (for position tracking)
+AUDIO_FILTERS = {
+    'bassboost': {'label': 'Bass Boost', 'filter': 'bass=g=8', 'speed': 1.0},
+    'nightcore': {'label': 'Nightcore', 'filter': 'aresample=48000,asetrate=48000*1.25,aresample=48000', 'speed': 1.25},
+    'vaporwave': {'label': 'Vaporwave', 'filter': 'aresample=48000,asetrate=48000*0.8,aresample=48000', 'speed': 0.8},
+    'speed': {'label': 'Speed 1.25x', 'filter': 'atempo=1.25', 'speed': 1.25},
+    'slow': {'label': 'Slow 0.8x', 'filter': 'atempo=0.8', 'speed': 0.8},
+    '8d': {'label': '8D', 'filter': 'apulsator=hz=0.125', 'speed': 1.0},
+}
+
+def get_filter_speed(filters):
+    """Get how many seconds of the song one second of playback covers with these filters"""
+    speed = 1.0
+    for name in filters:
+        speed *= AUDIO_FILTERS[name]['speed']
+    return speed
+
+def get_ffmpeg_options(start=0, filters=()):
+    """Get the options for FFmpeg, optionally starting `start` seconds into the stream
+
+    `filters` are AUDIO_FILTERS preset names, applied in the order they are defined.
+    """
+    before_options = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+    if start > 0:
+        before_options += f' -ss {start:.2f}'
+    options = '-vn'
+    if filters:
+        filtergraph = ','.join(preset['filter'] for name, preset in AUDIO_FILTERS.items() if name in filters)
+        options += f' -af "{filtergraph}"'
     return {
-        'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-        'options': '-vn',
+        'before_options': before_options,
+        'options': options,
     }
 
 def is_youtube_url(url):
@@ -52,15 +123,66 @@ def is_youtube_playlist(url):
     """Check if a URL is a valid YouTube playlist URL"""
     return re.match(YOUTUBE_PLAYLIST_REGEX, url) is not None
 
-async def extract_info(ytdl, url, download=False):
-    """Extract info from a YouTube URL using yt-dlp"""
-    loop = asyncio.get_event_loop()
-    data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=download))
-    return data
+def get_video_id(url):
+    """Get the 11 character video id from a YouTube video URL, or None"""
+    match = re.search(YOUTUBE_VIDEO_ID_REGEX, url)
+    return match.group(1) if match else None
+
+def get_extraction_key(url, profile='default'):
+    """Normalize a URL or search query so identical requests map to the same key"""
+    url = url.strip()
+    video_id = get_video_id(url) if is_youtube_url(url) else None
+    if video_id:
+        return (profile, 'video', video_id)
+    if re.match(r'https?://', url):
+        return (profile, 'url', url)
+    # Free-text search: case and spacing do not change the results
+    return (profile, 'search', ' '.join(url.lower().split()))
+
+def get_singleflight_stats():
+    """Get how many extractions were started and how many were saved by coalescing"""
+    return {'in_flight': len(_inflight_extractions), **singleflight_stats}
+
+async def extract_info(extractor, url, profile='default', guild_id=None):
+    """Extract info from a YouTube URL using the yt-dlp extraction pool
 
-async def get_song_info(ytdl, url):
+    Concurrent calls for the same video, URL or search query await a single
+    extraction. Its result or error is shared with everyone waiting, and the
+    entry is dropped as soon as it completes, so nothing is cached here.
+    """
+    key = get_extraction_key(url, profile)
+    inflight = _inflight_extractions.get(key)
+    if inflight is not None:
+        future, owner_guild_id = inflight
+        singleflight_stats['saved'] += 1
+        logger.debug(f"Joining in-flight extraction for: {url}")
+        try:
+            return await asyncio.shield(future)
+        except ExtractionCancelled:
+            # Cancelled by the guild that started it (skip/stop), not by us
+            if owner_guild_id == guild_id:
+                raise
+            return await extractor.extract(url, profile=profile, guild_id=guild_id)
+    
+    future = asyncio.ensure_future(extractor.extract(url, profile=profile, guild_id=guild_id))
+    _inflight_extractions[key] = (future, guild_id)
+    singleflight_stats['started'] += 1
+    
+    def _release(done_future):
+        if _inflight_extractions.get(key, (None,))[0] is done_future:
+            del _inflight_extractions[key]
+        if not done_future.cancelled():
+            done_future.exception()  # Mark as retrieved when every waiter went away
+    
+    future.add_done_callback(_release)
+    return await asyncio.shield(future)
+
+async def get_song_info(extractor, url, guild_id=None, cache=None):
     """Get song info from a YouTube URL or search query
     
+    If a metadata cache is given, known queries and videos are answered from
+    it and known-dead links fail without running yt-dlp.
+    
     Returns:
         tuple: (list of songs, dict with metadata)
     """
@@ -69,29 +191,46 @@ async def get_song_info(ytdl, url):
         if is_youtube_playlist(url):
             raise ValueError("Playlists are not supported. Please add songs individually.")
         
+        if cache:
+            status, cached = cache.lookup(url)
+            if status == 'negative':
+                raise ValueError(cached)
+            if status == 'hit':
+                logger.info(f"Using cached video info for: {url}")
+                return [cached], {'skipped_count': 0, 'total_entries': 1}
+        
         # Handle single video or search
         logger.info(f"Extracting video info for: {url}")
-        info = await extract_info(ytdl, url)
-        
-        if not info:
-            raise ValueError("Could not extract video information")
-        
-        if 'entries' in info and info['entries']:
-            # Take first entry if search result
-            info = info['entries'][0]
+        try:
+            info = await extract_info(extractor, url, guild_id=guild_id)
+            
             if not info:
-                raise ValueError("No results found")
+                raise ValueError("Could not extract video information")
+            
+            if 'entries' in info:
+                # Take first entry if search result
+                info = info['entries'][0] if info['entries'] else None
+                if not info:
+                    raise ValueError("No results found")
+        except Exception as e:
+            if cache:
+                cache.store_failure(url, e)
+            raise
         
         title = info.get('title', 'Unknown')
         video_url = info.get('url')
         webpage_url = info.get('webpage_url', url)
         
-        # Return single song
-        return [{'title': title,
+        song = {'title': title,
                 'url': video_url,
                 'webpage_url': webpage_url,
                 'duration': info.get('duration', 0),
-                'video_id': info.get('id', None)}], {'skipped_count': 0, 'total_entries': 1}
+                'video_id': info.get('id', None)}
+        if cache:
+            cache.store(url, song)
+        
+        # Return single song
+        return [song], {'skipped_count': 0, 'total_entries': 1}
     except Exception as e:
         logger.error(f"Error extracting info: {e}")
         # Check for private video error
@@ -100,20 +239,140 @@ async def get_song_info(ytdl, url):
             raise ValueError("This is a private video and requires authentication. Please try a different video.")
         raise
 
-async def get_fresh_stream_url(ytdl, webpage_url):
+def get_watch_url(video_id):
+    """Get the canonical watch URL for a video id"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def get_flat_song(entry):
+    """Build a placeholder song from a flat search or playlist entry"""
+    return {'title': entry.get('title') or 'Unknown',
+            'url': None,
+            'webpage_url': get_watch_url(entry['id']),
+            'duration': entry.get('duration') or 0,
+            'video_id': entry['id'],
+            'pending': True}
+
+async def get_song_stub(extractor, url, guild_id=None, cache=None):
+    """Phase 1 of lazy extraction: cheaply resolve a URL or query to a placeholder song
+    
+    Free-text queries use a flat search that only lists the top result, video
+    URLs a flat search for their id, which gives the real title without
+    resolving any formats. Placeholders are marked 'pending' and are fully
+    resolved by enrich_song before they play, which is also when they are
+    cached. Anything else falls back to a full get_song_info.
+    
+    Returns:
+        tuple: (list of songs, dict with metadata)
+    """
+    if is_youtube_playlist(url):
+        raise ValueError("Playlists are not supported. Please add songs individually.")
+    
+    if cache:
+        status, cached = cache.lookup(url)
+        if status == 'negative':
+            raise ValueError(cached)
+        if status == 'hit':
+            logger.info(f"Using cached video info for: {url}")
+            return [cached], {'skipped_count': 0, 'total_entries': 1}
+    
+    video_id = get_video_id(url) if is_youtube_url(url) else None
+    if video_id:
+        entry = await _flat_lookup(extractor, video_id, guild_id)
+        if entry is None:
+            # Not found by its id, only a full extraction can tell what it is
+            return await get_song_info(extractor, url, guild_id, cache)
+        return [get_flat_song(entry)], {'skipped_count': 0, 'total_entries': 1}
+    
+    if re.match(r'https?://', url.strip()):
+        return await get_song_info(extractor, url, guild_id, cache)
+    
+    logger.info(f"Flat search for: {url}")
+    try:
+        info = await extract_info(extractor, f"ytsearch1:{url}", profile='flat', guild_id=guild_id)
+        entries = (info or {}).get('entries') or []
+        if not entries or not entries[0] or not entries[0].get('id'):
+            raise ValueError("No results found")
+    except Exception as e:
+        logger.error(f"Error searching for '{url}': {e}")
+        if cache:
+            cache.store_failure(url, e)
+        raise
+    
+    song = get_flat_song(entries[0])
+    if cache:
+        # Only which video the query found, the song is cached once it is resolved
+        cache.store_query(url, song['video_id'])
+    return [song], {'skipped_count': 0, 'total_entries': 1}
+
+async def _flat_lookup(extractor, video_id, guild_id=None):
+    """Get a video's flat search entry (title, duration) by its id, or None if the search does not find it"""
+    try:
+        # Quoted, an id starting with "-" would exclude the term instead
+        info = await extract_info(extractor, f'ytsearch1:"{video_id}"', profile='flat', guild_id=guild_id)
+    except ExtractionCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"Flat lookup of video {video_id} failed: {e}")
+        return None
+    entries = (info or {}).get('entries') or []
+    if entries and entries[0] and entries[0].get('id') == video_id:
+        return entries[0]
+    return None
+
+async def search_songs(extractor, query, limit=5, guild_id=None):
+    """Run one flat multi-result search and return the top hits as placeholder songs
+    
+    Nothing is resolved until the user picks one of the results.
+    
+    Returns:
+        list: placeholder songs, each with the uploading channel in 'channel'
+    """
+    logger.info(f"Flat search ({limit} results) for: {query}")
+    info = await extract_info(extractor, f"ytsearch{limit}:{query}", profile='flat', guild_id=guild_id)
+    songs = []
+    for entry in (info or {}).get('entries') or []:
+        if not entry or not entry.get('id'):
+            continue
+        song = get_flat_song(entry)
+        song['channel'] = entry.get('channel') or entry.get('uploader') or 'Unknown channel'
+        songs.append(song)
+    return songs
+
+async def enrich_song(extractor, song, guild_id=None, cache=None):
+    """Phase 2 of lazy extraction: fully resolve a queued placeholder entry
+    
+    Swaps the entry's pending track for one with the real title, duration and webpage URL.
+    Errors are raised so the caller can drop the song from the queue.
+    
+    Returns:
+        str: the stream URL found by the same extraction
+    """
+    try:
+        info = await extract_info(extractor, song['webpage_url'], profile='stream', guild_id=guild_id)
+        if info and 'entries' in info:
+            info = info['entries'][0] if info['entries'] else None
+        if not info:
+            raise ValueError("Could not extract video information")
+    except ExtractionCancelled:
+        raise
+    except Exception as e:
+        if cache:
+            cache.store_failure(song['webpage_url'], e)
+        raise
+    
+    song.resolve(info.get('title', song['title']), info.get('duration') or song['duration'],
+                 info.get('webpage_url', song['webpage_url']), info.get('id', song['video_id']))
+    if cache:
+        cache.store(song['webpage_url'], song)
+    return info.get('url')
+
+async def get_fresh_stream_url(extractor, webpage_url, guild_id=None):
     """Get a fresh stream URL for playback (to avoid expired URLs)"""
     try:
         logger.debug(f"Extracting fresh stream URL from: {webpage_url}")
         
-        # Create a new ytdl instance with different options for single video extraction
-        single_video_opts = get_ytdlp_options()
-        single_video_opts['extract_flat'] = False  # Force full extraction
-        single_video_opts['noplaylist'] = True  # Don't process as playlist
-        
-        single_ytdl = yt_dlp.YoutubeDL(single_video_opts)
-        
-        loop = asyncio.get_event_loop()
-        info = await loop.run_in_executor(None, lambda: single_ytdl.extract_info(webpage_url, download=False))
+        # Full single-video extraction on a warm 'stream' worker instance
+        info = await extract_info(extractor, webpage_url, profile='stream', guild_id=guild_id)
         
         if not info:
             logger.error("No info returned from yt-dlp")
@@ -131,6 +390,9 @@ async def get_fresh_stream_url(ytdl, webpage_url):
         logger.debug(f"Successfully extracted stream URL")
         return url
         
+    except ExtractionCancelled:
+        logger.debug(f"Stream URL extraction cancelled for: {webpage_url}")
+        return None
     except Exception as e:
         logger.error(f"Error getting fresh stream URL from {webpage_url}: {e}", exc_info=True)
         return None
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+
+import discord
+
+from src.music.utils.audio_cache import AudioCache
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+
+class FakeOpus(discord.AudioSource):
+    """Opus source serving numbered packets, optionally stopping early"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.sent = 0
+        self.cleaned_up = False
+
+    def read(self):
+        if self.sent >= self.frames:
+            return b''
+        self.sent += 1
+        return b'packet%05d' % self.sent
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def play(source):
+    packets = []
+    while data := source.read():
+        packets.append(data)
+    source.cleanup()
+    return packets
+
+
+def video_id(i):
+    return f"video{i:06d}"
+
+
+def test_finished_recording_is_committed_and_served(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    source = cache.record(video_id(1), FakeOpus(250), 128, duration=5)
+    assert os.listdir(tmp_path) == [f"{video_id(1)}_128.opus.part"]
+    assert cache.lookup(video_id(1)) == (None, None)
+
+    packets = play(source)
+    assert sorted(os.listdir(tmp_path)) == [f"{video_id(1)}_128.opus"]
+    path, bitrate = cache.lookup(video_id(1))
+    assert bitrate == 128
+    assert play(cache.open(path)) == packets
+
+    # Seeking skips whole 20 ms packets
+    assert play(cache.open(path, start=2)) == packets[int(2 / FRAME_SECONDS):]
+
+
+def test_partial_file_is_never_visible_until_the_rename(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    source = cache.record(video_id(1), FakeOpus(250), 128, duration=5)
+    for _ in range(100):
+        source.read()
+    assert os.listdir(tmp_path) == [f"{video_id(1)}_128.opus.part"]
+    assert cache.lookup(video_id(1)) == (None, None)
+    # Recording the same video twice at once is not possible
+    other = FakeOpus(250)
+    assert cache.record(video_id(1), other, 128, duration=5) is other
+
+
+def test_stopped_or_cut_off_recordings_are_thrown_away(tmp_path):
+    cache = AudioCache(str(tmp_path))
+
+    # Skipped halfway through
+    source = cache.record(video_id(1), FakeOpus(250), 128, duration=5)
+    for _ in range(100):
+        source.read()
+    source.cleanup()
+
+    # The stream ended well before the song's duration (network error)
+    play(cache.record(video_id(2), FakeOpus(100), 128, duration=5))
+
+    assert os.listdir(tmp_path) == []
+    assert cache.lookup(video_id(1)) == (None, None) and cache.lookup(video_id(2)) == (None, None)
+    assert cache.stats['aborted'] == 2 and cache.stats['commits'] == 0
+
+
+def test_failed_commit_is_aborted(tmp_path, monkeypatch):
+    cache = AudioCache(str(tmp_path))
+
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'replace', fail)
+    play(cache.record(video_id(1), FakeOpus(250), 128, duration=5))
+    assert os.listdir(tmp_path) == []
+    assert cache.lookup(video_id(1)) == (None, None)
+    assert not cache.recording
+
+
+def test_least_recently_played_files_are_evicted(tmp_path):
+    # Each recording is 250 packets of 2 + 11 bytes
+    cache = AudioCache(str(tmp_path), max_bytes=3 * 250 * 13)
+    for i in range(3):
+        play(cache.record(video_id(i), FakeOpus(250), 128, duration=5))
+    cache.lookup(video_id(0))  # played again, now the most recent
+
+    play(cache.record(video_id(3), FakeOpus(250), 128, duration=5))
+    assert list(cache.entries) == [video_id(2), video_id(0), video_id(3)]
+    assert sorted(os.listdir(tmp_path)) == [f"{video_id(i)}_128.opus" for i in (0, 2, 3)]
+    assert cache.total_bytes == 3 * 250 * 13
+    assert cache.stats['evictions'] == 1
+
+
+def test_restart_indexes_files_and_deletes_leftover_parts(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    play(cache.record(video_id(1), FakeOpus(250), 96, duration=5))
+    source = cache.record(video_id(2), FakeOpus(250), 128, duration=5)
+    source.read()  # the bot crashes mid-recording
+
+    restarted = AudioCache(str(tmp_path))
+    assert restarted.lookup(video_id(1))[1] == 96
+    assert restarted.lookup(video_id(2)) == (None, None)
+    assert sorted(os.listdir(tmp_path)) == [f"{video_id(1)}_96.opus"]
+    source.file.close()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from src.music.node.server import AudioNodeServer, NodeSession
+from src.music.node.stand_in import StandInNodeServer
+from src.music.utils.audio_node import NodeClient, NodeError
+from src.music.utils.node_protocol import check_track_url, encode_message, open_node_connection, read_message
+
+
+def run_with_node(tmp_path, test, token='secret'):
+    address = str(tmp_path / 'node.sock')
+
+    async def main():
+        server = StandInNodeServer(address, token=token)
+        await server.start()
+        try:
+            await test(address)
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+
+
+def test_hello_needs_the_token(tmp_path):
+    async def test(address):
+        assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+
+        with pytest.raises(NodeError, match='Not authenticated'):
+            await NodeClient(address, token='wrong').connect()
+        with pytest.raises(NodeError, match='Not authenticated'):
+            await NodeClient(address).connect()
+
+        client = NodeClient(address, token='secret')
+        await client.connect()
+        assert (await client.request('stats'))['ok']
+        client.writer.close()
+
+    run_with_node(tmp_path, test)
+
+
+def test_requests_before_hello_are_refused(tmp_path):
+    async def test(address):
+        reader, writer = await open_node_connection(address)
+        writer.write(encode_message({'op': 'connect', 'id': 1, 'guild_id': 1, 'user_id': 2, 'channel_id': 3}))
+        reply = await read_message(reader)
+        assert reply == {'op': 'reply', 'id': 1, 'ok': False, 'error': 'Not authenticated'}
+        assert await read_message(reader) is None  # the node hung up
+        writer.close()
+
+    run_with_node(tmp_path, test)
+
+
+def test_tcp_node_needs_a_token():
+    with pytest.raises(RuntimeError, match='token'):
+        asyncio.run(AudioNodeServer('127.0.0.1:0').start())
+
+
+@pytest.mark.parametrize('url', ['file:///etc/passwd', 'concat:/etc/passwd|/etc/hosts', '/etc/passwd',
+                                 'pipe:0', None])
+def test_only_http_tracks_are_played(url):
+    with pytest.raises(ValueError):
+        check_track_url(url)
+    with pytest.raises(ValueError):
+        asyncio.run(NodeSession(None, None, 1, 2).play(1, {'url': url}))
+
+
+def test_http_tracks_are_accepted():
+    check_track_url('https://rr1---sn-abc.googlevideo.com/videoplayback?expire=1')
+    check_track_url('http://example.com/stream.m3u8')
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from src.music.utils import extractor_pool
+from src.music.utils.client_selector import PlayerClientSelector
+from src.music.utils.extractor_pool import ExtractionError, ExtractorPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def stub_extraction(monkeypatch, latencies, failing=(), calls=None):
+    """Make every extraction take the client's latency, and fail for the clients in `failing`"""
+    def run_extraction(profile, url, params=None):
+        client = params['extractor_args']['youtube']['player_client'][0]
+        if calls is not None:
+            calls.append(client)
+        time.sleep(latencies[client])
+        if client in failing:
+            raise ExtractionError('HTTP Error 403: Forbidden')
+        return {'url': url, 'client': client}
+
+    monkeypatch.setattr(extractor_pool, '_run_extraction', run_extraction)
+
+
+def test_clients_are_tried_fastest_first(monkeypatch):
+    calls = []
+    stub_extraction(monkeypatch, {'android': 0.06, 'web': 0.01, 'ios': 0.03}, calls=calls)
+    selector = PlayerClientSelector(clients=('android', 'web', 'ios'))
+
+    async def main():
+        pool = ExtractorPool(max_workers=1, use_processes=False, client_selector=selector)
+        try:
+            for i in range(5):
+                await pool.extract(f'video{i}')
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+    # Unmeasured clients are tried first, then the fastest one keeps being used
+    assert calls == ['android', 'web', 'ios', 'web', 'web']
+    assert selector.order() == ['web', 'ios', 'android']
+
+
+def test_order_weighs_latency_by_error_rate():
+    selector = PlayerClientSelector(clients=('android', 'web'))
+    selector.record_success('android', 1.0)
+    selector.record_success('web', 0.5)
+    selector.record_failure('web', 0.5)
+    assert selector.order() == ['web', 'android']
+
+    # A second failure makes web's expected time per success higher than android's
+    selector.record_failure('web', 0.5)
+    health = selector.health['web']
+    assert health.latency / (1 - health.error_rate) > 1.0
+    assert selector.order() == ['android', 'web']
+
+
+def test_breaker_skips_a_failing_client_until_the_cooldown_ends(monkeypatch):
+    calls = []
+    stub_extraction(monkeypatch, {'android': 0, 'web': 0.02}, failing={'android'}, calls=calls)
+    clock = FakeClock()
+    selector = PlayerClientSelector(clients=('android', 'web'), cooldown=300, clock=clock)
+    selector.record_success('android', 0.001)  # android starts out best
+    selector.record_success('web', 0.02)
+
+    async def main():
+        pool = ExtractorPool(max_workers=1, use_processes=False, client_selector=selector)
+        try:
+            for i in range(3):
+                assert (await pool.extract(f'video{i}'))['client'] == 'web'
+            assert calls == ['android', 'web'] * 3
+            assert selector.get_stats()['android']['breaker_open']
+
+            # Open breaker: android is not tried at all
+            calls.clear()
+            clock.now += 299
+            await pool.extract('video3')
+            assert calls == ['web']
+
+            # After the cooldown android gets a trial, which fails and reopens the breaker
+            calls.clear()
+            clock.now += 2
+            await pool.extract('video4')
+            assert calls[0] == 'android'
+            assert selector.order() == ['web']
+
+            # A successful trial closes it again
+            clock.now += 301
+            monkeypatch.setattr(extractor_pool, '_run_extraction',
+                                lambda profile, url, params=None: {'url': url})
+            await pool.extract('video5')
+            assert not selector.get_stats()['android']['breaker_open']
+            assert 'android' in selector.order()
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.music.utils import extractor_pool
+from src.music.utils.client_selector import PlayerClientSelector
+from src.music.utils.extractor_pool import ExtractorPool, is_permanent_error
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def test_dead_worker_restarts_the_pool_once(monkeypatch):
+    release = threading.Event()
+
+    def run_extraction(profile, url, params=None):
+        if url.startswith('dead'):
+            release.wait(5)
+            raise BrokenProcessPool('a worker died')
+        return {'url': url}
+
+    async def main():
+        executors = []
+
+        def create_executor():
+            executors.append(RecordingExecutor())
+            return executors[-1]
+
+        monkeypatch.setattr(extractor_pool, '_run_extraction', run_extraction)
+        monkeypatch.setattr(ExtractorPool, '_create_executor', lambda self: create_executor())
+        pool = ExtractorPool(max_workers=3, use_processes=False)
+
+        dead = [asyncio.ensure_future(pool.extract(f'dead{i}', profile='flat', guild_id=1)) for i in range(3)]
+        queued = asyncio.ensure_future(pool.extract('ok', profile='flat', guild_id=2))
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*dead, return_exceptions=True)
+        assert all(isinstance(result, BrokenProcessPool) for result in results)
+
+        # The job started on the replacement pool survives the other dead jobs' callbacks
+        assert await queued == {'url': 'ok'}
+        assert len(executors) == 2
+        assert executors[0].shut_down and not executors[1].shut_down
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_format_error_falls_back_to_the_next_player_client(monkeypatch):
+    calls = []
+
+    def run_extraction(profile, url, params=None):
+        client = params['extractor_args']['youtube']['player_client'][0]
+        calls.append(client)
+        if client == 'android':
+            raise extractor_pool.ExtractionError(
+                'ERROR: [youtube] abc: Requested format is not available. Use --list-formats for a list of available formats')
+        return {'url': url, 'client': client}
+
+    async def main():
+        monkeypatch.setattr(extractor_pool, '_run_extraction', run_extraction)
+        selector = PlayerClientSelector(clients=('android', 'web'))
+        pool = ExtractorPool(max_workers=1, use_processes=False, client_selector=selector)
+        try:
+            assert await pool.extract('abc') == {'url': 'abc', 'client': 'web'}
+        finally:
+            pool.shutdown()
+        assert calls == ['android', 'web']
+        assert selector.health['android'].failures == 1
+        assert selector.health['web'].successes == 1
+
+    asyncio.run(main())
+
+
+def test_permanent_errors():
+    assert is_permanent_error('ERROR: [youtube] abc: Video unavailable. This video is not available')
+    assert is_permanent_error('ERROR: [youtube] abc: Private video. Sign in if you\'ve been granted access')
+    assert not is_permanent_error('ERROR: [youtube] abc: Requested format is not available')
+    assert not is_permanent_error('HTTP Error 429: Too Many Requests')
+
+
+def hang(profile, url, params=None):
+    time.sleep(60)
+
+
+def test_hung_jobs_stop_holding_workers(monkeypatch):
+    release = threading.Event()
+
+    def run_extraction(profile, url, params=None):
+        if url.startswith('hang'):
+            release.wait(5)
+        return {'url': url}
+
+    async def main():
+        monkeypatch.setattr(extractor_pool, '_run_extraction', run_extraction)
+        pool = ExtractorPool(max_workers=2, use_processes=False, job_timeout=0.1)
+        first = pool._executor
+        hung = [asyncio.ensure_future(pool.extract(f'hang{i}', guild_id=1)) for i in range(2)]
+        results = await asyncio.gather(*hung, return_exceptions=True)
+        assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+        stats = pool.get_stats()
+        assert stats['running'] == 0 and stats['abandoned'] == 2
+        assert stats['recycled'] >= 1 and pool._executor is not first
+
+        # Another guild is served by the new workers while the old ones are still stuck
+        assert await asyncio.wait_for(pool.extract('ok', guild_id=2, timeout=5), 1) == {'url': 'ok'}
+        release.set()
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_jobs_do_not_block_the_pool(monkeypatch):
+    release = threading.Event()
+
+    def run_extraction(profile, url, params=None):
+        if url.startswith('slow'):
+            release.wait(5)
+        return {'url': url}
+
+    async def main():
+        monkeypatch.setattr(extractor_pool, '_run_extraction', run_extraction)
+        pool = ExtractorPool(max_workers=1, use_processes=False)
+        slow = asyncio.ensure_future(pool.extract('slow', guild_id=1))
+        await asyncio.sleep(0.05)
+        assert pool.cancel_guild(1) == 1
+        try:
+            await slow
+        except extractor_pool.ExtractionCancelled:
+            pass
+        assert await asyncio.wait_for(pool.extract('ok', guild_id=2), 1) == {'url': 'ok'}
+        assert pool.get_stats()['recycled'] == 1
+        release.set()
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_timed_out_worker_process_is_terminated(monkeypatch):
+    async def main():
+        monkeypatch.setattr(extractor_pool, '_run_extraction', hang)
+        monkeypatch.setattr(extractor_pool, '_warm_worker', lambda: None)
+        pool = ExtractorPool(max_workers=1, job_timeout=0.5)
+        if not pool.use_processes:
+            return
+        hung = asyncio.ensure_future(pool.extract('hang'))
+        await asyncio.sleep(0.2)
+        processes = list(pool._executor._processes.values())
+        try:
+            await hung
+        except asyncio.TimeoutError:
+            pass
+        for process in processes:
+            process.join(5)
+        assert processes and not any(process.is_alive() for process in processes)
+        pool.shutdown()
+
+    asyncio.run(main())
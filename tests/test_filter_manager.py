@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.music.services.player.filter_manager import FilterManager
+from src.music.utils.youtube import AUDIO_FILTERS, get_ffmpeg_options, get_filter_speed
+
+GUILD_ID = 1
+
+
+def make_manager():
+    restarts = []
+
+    async def restart_song(guild_id, position=None):
+        restarts.append(guild_id)
+        return True
+
+    player_service = SimpleNamespace(restart_song=restart_song, playback_stats={'filter_changes': 0})
+    return FilterManager(SimpleNamespace(player_service=player_service)), restarts
+
+
+def test_filter_chain_follows_the_preset_order():
+    options = get_ffmpeg_options(start=83.5, filters=['8d', 'bassboost'])
+    assert options['before_options'].endswith(' -ss 83.50')
+    assert options['options'] == f'-vn -af "{AUDIO_FILTERS["bassboost"]["filter"]},{AUDIO_FILTERS["8d"]["filter"]}"'
+
+    plain = get_ffmpeg_options()
+    assert '-ss' not in plain['before_options'] and plain['options'] == '-vn'
+
+
+def test_filter_speed_is_the_product_of_the_presets():
+    assert get_filter_speed([]) == 1.0
+    assert get_filter_speed(['bassboost', '8d']) == 1.0
+    assert get_filter_speed(['nightcore', 'speed']) == 1.25 * 1.25
+    assert get_filter_speed(['vaporwave', 'nightcore']) == 0.8 * 1.25
+
+
+def test_toggling_filters_restarts_once_per_change():
+    manager, restarts = make_manager()
+
+    async def main():
+        assert await manager.toggle_filter(GUILD_ID, 'nightcore') == ['nightcore']
+        assert await manager.toggle_filter(GUILD_ID, 'bassboost') == ['bassboost', 'nightcore']
+        # The same set in another order is not a change
+        assert await manager.set_filters(GUILD_ID, ['nightcore', 'bassboost', 'unknown']) == ['bassboost', 'nightcore']
+        assert await manager.toggle_filter(GUILD_ID, 'nightcore') == ['bassboost']
+        assert await manager.set_filters(GUILD_ID, []) == []
+
+    asyncio.run(main())
+    assert restarts == [GUILD_ID] * 4
+    assert manager.music_cog.player_service.playback_stats['filter_changes'] == 4
+    assert manager.get_filters(GUILD_ID) == [] and GUILD_ID not in manager.filters
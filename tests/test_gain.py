@@ -0,0 +1,68 @@
+import discord
+import numpy as np
+import pytest
+
+from src.music.utils.gain import GainAudio, gain_from_loudness
+
+
+class FakePCM(discord.AudioSource):
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b''
+
+    def is_opus(self):
+        return False
+
+
+def frame(*values):
+    """A 20 ms stereo frame (1920 samples) repeating `values`"""
+    return np.resize(np.array(values, dtype=np.int16), 1920).tobytes()
+
+
+def samples(data):
+    return np.frombuffer(data, dtype=np.int16)
+
+
+def test_unity_gain_passes_frames_through_unchanged():
+    data = frame(1, -2, 32767, -32768, 1000)
+    stats = {'frames': 0, 'seconds': 0.0}
+    gain = GainAudio(FakePCM([data]), stats=stats)
+    assert gain.read() is data
+    assert gain.read() == b''
+    assert stats['frames'] == 0  # nothing was processed
+
+
+@pytest.mark.parametrize('volume, normalization', [(0.5, 1.0), (1.0, 0.25), (2.0, 0.5)])
+def test_frames_are_scaled(volume, normalization):
+    values = (0, 1000, -1000, 12345, -12345, 30000)
+    gain = GainAudio(FakePCM([frame(*values)]), volume=volume, normalization=normalization)
+    expected = (np.array(values, dtype=np.float32) * np.float32(volume * normalization)).astype(np.int16)
+    assert np.array_equal(samples(gain.read())[:len(values)], expected)
+
+
+def test_boosted_frames_clip_at_32767():
+    gain = GainAudio(FakePCM([frame(20000, -20000, 32767, -32768, 100)]), volume=2.0)
+    assert list(samples(gain.read())[:5]) == [32767, -32767, 32767, -32767, 200]
+
+
+def test_volume_change_ramps_to_the_new_gain():
+    gain = GainAudio(FakePCM([frame(10000)] * 12), ramp_frames=10)
+    gain.volume = 0.5
+    first = samples(gain.read())
+    assert first[0] == 10000 and 9400 < first[-1] < 9600  # the first frame goes from 1.0 to 0.95
+    for _ in range(9):
+        gain.read()
+    assert np.all(samples(gain.read()) == 5000)
+
+
+def test_loudness_is_measured_and_normalized():
+    measured = []
+    frames = [frame(16384, -16384)] * 100  # a square wave at half scale: -6 dBFS
+    gain = GainAudio(FakePCM(frames), measure=True, on_measured=measured.append, min_measure_seconds=1)
+    while gain.read():
+        pass
+    assert measured == [pytest.approx(-6.02, abs=0.01)]
+    assert gain_from_loudness(-6.02, target=-16.0) == pytest.approx(10 ** (-9.98 / 20))
+    assert gain_from_loudness(-40.0, target=-16.0) == pytest.approx(10 ** (6 / 20))  # boost capped at 6 dB
@@ -0,0 +1,84 @@
+import discord
+import pytest
+
+from src.music.utils.audio import TrackedAudio
+from src.music.utils.gain import GainAudio
+from src.music.utils.gapless import GapStats, GaplessAudio, PrebufferedAudio, prebuffer_track
+
+OPUS_SILENCE = b'\xf8\xff\xfe'
+PCM_SILENCE = bytes(3840)
+
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, frames, opus=True):
+        self.frames = list(frames)
+        self.opus = opus
+        self.cleaned_up = False
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b''
+
+    def is_opus(self):
+        return self.opus
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def opus_frames(name, count):
+    return [f'{name}{i}'.encode().ljust(40, b'.') for i in range(count)]
+
+
+def test_switch_happens_on_the_next_read_without_an_empty_frame():
+    first, second = opus_frames('a', 5), opus_frames('b', 5)
+    stats = GapStats()
+    chain = GaplessAudio(TrackedAudio(FakeSource(first)), 'song a', stats=stats)
+    next_source = TrackedAudio(FakeSource(second))
+    switches = []
+    chain.on_switch = lambda old, new, song: switches.append((old, new, song))
+    chain.set_next(next_source, 'song b')
+
+    played = [chain.read() for _ in range(10)]
+    assert played == first + second  # no b'' (which would stop the player) between the tracks
+    assert chain.song == 'song b' and chain.current is next_source
+    assert len(switches) == 1 and switches[0][1:] == (next_source, 'song b')
+    assert stats.transitions == stats.gapless == 1
+    assert chain.read() == b''
+    assert chain.ended_at is not None
+
+
+def test_no_switch_when_the_prepared_track_is_stale():
+    first = FakeSource(opus_frames('a', 2))
+    chain = GaplessAudio(TrackedAudio(first), 'song a')
+    stale = FakeSource(opus_frames('b', 2))
+    chain.set_next(TrackedAudio(stale), 'song b', still_valid=lambda: False)
+
+    assert [chain.read() for _ in range(3)] == opus_frames('a', 2) + [b'']
+    assert stale.cleaned_up
+    assert chain.song == 'song a'
+
+
+@pytest.mark.parametrize('silence', [1, 7])
+def test_trimming_leading_silence_moves_the_offset(silence):
+    audio = opus_frames('b', 10)
+    source = TrackedAudio(FakeSource([OPUS_SILENCE] * silence + audio), offset=30)
+
+    buffered, trimmed = prebuffer_track(source, frames=4)
+    assert trimmed == silence
+    assert source.offset == pytest.approx(30 + silence * 0.02)
+    assert source.original is buffered and len(buffered.buffer) == 4
+    assert [source.read() for _ in range(10)] == audio
+    assert source.position == pytest.approx(30 + (silence + 10) * 0.02)
+
+
+def test_prebuffer_goes_inside_the_volume_stage():
+    audio = [b'\x00\x10' * 1920] * 3  # 4096, well above the silence level
+    gain = GainAudio(FakeSource([PCM_SILENCE] * 2 + audio, opus=False))
+    source = TrackedAudio(gain, speed=1.5)
+
+    buffered, trimmed = prebuffer_track(source, frames=2)
+    assert trimmed == 2
+    assert source.original is gain and isinstance(gain.original, PrebufferedAudio)
+    assert source.offset == pytest.approx(2 * 0.02 * 1.5)
+    gain.volume = 0.5  # still applies to the buffered frames
+    assert source.read() != audio[0]
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from src.music.utils.metadata_cache import MetadataCache
+
+SONG = {'title': 'Song', 'duration': 200, 'webpage_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+        'video_id': 'dQw4w9WgXcQ'}
+
+
+def test_only_permanent_errors_are_negatively_cached(tmp_path):
+    cache = MetadataCache(filename=str(tmp_path / 'cache.json'))
+    assert not cache.store_failure('some query', 'ERROR: [youtube] abc: Requested format is not available')
+    assert cache.lookup('some query') == (None, None)
+    assert cache.store_failure('other query', 'ERROR: [youtube] abc: Video unavailable. This video is not available')
+    assert cache.lookup('other query')[0] == 'negative'
+
+
+def test_flush_writes_compact_json_atomically(tmp_path):
+    path = tmp_path / 'cache.json'
+    cache = MetadataCache(filename=str(path))
+    cache.store('never gonna give you up', SONG)
+    asyncio.run(cache.flush())
+
+    assert not cache.dirty
+    assert not (tmp_path / 'cache.json.tmp').exists()
+    text = path.read_text()
+    assert '\n' not in text and ': ' not in text
+    assert json.loads(text)['videos']['dQw4w9WgXcQ']['title'] == 'Song'
+
+    reloaded = MetadataCache(filename=str(path))
+    assert reloaded.lookup('never gonna give you up') == ('hit', {**SONG, 'url': None})
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / 'cache.json'
+    cache = MetadataCache(filename=str(path))
+    cache.store('first', SONG)
+    cache.save()
+    before = path.read_text()
+
+    def dump(*args, **kwargs):
+        raise OSError('disk full')
+
+    cache.store('second', dict(SONG, video_id='abcdefghijk'))
+    monkeypatch.setattr(json, 'dump', dump)
+    asyncio.run(cache.flush())
+    assert path.read_text() == before
+    assert cache.dirty  # retried on the next flush
@@ -0,0 +1,137 @@
+import asyncio
+
+from src.music.utils.player_actor import PlayerActor
+
+
+def test_commands_run_one_at_a_time_in_order():
+    log = []
+
+    async def command(name, delay):
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+        return name
+
+    async def main():
+        actor = PlayerActor(1)
+        futures = [actor.send(None, command, 'a', 0.02), actor.send(None, command, 'b', 0),
+                   actor.send(None, command, 'c', 0.01)]
+        assert await asyncio.gather(*futures) == ['a', 'b', 'c']
+        assert actor.get_stats()['max_depth'] == 3
+        await asyncio.sleep(0)
+        assert actor.worker.done()  # no task is kept around without work
+
+    asyncio.run(main())
+    assert log == ['start a', 'end a', 'start b', 'end b', 'start c', 'end c']
+
+
+def test_queued_commands_with_the_same_key_are_collapsed():
+    runs = []
+
+    async def refresh(n):
+        runs.append(n)
+        return n
+
+    async def busy():
+        await asyncio.sleep(0.01)
+
+    async def main():
+        actor = PlayerActor(1)
+        actor.send(None, busy)
+        futures = [actor.send('refresh', refresh, n) for n in range(5)]
+        assert await asyncio.gather(*futures) == [0] * 5
+        assert actor.stats['collapsed'] == 4
+
+        # Once it has started, the same key queues a new command
+        assert await actor.send('refresh', refresh, 5) == 5
+
+    asyncio.run(main())
+    assert runs == [0, 5]
+
+
+def test_interrupt_cancels_the_running_command_and_resolves_queued_senders():
+    started = []
+
+    async def long_command():
+        started.append('long')
+        await asyncio.sleep(10)
+        return 'finished'
+
+    async def queued(name):
+        started.append(name)
+        return name
+
+    async def main():
+        actor = PlayerActor(1)
+        running = actor.send(None, long_command)
+        waiting = [actor.send('next', queued, 'next'), actor.send(None, queued, 'other')]
+        await asyncio.sleep(0.01)
+        actor.interrupt()
+        assert await running is None
+        assert await asyncio.gather(*waiting) == [None, None]
+        assert actor.stats['interrupted'] == 3
+
+        # The actor keeps working afterwards, the key is free again
+        assert await actor.send('next', queued, 'after') == 'after'
+
+    asyncio.run(main())
+    assert started == ['long', 'after']
+
+
+def test_failed_command_resolves_to_none_and_the_next_one_runs():
+    async def fail():
+        raise RuntimeError('boom')
+
+    async def ok():
+        return 'ok'
+
+    async def main():
+        actor = PlayerActor(1)
+        failed = actor.send(None, fail)
+        assert await asyncio.gather(failed, actor.send(None, ok)) == [None, 'ok']
+        assert actor.stats['failed'] == 1
+
+    asyncio.run(main())
+
+
+def test_closed_actor_refuses_commands():
+    ran = []
+
+    async def command():
+        ran.append(True)
+        await asyncio.sleep(10)
+
+    async def main():
+        actor = PlayerActor(1)
+        running = actor.send(None, command)
+        await asyncio.sleep(0.01)
+        actor.close()
+        assert await running is None
+        assert await actor.send(None, command) is None
+        assert actor.worker.done() and not actor.mailbox
+
+    asyncio.run(main())
+    assert ran == [True]
+
+
+def test_command_sent_from_a_running_command_runs_inline():
+    log = []
+
+    async def inner():
+        log.append('inner')
+        return 'inner result'
+
+    async def outer(actor):
+        log.append('outer start')
+        # Queuing it behind ourselves would wait forever
+        result = await actor.send(None, inner)
+        log.append('outer end')
+        return result
+
+    async def main():
+        actor = PlayerActor(1)
+        assert await asyncio.wait_for(actor.send(None, outer, actor), 1) == 'inner result'
+        assert actor.stats['processed'] == 1
+
+    asyncio.run(main())
+    assert log == ['outer start', 'inner', 'outer end']
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.music.services.playlist_service import PlaylistService
+
+
+class FakeExtractor:
+    def __init__(self, count):
+        self.count = count
+        self.calls = []
+
+    async def extract(self, url, profile='default', guild_id=None, params=None, timeout=None):
+        self.calls.append(params)
+        first, last = (int(n) for n in params['playlist_items'].split('-'))
+        entries = [{'id': f"video{i:05d}", 'title': f"Song {i}"} for i in range(first, min(last, self.count) + 1)]
+        if entries:
+            entries[2] = {'id': 'gone', 'title': '[Deleted video]'}
+        return {'title': 'Mix', 'playlist_count': self.count, 'entries': entries}
+
+
+def make_service(count):
+    queue = []
+
+    async def noop(*args, **kwargs):
+        pass
+
+    cog = SimpleNamespace(
+        extractor=FakeExtractor(count),
+        queue_manager=SimpleNamespace(get_queue=lambda guild_id: queue, get_current_song=lambda guild_id: None),
+        player_service=SimpleNamespace(enqueue=lambda guild_id, songs, requester: queue.extend(songs),
+                                       play_next=noop),
+        controller_service=SimpleNamespace(update_controller=noop),
+        voice_manager=SimpleNamespace(get_voice_client=lambda guild_id: None))
+    return PlaylistService(cog), cog, queue
+
+
+def test_first_page_is_listed_alone_then_the_rest_in_windows():
+    async def main():
+        service, cog, queue = make_service(240)
+        service.window = 1000
+        listed = []
+        enqueue = cog.player_service.enqueue
+
+        def record(guild_id, songs, requester):
+            listed.append(len(service.imports[1].entries) if 1 in service.imports else 0)
+            enqueue(guild_id, songs, requester)
+
+        cog.player_service.enqueue = record
+        songs, metadata = await service.import_playlist(1, 'https://www.youtube.com/playlist?list=PL1')
+        assert len(songs) == service.page_size - 1
+        assert metadata['importing']
+        await service.imports[1].task
+        return service, cog, queue, listed
+
+    service, cog, queue, listed = asyncio.run(main())
+    assert [call['playlist_items'] for call in cog.extractor.calls] == ['1-25', '26-125', '126-225', '226-325']
+    assert len(queue) == 240 - 4
+    assert max(listed) < 100  # queued entries are dropped from the listing
+    assert [song['video_id'] for song in queue[:3]] == ['video00001', 'video00002', 'video00004']
+    assert 1 not in service.imports
+
+
+def test_playlist_import_stops_at_the_limit():
+    async def main():
+        service, cog, queue = make_service(2000)
+        service.window = 1000
+        songs, metadata = await service.import_playlist(1, 'https://www.youtube.com/playlist?list=PL1')
+        playlist = service.imports[1]
+        await playlist.task
+        return service, playlist, queue
+
+    service, playlist, queue = asyncio.run(main())
+    assert len(queue) == service.max_entries - 6
+    assert playlist.skipped == 6
+    assert playlist.reason == f"limit of {service.max_entries} songs reached"
+
+
+def test_bulk_lines_are_queued_in_order_with_bounded_concurrency():
+    async def main():
+        service, cog, queue = make_service(0)
+        service.bulk_concurrency = 3
+        running = []
+        outstanding = set()  # started, not queued yet
+        peaks = {'running': 0, 'outstanding': 0}
+        enqueue = cog.player_service.enqueue
+
+        async def resolve_songs(guild_id, line):
+            number = int(line.split()[-1])
+            outstanding.add(line)
+            running.append(line)
+            peaks['running'] = max(peaks['running'], len(running))
+            peaks['outstanding'] = max(peaks['outstanding'], len(outstanding))
+            # Later lines of each group of three finish first
+            await asyncio.sleep((3 - number % 3) * 0.005)
+            running.remove(line)
+            if number == 4:
+                raise ValueError('Video unavailable')
+            return [{'title': line, 'video_id': f"video{number:05d}"}], {}
+
+        def record(guild_id, songs, requester):
+            for song in songs:
+                outstanding.discard(song['title'])
+            outstanding.discard('song 4')
+            enqueue(guild_id, songs, requester)
+
+        async def lines():
+            for number in range(12):
+                yield number + 1, f"song {number}"
+
+        cog.player_service.resolve_songs = resolve_songs
+        cog.player_service.enqueue = record
+        playlist = await service.import_lines(1, lines())
+        return playlist, queue, peaks
+
+    playlist, queue, peaks = asyncio.run(main())
+    assert [song['title'] for song in queue] == [f"song {n}" for n in range(12) if n != 4]
+    assert playlist.failures == [(5, 'song 4', 'Video unavailable')]
+    assert playlist.queued == 11 and playlist.total == 12
+    # Lines waiting for an earlier one hold their slot, so at most 3 are ever in flight
+    assert peaks['running'] == peaks['outstanding'] == 3
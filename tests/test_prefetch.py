@@ -0,0 +1,100 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.music.services.player_service import PlayerService
+from src.music.utils.queue_manager import QueueManager
+from src.music.utils.stream_cache import StreamCache
+
+GUILD_ID = 1
+
+
+class GatedExtractor:
+    """Stream extractions wait for the gate, then return a URL that expires in 6 hours"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.calls = []
+
+    async def extract(self, url, profile='default', guild_id=None):
+        video_id = url.rsplit('=', 1)[-1]
+        self.calls.append(video_id)
+        await self.gate.wait()
+        return {'url': f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time()) + 21600}&id={video_id}"}
+
+
+def song(video_id):
+    return {'title': video_id, 'duration': 180, 'video_id': video_id,
+            'webpage_url': f"https://www.youtube.com/watch?v={video_id}"}
+
+
+def make_service():
+    cog = SimpleNamespace(bot=None, stream_cache=StreamCache(), queue_manager=QueueManager(),
+                          extractor=GatedExtractor())
+    service = PlayerService(cog)
+    cog.queue_manager.add_multiple_to_queue(GUILD_ID, [song(f'video{i:06d}') for i in range(4)])
+    return service, cog
+
+
+async def extraction_started(cog):
+    while not cog.extractor.calls:
+        await asyncio.sleep(0)
+
+
+def prefetched(cog):
+    return [entry['video_id'] for entry in cog.queue_manager.get_queue(GUILD_ID) if entry.get('stream_url')]
+
+
+def test_look_ahead_follows_a_reordered_queue():
+    service, cog = make_service()
+
+    async def main():
+        service.schedule_prefetch(GUILD_ID)
+        await extraction_started(cog)
+        assert cog.extractor.calls == ['video000000']
+
+        # The song being resolved is moved to the back of the queue meanwhile
+        cog.queue_manager.move_song(GUILD_ID, 0, 3)
+        service.queue_reordered(GUILD_ID)
+        cog.extractor.gate.set()
+        await service.prefetch_tasks[GUILD_ID]
+
+    asyncio.run(main())
+    # Its result is not stored, the look-ahead moved on to the new first two songs
+    assert prefetched(cog) == ['video000001', 'video000002']
+    assert cog.extractor.calls == ['video000000', 'video000001', 'video000002']
+    assert GUILD_ID not in service.prefetch_tasks
+
+
+def test_results_for_a_cleared_queue_are_dropped():
+    service, cog = make_service()
+    first = cog.queue_manager.get_queue(GUILD_ID)[0]
+
+    async def main():
+        service.schedule_prefetch(GUILD_ID)
+        await extraction_started(cog)
+        cog.queue_manager.clear_queue(GUILD_ID)
+        cog.extractor.gate.set()
+        await service.prefetch_tasks[GUILD_ID]
+
+    asyncio.run(main())
+    assert first.get('stream_url') is None
+    assert cog.extractor.calls == ['video000000']
+
+
+def test_expired_prefetched_urls_are_resolved_again():
+    service, cog = make_service()
+    cog.extractor.gate.set()
+    queue = cog.queue_manager.get_queue(GUILD_ID)
+    queue[0]['stream_url'] = 'https://old'
+    queue[0]['stream_expires_at'] = time.time() - 1
+    queue[1]['stream_url'] = 'https://still-valid'
+    queue[1]['stream_expires_at'] = time.time() + 3600
+
+    async def main():
+        service.schedule_prefetch(GUILD_ID)
+        await service.prefetch_tasks[GUILD_ID]
+
+    asyncio.run(main())
+    assert cog.extractor.calls == ['video000000']
+    assert queue[0]['stream_url'] != 'https://old' and queue[1]['stream_url'] == 'https://still-valid'
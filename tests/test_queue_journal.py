@@ -0,0 +1,130 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from src.music.services.persistence_service import PersistenceService
+from src.music.utils.queue_journal import LOG_FILE, OLD_LOG_FILE, QueueJournal
+from src.music.utils.queue_manager import QueueManager
+
+
+def song(video_id):
+    return {'video_id': video_id, 'title': f"Song {video_id}", 'duration': 60}
+
+
+def make_manager(directory):
+    queue_manager = QueueManager()
+    journal = QueueJournal(str(directory))
+    journal.enabled = True
+    queue_manager.journal = journal
+    return queue_manager, journal
+
+
+def queued_ids(state, guild_id):
+    return [record['video_id'] for record in state[guild_id]['queue']]
+
+
+def test_records_replay_to_the_same_queues(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_multiple_to_queue(1, [song('a'), song('b'), song('c'), song('d')])
+    queue_manager.add_to_queue(2, song('x'))
+    queue_manager.set_current_song(1, queue_manager.remove_at(1, 0))
+    queue_manager.move_song(1, 2, 0)
+    queue_manager.set_repeat_mode(1, 'all')
+    journal.write(journal.take_pending())
+
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == [record['video_id'] for record in queue_manager.export_guild(1)['queue']]
+    assert state[1]['current']['video_id'] == 'a'
+    assert state[1]['repeat'] == 'all'
+    assert queued_ids(state, 2) == ['x']
+
+
+def test_compaction_keeps_the_state_and_drops_the_old_log(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_multiple_to_queue(1, [song('a'), song('b')])
+    journal.write(journal.take_pending())
+
+    journal.rotate()
+    start_seq = journal.seq
+    guilds = [(1, journal.last_seq(), queue_manager.export_guild(1))]
+    queue_manager.add_to_queue(1, song('c'))  # lands in the new log, after the export
+    journal.write(journal.take_pending())
+    journal.write_snapshot(start_seq, guilds)
+
+    assert not os.path.exists(tmp_path / OLD_LOG_FILE)
+    reloaded = QueueJournal(str(tmp_path))
+    state, _ = reloaded.load()
+    assert queued_ids(state, 1) == ['a', 'b', 'c']
+    assert reloaded.seq == journal.seq
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_multiple_to_queue(1, [song('a'), song('b')])
+    journal.write(journal.take_pending())
+    with open(tmp_path / LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write('[2,"add",1,[{"video_id":"c"')  # crash in the middle of a write
+
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == ['a', 'b']
+
+
+def test_interrupted_compaction_replays_both_logs(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_to_queue(1, song('a'))
+    journal.write(journal.take_pending())
+    journal.rotate()  # crash before the snapshot is written
+    queue_manager.add_to_queue(1, song('b'))
+    journal.write(journal.take_pending())
+
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == ['a', 'b']
+
+    # The next compaction appends to the log left behind instead of replacing it
+    journal.rotate()
+    queue_manager.add_to_queue(1, song('c'))
+    journal.write(journal.take_pending())
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == ['a', 'b', 'c']
+
+
+def test_snapshot_written_before_the_old_log_was_deleted(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_multiple_to_queue(1, [song('a'), song('b')])
+    journal.write(journal.take_pending())
+    journal.rotate()
+    guilds = [(1, journal.last_seq(), queue_manager.export_guild(1))]
+    journal.write_snapshot(journal.seq, guilds)
+    # Put the old log back as if the crash came before it was removed
+    with open(tmp_path / OLD_LOG_FILE, 'w', encoding='utf-8') as f:
+        f.write('[1,"add",1,[{"video_id":"a","title":"Song a","duration":60}]]\n')
+
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == ['a', 'b']
+
+
+def test_changes_during_restore_are_saved(tmp_path):
+    queue_manager, journal = make_manager(tmp_path)
+    queue_manager.add_multiple_to_queue(1, [song('a'), song('b')])
+    journal.write(journal.take_pending())
+
+    async def main():
+        restarted = QueueManager()
+        cog = SimpleNamespace(queue_manager=restarted)
+        persistence = PersistenceService(cog, str(tmp_path))
+        load = persistence.journal.load
+
+        def slow_load():
+            # Someone queues a song and removes it again while the saved state is loading
+            restarted.add_multiple_to_queue(1, [song('c'), song('d')])
+            restarted.remove_at(1, 0)
+            return load()
+
+        persistence.journal.load = slow_load
+        await persistence.restore()
+        assert [entry['video_id'] for entry in restarted.get_queue(1)] == ['a', 'b', 'd']
+        persistence.journal.write(persistence.journal.take_pending())
+
+    asyncio.run(main())
+    state, _ = QueueJournal(str(tmp_path)).load()
+    assert queued_ids(state, 1) == ['a', 'b', 'd']
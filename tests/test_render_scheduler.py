@@ -0,0 +1,24 @@
+import asyncio
+
+from src.music.utils.render_scheduler import EditBudget, RenderScheduler
+
+
+def test_forced_request_publishes_an_unchanged_render():
+    published = []
+
+    async def render(key):
+        async def publish():
+            published.append(key)
+            return True
+        return 1, 'same digest', publish
+
+    async def main():
+        scheduler = RenderScheduler(render, debounce=0, budget=EditBudget(rate=100, burst=100))
+        for force in (False, False, True):
+            scheduler.request(7, force=force)
+            await scheduler.tasks[7]
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert published == [7, 7]
+    assert scheduler.stats['unchanged'] == 1
@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from src.music.services.player.seek_manager import SeekManager
+from src.music.utils.audio import TrackedAudio
+
+GUILD_ID = 1
+
+
+class FakeStream(discord.AudioSource):
+    """Stream that dies after a number of 20 ms frames"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def read(self):
+        if self.frames <= 0:
+            return b''
+        self.frames -= 1
+        return b'frame'
+
+
+def make_cog(song):
+    restarts = []
+
+    async def restart_song(guild_id, position=None):
+        restarts.append(position)
+        return True
+
+    player_service = SimpleNamespace(sources={}, restarts=restarts, restart_song=restart_song,
+                                     playback_stats={'seeks': 0})
+    player_service.get_position = lambda guild_id: (player_service.sources[guild_id].position
+                                                    if guild_id in player_service.sources else None)
+    queue_manager = SimpleNamespace(current=song)
+    queue_manager.get_current_song = lambda guild_id: queue_manager.current
+    return SimpleNamespace(player_service=player_service, queue_manager=queue_manager)
+
+
+def play_until_it_dies(source):
+    while source.read():
+        pass
+    return source
+
+
+def test_stream_ending_early_resumes_from_the_last_frame_sent():
+    song = {'title': 'song', 'duration': 200}
+    seeker = SeekManager(make_cog(song))
+
+    # Started at 30 s (a seek or an earlier resume), died 500 frames later
+    source = play_until_it_dies(TrackedAudio(FakeStream(500), offset=30))
+    assert source.position == 30 + 500 * TrackedAudio.FRAME_LENGTH
+    assert seeker.should_resume(GUILD_ID, song, source)
+
+    # Filters that play faster cover more of the song per frame
+    nightcore = play_until_it_dies(TrackedAudio(FakeStream(500), offset=30, speed=1.25))
+    assert nightcore.position == 30 + 500 * TrackedAudio.FRAME_LENGTH * 1.25
+
+
+def test_resumes_are_limited_per_song():
+    song = {'title': 'song', 'duration': 200}
+    cog = make_cog(song)
+    seeker = SeekManager(cog)
+    source = play_until_it_dies(TrackedAudio(FakeStream(50), offset=60))
+
+    assert [seeker.should_resume(GUILD_ID, song, source) for _ in range(4)] == [True, True, True, False]
+
+    # The count starts over for the next song
+    other = {'title': 'other', 'duration': 200}
+    cog.queue_manager.current = other
+    assert seeker.should_resume(GUILD_ID, other, source)
+
+
+def test_finished_skipped_or_live_songs_are_not_resumed():
+    song = {'title': 'song', 'duration': 200}
+    cog = make_cog(song)
+    seeker = SeekManager(cog)
+
+    near_the_end = play_until_it_dies(TrackedAudio(FakeStream(100), offset=194))
+    assert seeker.is_finished(song, near_the_end.position)
+    assert not seeker.should_resume(GUILD_ID, song, near_the_end)
+
+    live = {'title': 'live', 'duration': 0}
+    cog.queue_manager.current = live
+    assert not seeker.should_resume(GUILD_ID, live, play_until_it_dies(TrackedAudio(FakeStream(100))))
+
+    # Another song was made current meanwhile
+    assert not seeker.should_resume(GUILD_ID, song, play_until_it_dies(TrackedAudio(FakeStream(100))))
+
+
+def test_seek_restarts_at_the_clamped_position():
+    song = {'title': 'song', 'duration': 200}
+    cog = make_cog(song)
+    seeker = SeekManager(cog)
+
+    async def main():
+        assert await seeker.seek(GUILD_ID, 90) is None  # nothing playing yet
+        cog.player_service.sources[GUILD_ID] = play_until_it_dies(TrackedAudio(FakeStream(500), offset=30))
+        assert await seeker.seek(GUILD_ID, 90) == 90
+        assert await seeker.seek(GUILD_ID, -5) == 0
+        assert await seeker.seek(GUILD_ID, 500) == 199
+        assert await seeker.seek_by(GUILD_ID, 10) == 50
+
+    asyncio.run(main())
+    assert cog.player_service.restarts == [90, 0, 199, 50]
+    assert cog.player_service.playback_stats['seeks'] == 4
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import discord
+
+from src.music.utils.jitter_buffer import BufferedAudio
+from src.music.utils.send_scheduler import SendScheduler
+
+FRAME = b'\xfc\xff\xfe'
+
+
+class FakeVoiceClient:
+    """Records when each packet was sent"""
+
+    def __init__(self):
+        self._connected = threading.Event()
+        self._connected.set()
+        self._player = None
+        self.encoder = None
+        self.loop = None
+        self.ws = None
+        self.sent = []
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return False
+
+    def send_audio_packet(self, data, encode=True):
+        self.sent.append(time.perf_counter())
+
+
+class EndlessSource(discord.AudioSource):
+    def read(self):
+        return FRAME
+
+    def is_opus(self):
+        return True
+
+
+class StalledSource(EndlessSource):
+    """A network source whose first read hangs until released"""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def read(self):
+        self.released.wait()
+        return FRAME
+
+    def cleanup(self):
+        self.released.set()
+
+
+def test_stalled_source_does_not_hold_up_other_sessions():
+    scheduler = SendScheduler(workers=1)
+    stalled, healthy = StalledSource(), EndlessSource()
+    stalled_client, healthy_client = FakeVoiceClient(), FakeVoiceClient()
+    stalled_player = scheduler.play(stalled_client, BufferedAudio(stalled))
+    healthy_player = scheduler.play(healthy_client, BufferedAudio(healthy))
+    try:
+        time.sleep(0.6)
+        assert not stalled_client.sent
+        assert stalled_player.starved_ticks > 0
+
+        # Skip the buffer's prefill, then the healthy session must have kept its 20 ms schedule
+        sent = healthy_client.sent[5:]
+        assert len(sent) >= 20
+        gaps = [b - a for a, b in zip(sent, sent[1:])]
+        assert max(gaps) < 0.1
+        assert sum(gaps) / len(gaps) < 0.03
+
+        # Once frames arrive the stalled session starts sending
+        stalled.released.set()
+        time.sleep(0.2)
+        assert stalled_client.sent
+    finally:
+        stalled_player.stop()
+        healthy_player.stop()
+        stalled.released.set()
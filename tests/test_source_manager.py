@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from src.music.services.player.source_manager import SourceManager
+from src.music.utils.audio import TrackedAudio
+from src.music.utils.gain import GainAudio
+
+GUILD_ID = 1
+OPUS_160 = 'https://rr1.googlevideo.com/videoplayback?itag=251&mime=audio%2Fwebm'
+OPUS_70 = 'https://rr1.googlevideo.com/videoplayback?itag=250&mime=audio%2Fwebm'
+AAC = 'https://rr1.googlevideo.com/videoplayback?itag=140&mime=audio%2Fmp4'
+
+
+class Silence(discord.AudioSource):
+    def read(self):
+        return bytes(3840)
+
+
+def make_manager(channel_bitrate=128, filters=()):
+    restarts = []
+
+    async def restart_song(guild_id, position=None):
+        restarts.append(guild_id)
+        return True
+
+    player_service = SimpleNamespace(sources={}, restart_song=restart_song, restarts=restarts,
+                                     playback_stats={'passthrough': 0, 'opus_encoded': 0, 'pcm': 0},
+                                     filter_manager=SimpleNamespace(get_filters=lambda guild_id: list(filters)))
+    voice_manager = SimpleNamespace(get_bitrate=lambda guild_id: channel_bitrate)
+    return SourceManager(SimpleNamespace(player_service=player_service, voice_manager=voice_manager))
+
+
+def test_mode_is_chosen_by_what_needs_the_samples():
+    manager = make_manager(channel_bitrate=128)
+    assert manager._choose_mode(GUILD_ID, OPUS_160) == ('passthrough', 160)  # within the headroom
+    assert manager._choose_mode(GUILD_ID, AAC) == ('opus', 128)
+
+    assert make_manager(channel_bitrate=64)._choose_mode(GUILD_ID, OPUS_160) == ('opus', 64)
+    assert make_manager(channel_bitrate=64)._choose_mode(GUILD_ID, OPUS_70) == ('passthrough', 70)
+    assert make_manager(filters=['nightcore'])._choose_mode(GUILD_ID, OPUS_160) == ('opus', 128)
+
+    manager.toggle_normalize(GUILD_ID)
+    assert manager._choose_mode(GUILD_ID, OPUS_160) == ('pcm', 128)
+    manager.toggle_normalize(GUILD_ID)
+    manager.volumes[GUILD_ID] = 0.5
+    assert manager._choose_mode(GUILD_ID, OPUS_160) == ('pcm', 128)
+
+
+def test_volume_changes_restart_only_sources_that_cannot_be_scaled():
+    manager = make_manager()
+    player_service = manager.music_cog.player_service
+
+    async def main():
+        # Nothing playing: only remembered for the next song
+        await manager.set_volume(GUILD_ID, 0.5)
+
+        # A decoded source ramps to the new volume in place
+        gain = GainAudio(Silence())
+        player_service.sources[GUILD_ID] = TrackedAudio(gain, bitrate=128)
+        await manager.set_volume(GUILD_ID, 0.8)
+        assert gain.volume == 0.8
+
+        # Passthrough at 100% stays passthrough, any other volume has to decode
+        player_service.sources[GUILD_ID] = TrackedAudio(Silence(), bitrate=160, passthrough=True)
+        await manager.set_volume(GUILD_ID, 1.0)
+        assert player_service.restarts == []
+        await manager.set_volume(GUILD_ID, 0.5)
+
+    asyncio.run(main())
+    assert player_service.restarts == [GUILD_ID]
+    assert manager.get_volume(GUILD_ID) == 0.5
+
+
+def test_bandwidth_is_counted_once_per_frame():
+    manager = make_manager()
+    source = TrackedAudio(Silence(), bitrate=64)
+    for _ in range(500):  # 10 seconds
+        source.read()
+    manager.music_cog.player_service.sources[GUILD_ID] = source
+
+    stats = manager.get_bandwidth_stats(GUILD_ID)
+    assert manager.bandwidth_sessions[GUILD_ID]['seconds'] == 10
+    assert stats['sent_mb'] == round(64 * 10 / 8 / 1024, 2)
+    manager.get_bandwidth_stats(GUILD_ID)
+    assert manager.bandwidth_sessions[GUILD_ID]['seconds'] == 10  # nothing new was sent
+
+    manager.cleanup(GUILD_ID)
+    assert GUILD_ID not in manager.bandwidth_sessions and GUILD_ID not in manager.volumes
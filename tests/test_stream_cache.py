@@ -0,0 +1,65 @@
+import time
+
+from src.music.utils import stream_cache
+from src.music.utils.stream_cache import StreamCache, get_stream_expiry
+
+NOW = 1_700_000_000
+
+
+def stream_url(expire=None, in_path=False):
+    if expire is None:
+        return 'https://rr1.googlevideo.com/videoplayback?itag=251'
+    if in_path:
+        return f'https://rr1.googlevideo.com/videoplayback/id/abc/expire/{expire}/itag/251'
+    return f'https://rr1.googlevideo.com/videoplayback?expire={expire}&itag=251'
+
+
+def test_expiry_is_read_from_the_query_or_the_path():
+    assert get_stream_expiry(stream_url(NOW + 21600)) == NOW + 21600
+    assert get_stream_expiry(stream_url(NOW + 21600, in_path=True)) == NOW + 21600
+    assert get_stream_expiry(stream_url()) is None
+    assert get_stream_expiry('not a url ?expire=soon') is None
+
+
+def test_entries_live_until_the_url_expiry_minus_the_margin(monkeypatch):
+    clock = [NOW]
+    monkeypatch.setattr(stream_cache.time, 'time', lambda: clock[0])
+    cache = StreamCache(safety_margin=300, default_ttl=1800)
+
+    url = stream_url(NOW + 3600)
+    assert cache.put('video', 'bestaudio', url) == NOW + 3600 - 300
+    clock[0] = NOW + 3600 - 301
+    assert cache.get('video', 'bestaudio') == url
+    clock[0] = NOW + 3600 - 300
+    assert cache.get('video', 'bestaudio') is None
+    assert cache.stats['expired'] == 1
+
+
+def test_urls_without_expiry_use_the_default_ttl(monkeypatch):
+    clock = [NOW]
+    monkeypatch.setattr(stream_cache.time, 'time', lambda: clock[0])
+    cache = StreamCache(safety_margin=300, default_ttl=1800)
+
+    assert cache.put('video', 'bestaudio', stream_url()) == NOW + 1800
+    clock[0] = NOW + 1800
+    assert cache.get('video', 'bestaudio') is None
+
+
+def test_urls_about_to_expire_are_not_cached(monkeypatch):
+    monkeypatch.setattr(stream_cache.time, 'time', lambda: NOW)
+    cache = StreamCache(safety_margin=300)
+    assert cache.put('video', 'bestaudio', stream_url(NOW + 200)) is None
+    assert cache.get('video', 'bestaudio') is None
+    assert not cache.entries
+
+
+def test_cache_is_keyed_by_format_and_can_be_invalidated():
+    cache = StreamCache()
+    later = int(time.time()) + 21600
+    cache.put('video', 'bestaudio', stream_url(later))
+    cache.put('video', 'opus', stream_url(later) + '&mime=audio%2Fwebm')
+    assert cache.get('video', 'opus').endswith('audio%2Fwebm')
+    cache.invalidate('video', 'opus')
+    assert cache.get('video', 'opus') is None and cache.get('video', 'bestaudio')
+    cache.invalidate('video')
+    assert not cache.entries
@@ -0,0 +1,69 @@
+import gc
+
+import pytest
+
+from src.music.utils.queue_manager import QueueManager
+from src.music.utils.track import QueueEntry, Track, TrackCatalog, TRACK_CATALOG
+
+
+def song(video_id, **fields):
+    return {'video_id': video_id, 'title': f'title {video_id}', 'duration': 180,
+            'webpage_url': f'https://www.youtube.com/watch?v={video_id}', **fields}
+
+
+def test_interning_returns_the_same_track():
+    catalog = TrackCatalog()
+    first = catalog.intern(song('aaaaaaaaaaa'))
+    assert catalog.intern(song('aaaaaaaaaaa', title='other title')) is first
+    second = catalog.intern(song('bbbbbbbbbbb'))
+    assert second is not first
+    assert catalog.get_stats() == {'tracks': 2, 'interned': 2, 'shared': 1}
+
+
+def test_resolved_track_replaces_a_placeholder():
+    catalog = TrackCatalog()
+    placeholder = catalog.intern(song('aaaaaaaaaaa', pending=True, duration=0))
+    resolved = catalog.intern(song('aaaaaaaaaaa'))
+    assert resolved is not placeholder and not resolved.pending
+    # ...but a later placeholder gets the resolved track
+    assert catalog.intern(song('aaaaaaaaaaa', pending=True)) is resolved
+
+
+def test_tracks_are_shared_across_guilds_and_released_with_the_last_queue():
+    manager = QueueManager()
+    video_id = 'shared00001'
+    entries = [manager.add_to_queue(guild_id, song(video_id), requester=guild_id) for guild_id in range(5)]
+    assert all(entry.track is entries[0].track for entry in entries)
+    assert [entry['requester'] for entry in entries] == list(range(5))
+    assert TRACK_CATALOG.tracks.get(video_id) is entries[0].track
+
+    del entries
+    for guild_id in range(4):
+        manager.clear_guild_data(guild_id)
+    gc.collect()
+    assert video_id in TRACK_CATALOG.tracks  # guild 4 still queues it
+
+    manager.clear_guild_data(4)
+    gc.collect()
+    assert video_id not in TRACK_CATALOG.tracks
+
+
+def test_tracks_are_immutable_and_entries_only_set_their_own_fields():
+    entry = QueueEntry.from_song(song('ccccccccccc'))
+    with pytest.raises(AttributeError):
+        entry.track.title = 'changed'
+    with pytest.raises(KeyError):
+        entry['title'] = 'changed'
+    entry['stream_url'] = 'https://stream'
+    assert entry['url'] == entry.pop('stream_url') == 'https://stream'
+    assert entry.get('stream_url', 'none') == 'none'
+    assert entry['webpage_url'] == 'https://www.youtube.com/watch?v=ccccccccccc'
+    assert entry.track._webpage_url is None  # the usual watch URL is not stored
+
+
+def test_records_round_trip():
+    entry = QueueEntry.from_song(song('ddddddddddd', pending=True), requester=42)
+    copy = QueueEntry.from_record(entry.to_record())
+    assert copy.track is entry.track
+    assert (copy.requester, copy.enqueued_at) == (42, entry.enqueued_at)
+    assert isinstance(copy.track, Track) and copy['pending']
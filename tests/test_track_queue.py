@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from src.music.utils.queue_manager import QueueManager
+from src.music.utils.track_queue import TrackQueue, _size
+
+
+def song(number):
+    return {'title': f'song {number}', 'duration': number % 7 * 60 or None, 'video_id': f'v{number % 50}'}
+
+
+def check_tree(queue):
+    """Check sizes, totals, parent pointers and the heap order of priorities"""
+    def walk(node, parent):
+        if node is None:
+            return 0, 0
+        assert node.parent is parent
+        if parent is not None:
+            assert node.priority <= parent.priority
+        left_size, left_total = walk(node.left, node)
+        right_size, right_total = walk(node.right, node)
+        assert node.size == left_size + right_size + 1
+        assert node.total == left_total + right_total + node.duration
+        return node.size, node.total
+
+    assert queue._root is None or queue._root.parent is None
+    walk(queue._root, None)
+
+
+def test_random_operations_match_a_list():
+    rng = random.Random(1234)
+    queue, model = TrackQueue(), []
+    numbers = iter(range(10 ** 6))
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.3 or not model:
+            new = song(next(numbers))
+            index = rng.randint(-len(model) - 2, len(model) + 2)
+            queue.insert(index, new)
+            model.insert(index, new)
+        elif op < 0.4:
+            new = [song(next(numbers)) for _ in range(rng.randint(0, 20))]
+            queue.extend(new)
+            model.extend(new)
+        elif op < 0.6:
+            index = rng.randrange(-len(model), len(model))
+            assert queue.pop(index) is model.pop(index)
+        elif op < 0.75:
+            source, destination = rng.randrange(len(model)), rng.randrange(len(model))
+            moved = queue.move(source, destination)
+            assert moved is model[source]
+            model.insert(destination, model.pop(source))
+        elif op < 0.85:
+            target = rng.choice(model)
+            assert queue.index(target) == next(i for i, s in enumerate(model) if s is target)
+            assert queue.remove(target)
+            model.remove(target)
+        elif op < 0.9:
+            queue.shuffle(rng)
+            assert sorted(map(id, queue)) == sorted(map(id, model))
+            model = list(queue)
+        elif op < 0.95:
+            target = rng.choice(model)
+            target['duration'] = rng.randint(0, 600)
+            queue.refresh(target)
+        else:
+            start, stop = sorted(rng.randrange(-len(model) - 3, len(model) + 3) for _ in range(2))
+            assert queue[start:stop] == model[start:stop]
+
+        assert len(queue) == len(model)
+        assert queue.total_duration == sum(s['duration'] or 0 for s in model)
+        if step % 50 == 0:
+            assert all(a is b for a, b in zip(queue, model))
+            check_tree(queue)
+    assert list(queue) == model
+    check_tree(queue)
+
+
+def test_dedupe_keeps_the_first_of_each_video():
+    songs = [song(number) for number in range(200)]
+    queue = TrackQueue(songs)
+    seen, expected = set(), []
+    for s in songs:
+        if s['video_id'] not in seen:
+            seen.add(s['video_id'])
+            expected.append(s)
+    assert queue.dedupe() == len(songs) - len(expected)
+    assert list(queue) == expected
+    check_tree(queue)
+
+
+def test_index_errors():
+    queue = TrackQueue([song(1)])
+    with pytest.raises(IndexError):
+        queue.pop(1)
+    with pytest.raises(ValueError):
+        queue.index(song(1))
+    assert _size(queue._root) == 1
+
+
+def test_every_reordering_bumps_the_queue_version():
+    manager = QueueManager()
+    entries = manager.add_multiple_to_queue(1, [song(number) for number in range(5)])
+
+    for change in (lambda: manager.remove_song(1, entries[2]),
+                   lambda: manager.remove_at(1, 0),
+                   lambda: manager.move_song(1, 0, 1),
+                   lambda: manager.shuffle_queue(1)):
+        version = manager.get_queue_version(1)
+        change()
+        assert manager.get_queue_version(1) == version + 1
@@ -0,0 +1,171 @@
+import asyncio
+
+from src.music.utils.extractor_pool import ExtractionCancelled, ExtractionError
+from src.music.utils.metadata_cache import MetadataCache
+from src.music.utils.track import QueueEntry
+from src.music.utils.youtube import enrich_song, extract_info, get_singleflight_stats, get_song_stub
+
+VIDEO_ID = 'dQw4w9WgXcQ'
+VIDEO_URL = f"https://youtu.be/{VIDEO_ID}"
+
+
+class FakeExtractor:
+    """Answers flat searches with one entry and stream extractions with the full video"""
+
+    def __init__(self, search_id=VIDEO_ID):
+        self.search_id = search_id
+        self.calls = []
+
+    async def extract(self, url, profile='default', guild_id=None):
+        self.calls.append((profile, url))
+        if profile == 'flat':
+            return {'entries': [{'id': self.search_id, 'title': 'Never Gonna Give You Up', 'duration': 213}]}
+        return {'id': VIDEO_ID, 'title': 'Rick Astley - Never Gonna Give You Up', 'duration': 213,
+                'webpage_url': f"https://www.youtube.com/watch?v={VIDEO_ID}", 'url': 'https://stream'}
+
+
+def test_video_url_placeholder_has_the_real_title_and_is_not_cached(tmp_path):
+    cache = MetadataCache(filename=str(tmp_path / 'cache.json'))
+    extractor = FakeExtractor()
+    songs, _ = asyncio.run(get_song_stub(extractor, VIDEO_URL, cache=cache))
+
+    assert songs[0]['title'] == 'Never Gonna Give You Up'
+    assert songs[0]['pending']
+    assert extractor.calls == [('flat', f'ytsearch1:"{VIDEO_ID}"')]
+    assert cache.lookup(VIDEO_URL) == (None, None)
+
+
+def test_video_url_not_found_by_id_is_fully_extracted(tmp_path):
+    extractor = FakeExtractor(search_id='somethingels')
+    songs, _ = asyncio.run(get_song_stub(extractor, VIDEO_URL))
+
+    assert songs[0]['title'] == 'Rick Astley - Never Gonna Give You Up'
+    assert not songs[0].get('pending')
+    assert [profile for profile, _ in extractor.calls] == ['flat', 'default']
+
+
+def test_query_is_cached_only_once_the_song_is_resolved(tmp_path):
+    cache = MetadataCache(filename=str(tmp_path / 'cache.json'))
+    extractor = FakeExtractor()
+
+    async def main():
+        songs, _ = await get_song_stub(extractor, 'never gonna give you up', cache=cache)
+        assert cache.lookup('never gonna give you up') == (None, None)
+
+        entry = QueueEntry.from_song(songs[0])
+        assert await enrich_song(extractor, entry, cache=cache) == 'https://stream'
+        return entry
+
+    entry = asyncio.run(main())
+    assert not entry['pending']
+    status, song = cache.lookup('never gonna give you up')
+    assert status == 'hit'
+    assert song['title'] == 'Rick Astley - Never Gonna Give You Up'
+    assert cache.lookup(VIDEO_URL)[0] == 'hit'
+
+
+def test_pending_songs_are_never_stored(tmp_path):
+    cache = MetadataCache(filename=str(tmp_path / 'cache.json'))
+    cache.store(VIDEO_URL, {'title': 'Placeholder', 'duration': 0, 'webpage_url': VIDEO_URL,
+                            'video_id': VIDEO_ID, 'pending': True})
+    assert cache.lookup(VIDEO_URL) == (None, None)
+
+
+class SlowExtractor:
+    """Extractions wait until released, then return or raise"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def extract(self, url, profile='default', guild_id=None):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return {'id': url, 'call': self.calls}
+
+
+def test_concurrent_callers_share_one_extraction():
+    async def main():
+        extractor = SlowExtractor()
+        extractor.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(extract_info(extractor, ' Some  Song ', guild_id=i)) for i in range(10)]
+        waiters.append(asyncio.ensure_future(extract_info(extractor, 'some song', guild_id=10)))
+        await asyncio.sleep(0)
+        extractor.release.set()
+        results = await asyncio.gather(*waiters)
+        assert extractor.calls == 1
+        assert all(result is results[0] for result in results)
+
+    asyncio.run(main())
+
+
+def test_error_reaches_every_waiter():
+    async def main():
+        extractor = SlowExtractor(error=ExtractionError('Video unavailable'))
+        extractor.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(extract_info(extractor, 'broken', guild_id=i)) for i in range(5)]
+        await asyncio.sleep(0)
+        extractor.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert extractor.calls == 1
+        assert all(isinstance(result, ExtractionError) for result in results)
+
+    asyncio.run(main())
+
+
+def test_cancelled_owner_does_not_fail_the_other_waiters():
+    async def main():
+        extractor = SlowExtractor()
+        extractor.release = asyncio.Event()
+        owner = asyncio.ensure_future(extract_info(extractor, 'song', guild_id=1))
+        waiter = asyncio.ensure_future(extract_info(extractor, 'song', guild_id=2))
+        await asyncio.sleep(0)
+
+        # The owner's caller going away leaves the shared extraction running
+        owner.cancel()
+        await asyncio.sleep(0)
+        extractor.release.set()
+        assert (await waiter)['call'] == 1
+        assert owner.cancelled()
+        assert extractor.calls == 1
+
+    asyncio.run(main())
+
+
+def test_waiter_reextracts_when_the_owner_guild_cancels_its_job():
+    class CancellingExtractor(SlowExtractor):
+        async def extract(self, url, profile='default', guild_id=None):
+            self.calls += 1
+            if guild_id == 1:
+                await self.release.wait()
+                raise ExtractionCancelled("Extraction was cancelled")  # guild 1 skipped
+            return {'id': url, 'call': self.calls}
+
+    async def main():
+        extractor = CancellingExtractor()
+        extractor.release = asyncio.Event()
+        owner = asyncio.ensure_future(extract_info(extractor, 'song', guild_id=1))
+        waiter = asyncio.ensure_future(extract_info(extractor, 'song', guild_id=2))
+        await asyncio.sleep(0)
+        extractor.release.set()
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+        assert isinstance(results[0], ExtractionCancelled)
+        assert results[1] == {'id': 'song', 'call': 2}
+
+    asyncio.run(main())
+
+
+def test_finished_extractions_are_not_reused():
+    async def main():
+        extractor = SlowExtractor()
+        extractor.release = asyncio.Event()
+        extractor.release.set()
+        first = await extract_info(extractor, 'song')
+        second = await extract_info(extractor, 'song')
+        assert (first['call'], second['call']) == (1, 2)
+        assert get_singleflight_stats()['in_flight'] == 0
+
+    asyncio.run(main())